@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for multi-process serving.
+
+    gunicorn -c gunicorn.conf.py src.main:app
+
+Runs one uvicorn worker per CPU (override with WEB_CONCURRENCY). Send SIGHUP
+to the master for a graceful reload: new workers start with fresh code and
+configuration while the old ones finish their requests, flush queued writes
+and exit. With more than one worker, cross-worker state (the search cache's
+second tier and fetch leases) defaults to the shared SQLite store on /dev/shm.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Long enough for a worker to drain AI jobs and flush the write-behind queue
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers now and then to bound memory growth (0 disables)
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Workers are forked from the master and import the app after this file runs,
+# so these defaults reach every worker
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_BACKEND", "sqlite")
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "shared")
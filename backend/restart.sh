@@ -1,18 +1,33 @@
 #!/bin/bash
 
+# Usage: ./restart.sh           stop any running server and start a new one
+#        ./restart.sh reload    gracefully reload the workers of a running server
+
+PIDFILE=logs/server.pid
+
+# Create logs directory if it doesn't exist
+mkdir -p logs
+
+if [ "$1" = "reload" ] && [ -f "$PIDFILE" ] && ps -p "$(cat $PIDFILE)" > /dev/null; then
+    # Gunicorn replaces its workers one by one; in-flight requests finish on the old ones
+    kill -HUP "$(cat $PIDFILE)"
+    echo "Reloading workers of server $(cat $PIDFILE)"
+    exit 0
+fi
+
 # Find and kill any existing server processes
 echo "Stopping any existing server processes..."
+if [ -f "$PIDFILE" ] && ps -p "$(cat $PIDFILE)" > /dev/null; then
+    kill -TERM "$(cat $PIDFILE)"
+fi
 pkill -f "python -m src.main" || echo "No existing processes found"
 
 # Wait a moment to ensure processes are terminated
 sleep 1
 
-# Create logs directory if it doesn't exist
-mkdir -p logs
-
-# Start the server
+# Start the server (one worker per CPU unless WEB_CONCURRENCY is set)
 echo "Starting new server..."
-python -m src.main > logs/server.log 2>&1 &
+gunicorn -c gunicorn.conf.py --pid "$PIDFILE" src.main:app > logs/server.log 2>&1 &
 pid=$!
 
 # Wait a moment for the server to start
@@ -22,7 +37,8 @@ sleep 2
 if ps -p $pid > /dev/null; then
     echo "Server is now running with PID $pid. Logs are in logs/server.log"
     echo "You can check the logs with: tail -f logs/server.log"
+    echo "Reload the workers gracefully with: ./restart.sh reload"
     echo "Check the health at: http://localhost:8000/api/health"
 else
     echo "Failed to start the server. Check logs/server.log for details."
-fi 
\ No newline at end of file
+fi
@@ -0,0 +1,123 @@
+import os
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from .cache import LRUCache, normalize_query_text
+from .db import get_ai_response_by_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# AI response cache configuration
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "86400"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+AI_CACHE_PERSIST = os.getenv("AI_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+
+# Bump when the prompt or model changes so old answers stop matching
+AI_PROMPT_VERSION = "deepseek-chat:v1"
+
+
+def extract_snippets(search_results: List[Dict[str, Any]]) -> List[str]:
+    """Snippets the AI prompt is built from, in result order."""
+    return [result.get("snippet", "") for result in search_results if isinstance(result, dict) and result.get("snippet")]
+
+
+def make_ai_fingerprint(query: str, snippets: List[str]) -> str:
+    """
+    Content address of an AI answer: the normalized query plus the exact snippets.
+
+    Args:
+        query: The search query
+        snippets: Snippets the prompt is built from
+
+    Returns:
+        str: Hex sha256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(AI_PROMPT_VERSION.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_query_text(query).encode("utf-8"))
+    for snippet in snippets:
+        digest.update(b"\0")
+        digest.update(snippet.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AIResponseCache:
+    """
+    Content-addressed cache of AI answers.
+
+    Answers live in a size-bounded in-process LRU with a TTL. With persistence
+    enabled, answers are also looked up in the ``ai_responses`` table by their
+    ``fingerprint`` column (written with every new answer), so they survive
+    restarts and are shared between workers.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = AI_CACHE_ENABLED,
+        ttl: float = AI_CACHE_TTL,
+        max_bytes: int = AI_CACHE_MAX_BYTES,
+        persist: bool = AI_CACHE_PERSIST,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.persist = persist
+        self.memory = LRUCache(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.persisted_hits = 0
+        self.errors = 0
+
+    async def get(self, fingerprint: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        answer = self.memory.get(fingerprint)
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        if self.persist:
+            try:
+                since = (datetime.utcnow() - timedelta(seconds=self.ttl)).isoformat()
+                answer = await get_ai_response_by_fingerprint(fingerprint, since)
+            except Exception as e:
+                self.errors += 1
+                logger.error("AI cache lookup failed: %s", e)
+                answer = None
+            if answer:
+                self.set(fingerprint, answer)
+                self.hits += 1
+                self.persisted_hits += 1
+                return answer
+
+        self.misses += 1
+        return None
+
+    def set(self, fingerprint: str, answer: str) -> None:
+        if not self.enabled or not answer:
+            return
+        self.memory.set(fingerprint, answer, len(answer.encode("utf-8")), self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "persist": self.persist,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persisted_hits": self.persisted_hits,
+            "errors": self.errors,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+            "evictions": self.memory.evictions,
+        }
+
+
+# Shared AI response cache
+ai_response_cache = AIResponseCache()
@@ -0,0 +1,248 @@
+import os
+import time
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .metrics import search_stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# AI generation scheduler configuration
+AI_WORKERS = int(os.getenv("AI_WORKERS", "8"))
+AI_QUEUE_SIZE = int(os.getenv("AI_QUEUE_SIZE", "200"))
+AI_JOB_MAX_WAIT = float(os.getenv("AI_JOB_MAX_WAIT", "60"))
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Results of AIJobScheduler.submit
+JOB_QUEUED = "queued"
+JOB_DUPLICATE = "duplicate"
+JOB_REJECTED = "queue_full"
+
+# Job states reported by AIJobScheduler.status
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+
+# How many rejected search_ids to remember for the status endpoint
+REJECTED_HISTORY = 1000
+
+
+class AIJob:
+    """One queued AI generation."""
+
+    __slots__ = ("search_id", "fn", "priority", "enqueued_at", "max_wait", "on_discard", "cancelled", "task")
+
+    def __init__(
+        self,
+        search_id: str,
+        fn: Callable[[], Awaitable[Any]],
+        priority: int,
+        max_wait: float,
+        on_discard: Optional[Callable[[str], None]],
+    ):
+        self.search_id = search_id
+        self.fn = fn
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.max_wait = max_wait
+        self.on_discard = on_discard
+        self.cancelled = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class AIJobScheduler:
+    """
+    Bounded worker pool for AI generations.
+
+    Replaces FastAPI ``BackgroundTasks``, which started one DeepSeek request per
+    search with no limit. Jobs wait in a bounded priority queue (interactive
+    searches ahead of background work) and a fixed number of workers run them.
+    A search_id is only ever queued or running once. Jobs that waited longer
+    than ``max_wait`` are discarded as stale, since the client has most likely
+    given up; ``cancel`` discards a job explicitly. A full queue rejects the job
+    and remembers the rejection so the status endpoint can report it.
+    """
+
+    def __init__(self, workers: int = AI_WORKERS, max_size: int = AI_QUEUE_SIZE, max_wait: float = AI_JOB_MAX_WAIT):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, AIJob] = {}
+        self._rejected: "OrderedDict[str, None]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._closing = False
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.stale = 0
+        self.cancelled = 0
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue(maxsize=self.max_size)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(asyncio.create_task(self._run()))
+
+    async def start(self) -> None:
+        self._ensure_workers()
+
+    async def close(self) -> None:
+        """Cancel queued and running generations and stop the workers."""
+        self._closing = True
+        for job in list(self._jobs.values()):
+            self._discard(job, "AI generation cancelled: server shutting down")
+            if job.task is not None:
+                job.task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._closing = False
+
+    def submit(
+        self,
+        search_id: str,
+        fn: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_INTERACTIVE,
+        max_wait: Optional[float] = None,
+        on_discard: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Queue ``fn`` to generate the AI response for ``search_id``.
+
+        Args:
+            search_id: Deduplication key; a second submit while queued or running is ignored
+            fn: Zero-argument coroutine function that does the generation
+            priority: Lower runs first (see PRIORITY_INTERACTIVE / PRIORITY_BACKGROUND)
+            max_wait: Seconds the job may wait before it is discarded as stale
+            on_discard: Called with a reason if the job is rejected, goes stale or is cancelled
+
+        Returns:
+            str: JOB_QUEUED, JOB_DUPLICATE or JOB_REJECTED
+        """
+        self._ensure_workers()
+        if search_id in self._jobs:
+            self.deduplicated += 1
+            return JOB_DUPLICATE
+
+        job = AIJob(search_id, fn, priority, self.max_wait if max_wait is None else max_wait, on_discard)
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            self._rejected[search_id] = None
+            while len(self._rejected) > REJECTED_HISTORY:
+                self._rejected.popitem(last=False)
+            logger.warning("AI generation queue is full, rejecting search_id: %s", search_id)
+            self._notify_discard(job, "AI generation queue is full")
+            return JOB_REJECTED
+
+        self._jobs[search_id] = job
+        self.submitted += 1
+        return JOB_QUEUED
+
+    def cancel(self, search_id: str) -> bool:
+        """Discard a queued job or cancel a running one. Returns False if it is unknown."""
+        job = self._jobs.get(search_id)
+        if job is None:
+            return False
+        self.cancelled += 1
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            self._discard(job, "AI generation cancelled")
+        return True
+
+    def status(self, search_id: str) -> Optional[str]:
+        """STATE_QUEUED, STATE_RUNNING, JOB_REJECTED, or None if the scheduler does not know the job."""
+        job = self._jobs.get(search_id)
+        if job is not None:
+            return STATE_RUNNING if job.task is not None else STATE_QUEUED
+        if search_id in self._rejected:
+            return JOB_REJECTED
+        return None
+
+    def _discard(self, job: AIJob, reason: str) -> None:
+        job.cancelled = True
+        if self._jobs.get(job.search_id) is job:
+            del self._jobs[job.search_id]
+        self._notify_discard(job, reason)
+
+    @staticmethod
+    def _notify_discard(job: AIJob, reason: str) -> None:
+        if job.on_discard is not None:
+            try:
+                job.on_discard(reason)
+            except Exception as e:
+                logger.error("Error in AI job discard callback: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                waited = time.monotonic() - job.enqueued_at
+                self._waits.append(waited)
+                search_stage_seconds.observe(waited, "ai_queue_wait")
+                if waited > job.max_wait:
+                    self.stale += 1
+                    logger.warning("Discarding stale AI job for search_id %s after %.1fs in queue", job.search_id, waited)
+                    self._discard(job, "AI generation expired in queue")
+                    continue
+
+                self.running += 1
+                job.task = asyncio.create_task(job.fn())
+                try:
+                    await job.task
+                    self.completed += 1
+                except asyncio.CancelledError:
+                    # Only a job cancelled through cancel() keeps the worker alive
+                    if self._closing or not job.task.cancelled():
+                        raise
+                    self._notify_discard(job, "AI generation cancelled")
+                except Exception as e:
+                    self.failed += 1
+                    logger.error("AI job for search_id %s failed: %s", job.search_id, e)
+                finally:
+                    self.running -= 1
+                    if self._jobs.get(job.search_id) is job:
+                        del self._jobs[job.search_id]
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "stale": self.stale,
+            "cancelled": self.cancelled,
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+            "wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+# Shared AI generation scheduler
+ai_jobs = AIJobScheduler()
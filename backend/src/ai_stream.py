@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# How long finished streams stay in memory for late subscribers and pollers
+AI_STREAM_RETENTION = float(os.getenv("AI_STREAM_RETENTION", "300"))
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class AIResponseStream:
+    """
+    Tokens of one in-progress AI generation.
+
+    The generator publishes deltas as DeepSeek sends them; any number of
+    subscribers replay what was already received and then follow new tokens
+    until the stream finishes or fails.
+    """
+
+    def __init__(self, search_id: str):
+        self.search_id = search_id
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self._event = asyncio.Event()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def publish(self, delta: str) -> None:
+        self.chunks.append(delta)
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.finish()
+
+    def _notify(self) -> None:
+        # Wake current subscribers and arm a fresh event for the next change
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            event = self._event
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                return
+            await event.wait()
+
+
+class AIStreamRegistry:
+    """In-memory index of AI generations by search_id."""
+
+    def __init__(self, retention: float = AI_STREAM_RETENTION):
+        self.retention = retention
+        self._streams: Dict[str, AIResponseStream] = {}
+
+    def open(self, search_id: str) -> AIResponseStream:
+        """Return the stream for ``search_id``, creating it if needed."""
+        self._prune()
+        stream = self._streams.get(search_id)
+        if stream is None:
+            stream = AIResponseStream(search_id)
+            self._streams[search_id] = stream
+        return stream
+
+    def get(self, search_id: str) -> Optional[AIResponseStream]:
+        return self._streams.get(search_id)
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention
+        expired = [
+            search_id for search_id, stream in self._streams.items()
+            if stream.finished_at is not None and stream.finished_at < cutoff
+        ]
+        for search_id in expired:
+            del self._streams[search_id]
+
+    def stats(self) -> Dict[str, Any]:
+        active = sum(1 for stream in self._streams.values() if not stream.done)
+        return {"active": active, "retained": len(self._streams) - active}
+
+
+# Shared registry of AI generations
+ai_streams = AIStreamRegistry()
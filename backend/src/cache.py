@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from .models import SearchQuery
+from .shared_state import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+# Search cache configuration
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "none").lower()
+SEARCH_CACHE_DIR = os.getenv(
+    "SEARCH_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../.cache/search")),
+)
+SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Seconds between sweeps of expired files from the disk tier
+SEARCH_CACHE_SWEEP_INTERVAL = float(os.getenv("SEARCH_CACHE_SWEEP_INTERVAL", "300"))
+
+# Values reported in SearchResponse.cache_status
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+
+
+def normalize_query_text(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different spellings share a key."""
+    return " ".join((query or "").split()).lower()
+
+
+def pack_entry(data: bytes, expires_at: float) -> bytes:
+    """Second-tier value: the entry's wall-clock expiry on the first line, then its JSON."""
+    return b"%r\n" % expires_at + data
+
+
+def unpack_entry(entry: bytes) -> Tuple[float, bytes]:
+    """Split a second-tier value into its expiry and JSON; raises ValueError if it is malformed."""
+    header, _, data = bytes(entry).partition(b"\n")
+    return float(header), data
+
+
+def make_search_cache_key(query_request: SearchQuery) -> str:
+    """
+    Build the cache key for a search request from its normalized fields.
+
+    Args:
+        query_request: The incoming search request
+
+    Returns:
+        str: A stable key, safe to use as a file name or Redis key
+    """
+    normalized = "|".join([
+        normalize_query_text(query_request.query),
+        str(query_request.num_results),
+        normalize_query_text(query_request.location or ""),
+    ])
+    return "search:" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    In-process LRU cache bounded by the serialized size of its entries.
+
+    Every entry carries its own expiry; expired entries are dropped lazily on
+    access and evicted first when space is needed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float) -> bool:
+        """Store ``value``; returns False if it is larger than the whole cache."""
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class CacheBackend:
+    """
+    Interface for the optional second cache tier. Values are opaque bytes
+    (``SearchCache`` stores each entry's expiry with its JSON, see ``pack_entry``).
+
+    ``shared`` is True when entries written by one worker are visible to the
+    other workers on the host.
+    """
+
+    name = "none"
+    shared = False
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    Second tier that keeps one file per key in a local directory.
+
+    The expiry timestamp is stored on the first line of each file. File I/O runs
+    in a worker thread so it never blocks the event loop. Expired files are
+    deleted when read, and every ``sweep_interval`` seconds a write also sweeps
+    the whole directory, so keys that are never read again do not pile up.
+    """
+
+    name = "disk"
+    shared = True
+
+    def __init__(self, directory: str = SEARCH_CACHE_DIR, sweep_interval: float = SEARCH_CACHE_SWEEP_INTERVAL):
+        self.directory = directory
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        self._sweep_lock = threading.Lock()
+        self.swept = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace(":", "_") + ".json")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at = float(f.readline())
+                if expires_at <= time.time():
+                    os.remove(path)
+                    return None
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, data: bytes, ttl: float) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(f"{time.time() + ttl}\n".encode("ascii"))
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self.sweep_interval > 0 and time.time() >= self._next_sweep:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Delete expired entries and abandoned temporary files; returns how many were deleted."""
+        # One sweep at a time; writers that find one running skip it
+        if not self._sweep_lock.acquire(blocking=False):
+            return 0
+        try:
+            now = time.time()
+            self._next_sweep = now + self.sweep_interval
+            removed = 0
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.name.endswith(".tmp"):
+                            expired = entry.stat().st_mtime < now - self.sweep_interval
+                        elif entry.name.endswith(".json"):
+                            with open(entry.path, "rb") as f:
+                                expired = float(f.readline()) <= now
+                        else:
+                            continue
+                        if expired:
+                            os.remove(entry.path)
+                            removed += 1
+                    except (OSError, ValueError):
+                        continue
+            self.swept += removed
+            return removed
+        finally:
+            self._sweep_lock.release()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._write, key, data, ttl)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Second tier backed by any Redis-compatible server. Requires the optional ``redis`` package."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = SEARCH_CACHE_REDIS_URL):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis package is required for SEARCH_CACHE_BACKEND=redis") from e
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        await self._redis.set(key, data, px=max(1, int(ttl * 1000)))
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+class SharedCacheBackend(CacheBackend):
+    """Second tier in the cross-worker shared store (see ``SHARED_STATE_BACKEND``)."""
+
+    name = "shared"
+    shared = True
+
+    def __init__(self, store: SharedStore = shared_store):
+        self.store = store
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.store.get(key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        await self.store.set(key, data, ttl)
+
+
+class SearchCache:
+    """
+    Two-tier cache for raw SerpAPI payloads.
+
+    Lookups go to the in-process LRU first and then to the optional second tier.
+    Second-tier entries carry their expiry, so a hit is promoted back into memory
+    for the rest of its lifetime only. Failures in the second tier are logged
+    and treated as misses so the cache can never fail a search.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SEARCH_CACHE_ENABLED,
+        ttl: float = SEARCH_CACHE_TTL,
+        max_bytes: int = SEARCH_CACHE_MAX_BYTES,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.memory = LRUCache(max_bytes)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.backend_hits = 0
+        self.backend_errors = 0
+
+    @property
+    def shared(self) -> bool:
+        """Whether a payload cached by one worker can be read by the others."""
+        return self.enabled and self.backend is not None and self.backend.shared
+
+    async def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up a cached payload.
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], str]: The payload (or None) and the
+            cache status to report to the client
+        """
+        if not self.enabled:
+            return None, CACHE_BYPASS
+
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value, CACHE_HIT
+
+        if self.backend is not None:
+            entry = await self._backend_get(key)
+            if entry is not None:
+                remaining, data = entry
+                value = json.loads(data)
+                self.memory.set(key, value, len(data), remaining)
+                self.hits += 1
+                self.backend_hits += 1
+                return value, CACHE_HIT
+
+        self.misses += 1
+        return None, CACHE_MISS
+
+    async def contains(self, key: str) -> bool:
+        """Whether ``key`` is cached in either tier; not counted as a hit or miss."""
+        if not self.enabled:
+            return False
+        if self.memory.get(key) is not None:
+            return True
+        if self.backend is not None:
+            return await self._backend_get(key) is not None
+        return False
+
+    async def _backend_get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        # The entry's remaining lifetime and JSON, or None if it is missing, expired or unreadable
+        try:
+            stored = await self.backend.get(key)
+            if stored is None:
+                return None
+            expires_at, data = unpack_entry(stored)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.error("Search cache backend read failed: %s", e)
+            return None
+        remaining = expires_at - time.time()
+        return (remaining, data) if remaining > 0 else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        self.memory.set(key, value, len(data), ttl)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, pack_entry(data, time.time() + ttl), ttl)
+            except Exception as e:
+                self.backend_errors += 1
+                logger.error("Search cache backend write failed: %s", e)
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.backend else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_hits": self.memory_hits,
+            "backend_hits": self.backend_hits,
+            "backend_errors": self.backend_errors,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+        }
+
+
+def create_cache_backend(name: str = SEARCH_CACHE_BACKEND) -> Optional[CacheBackend]:
+    if name in ("", "none", "memory"):
+        return None
+    if name == "disk":
+        return DiskCacheBackend()
+    if name == "redis":
+        return RedisCacheBackend()
+    if name == "shared":
+        return SharedCacheBackend()
+    logger.warning("Unknown SEARCH_CACHE_BACKEND '%s', using the in-memory cache only", name)
+    return None
+
+
+# Shared search cache instance
+search_cache = SearchCache(backend=create_cache_backend())
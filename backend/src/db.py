@@ -1,72 +1,161 @@
 import os
 import logging
-from supabase import create_client
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional
-import json
+from typing import Dict, Any, Optional, List, Tuple
 
 from .models import SearchResult, AIResponse
+from .storage import StorageClient
+from .postgrest import AsyncPostgrestClient, PostgrestError
+from .sqlite_storage import SqliteStorageClient
+from .write_queue import WriteBehindQueue
+from .payload_store import PayloadStore
+from .metrics import search_stage_seconds
+from .fixtures import fixture_store
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
 
-# Export the supabase client to be used in other modules
-if not supabase_url or not supabase_key:
-    logger.warning("Supabase credentials not found. Database functionality will be disabled.")
-    supabase_client = None
+# Storage backend: supabase (hosted Postgres through PostgREST), sqlite (embedded) or none.
+# Defaults to Supabase when its credentials are set, else to the embedded SQLite database
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase" if supabase_url and supabase_key else "sqlite").lower()
+
+
+def create_storage_client(backend: str = DB_BACKEND) -> Optional[StorageClient]:
+    if backend == "supabase":
+        if not supabase_url or not supabase_key:
+            logger.warning("Supabase credentials not found. Database functionality will be disabled.")
+            return None
+        return AsyncPostgrestClient(supabase_url, supabase_key)
+    if backend == "sqlite":
+        return SqliteStorageClient()
+    if backend != "none":
+        logger.warning("Unknown DB_BACKEND '%s'. Database functionality will be disabled.", backend)
+    return None
+
+
+# Export the client and write queue to be used in other modules
+storage_client = create_storage_client()
+if storage_client is None:
+    write_queue = None
+    payload_store = None
 else:
+    write_queue = WriteBehindQueue(storage_client)
+    payload_store = PayloadStore(storage_client, write_queue)
+    logger.info("%s storage initialized successfully.", storage_client.name)
+
+# Whether search_results has the using_mock_data column (checked by init_db). Supabase
+# databases created before it are written and read without it until supabase/mock_data.sql runs
+mock_flag_stored = True
+
+# Export at module level for direct imports
+__all__ = [
+    'save_search_result', 'update_search_with_ai_response', 'get_search_result', 'storage_client',
+    'fix_search_record_components', 'update_search_result', 'save_recent_query', 'get_recent_query_rows',
+    'get_ai_response_by_fingerprint', 'get_search_results_after', 'get_query_history_after',
+    'init_db', 'close_db', 'db_stats'
+]
+
+
+async def has_column(table: str, column: str) -> bool:
+    """
+    Check that ``table`` has ``column``, for databases that may predate a migration.
+
+    Only an error about the request itself means the column is missing; when the
+    database cannot be reached the column is assumed to exist, as in ``init.sql``.
+    """
     try:
-        # Simple client initialization for version 1.0.4
-        supabase_client = create_client(supabase_url, supabase_key)
-        logger.info("Supabase client initialized successfully.")
+        await storage_client.select(table, columns=column, limit=1)
+    except PostgrestError as e:
+        if e.status_code != 400:
+            logger.error("Could not check for %s.%s: %s", table, column, e)
+            return True
+        return False
     except Exception as e:
-        logger.error(f"Failed to initialize Supabase client: {str(e)}")
-        supabase_client = None
+        logger.error("Could not check for %s.%s: %s", table, column, e)
+        return True
+    return True
+
+
+async def init_db() -> None:
+    """Start the background writer and check for optional columns. Called from the app lifespan."""
+    global mock_flag_stored
+    if write_queue:
+        await write_queue.start()
+    if storage_client:
+        mock_flag_stored = await has_column("search_results", "using_mock_data")
+        if not mock_flag_stored:
+            logger.warning(
+                "search_results.using_mock_data is missing; run supabase/mock_data.sql. "
+                "Until then mock fallback searches are stored without the flag and indexed like live ones."
+            )
 
-# Export at module level for direct imports
-__all__ = ['save_search_result', 'update_search_with_ai_response', 'get_search_result', 'supabase_client', 'fix_search_record_components']
 
-async def save_search_result(result: SearchResult) -> Optional[str]:
+async def close_db() -> None:
+    """Flush queued writes and close pooled connections. Called on shutdown."""
+    if write_queue:
+        await write_queue.close()
+    if storage_client:
+        await storage_client.close()
+
+
+def db_stats() -> Dict[str, Any]:
+    if not storage_client:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        **storage_client.stats(),
+        "write_queue": write_queue.stats(),
+        "payloads": payload_store.stats()
+    }
+
+async def save_search_result(result: SearchResult) -> Optional[Dict[str, Any]]:
     """
-    Save a search result to the Supabase database.
+    Save a search result to the database.
+    
+    In write-behind mode the row is queued and batched with other inserts; it
+    is readable through get_search_result as soon as this returns. Otherwise it
+    is inserted with ``Prefer: return=representation``. Either way the persisted
+    representation is returned, so callers never need to re-read the row.
+    
+    With content-addressed payload storage the sections are stored once per
+    distinct payload and the row references them by hash; the returned row is
+    expanded again, so callers see the same shape in both modes.
     
     Args:
         result: SearchResult object to save
         
     Returns:
-        Optional[str]: The ID of the created record or None if saving failed
+        Optional[Dict[str, Any]]: The persisted row, or None if saving failed
     """
-    if not supabase_client:
-        logger.warning("Supabase client not available. Search result not saved.")
-        return result.id
+    if not storage_client:
+        logger.warning("Database not available. Search result not saved.")
+        return None
         
     try:
-        # Convert the record to a dictionary
-        result_dict = result.model_dump()
+        # Shallow copy: the sections are already plain JSON data and are shared
+        # with the response body, so only top-level keys are replaced below
+        result_dict = dict(result)
         
         # Handle datetime serialization
         result_dict["timestamp"] = result_dict["timestamp"].isoformat()
         
         # Debug: Log what we're trying to save
-        logger.info(f"Attempting to save search result with ID: {result.id}")
-        logger.info(f"Search result keys: {list(result_dict.keys())}")
-        logger.info(f"Result contains organic_results: {bool(result_dict.get('organic_results'))}")
+        logger.debug("Attempting to save search result with ID: %s", result.id)
+        logger.debug("Search result keys: %s", result_dict.keys())
+        logger.debug("Result contains organic_results: %s", bool(result_dict.get('organic_results')))
         
-        # Fix column values to ensure they're properly formatted for Supabase
+        # Fix column values to ensure they're properly formatted for the database
         
         # 1. For JSON arrays, ensure they're initialized as empty arrays if None
         # These should never be null in the database
         for array_field in ["organic_results", "related_searches"]:
             if result_dict.get(array_field) is None or not isinstance(result_dict[array_field], list):
-                logger.warning(f"Field {array_field} is None or not a list, initializing as empty array")
+                logger.warning("Field %s is None or not a list, initializing as empty array", array_field)
                 result_dict[array_field] = []
             
         # 2. For JSON objects, ensure they're properly formatted or set to null
@@ -86,149 +175,333 @@ async def save_search_result(result: SearchResult) -> Optional[str]:
             result_dict["query"] = "Unknown query"
         
         # Verify the data before saving
-        logger.info(f"Verification before saving:")
-        logger.info(f"- organic_results: {len(result_dict['organic_results']) if isinstance(result_dict.get('organic_results'), list) else 'Not a list'}")
-        logger.info(f"- related_searches: {len(result_dict['related_searches']) if isinstance(result_dict.get('related_searches'), list) else 'Not a list'}")
+        logger.debug("Verification before saving:")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("- organic_results: %s", len(result_dict['organic_results']) if isinstance(result_dict.get('organic_results'), list) else 'Not a list')
+            logger.debug("- related_searches: %s", len(result_dict['related_searches']) if isinstance(result_dict.get('related_searches'), list) else 'Not a list')
             
-        # Insert the record
-        logger.info(f"Sending request to Supabase table: search_results")
-        response = supabase_client.table("search_results").insert(result_dict).execute()
-        logger.info(f"Response from Supabase: {response}")
-        data = response.data
-        
-        if not data:
-            logger.error(f"Failed to save search result: {response}")
-            return None
+        if not mock_flag_stored:
+            result_dict.pop("using_mock_data", None)
+            
+        # Move the sections into the payload table, keyed by their hash
+        if payload_store.enabled:
+            result_dict = await payload_store.pack(result_dict)
             
-        logger.info(f"Search result saved successfully with ID: {result.id}")
-        return result.id
+        # Insert (or queue) the record and keep the persisted representation
+        saved_row = await write_queue.insert("search_results", result_dict)
+        logger.info("Search result saved with ID: %s", result.id)
+        return await payload_store.expand(saved_row)
         
     except Exception as e:
-        logger.error(f"Error saving search result: {str(e)}")
+        logger.error("Error saving search result: %s", e)
         logger.exception("Full exception details:")
         return None
 
 
-async def update_search_with_ai_response(search_id: str, ai_response: str) -> bool:
+async def update_search_with_ai_response(search_id: str, ai_response: str, fingerprint: Optional[str] = None) -> bool:
     """
     Update a search result with an AI-generated response.
     
+    Both the search_results update and the ai_responses insert go through the
+    write-behind queue.
+    
     Args:
         search_id: ID of the search result to update
         ai_response: AI-generated response text
+        fingerprint: Content address of the answer, stored when AI cache persistence is on
         
     Returns:
-        bool: True if the update was successful, False otherwise
+        bool: True if the writes were queued, False otherwise
     """
-    if not supabase_client:
-        logger.warning("Supabase client not available. AI response not saved.")
+    if not storage_client:
+        logger.warning("Database not available. AI response not saved.")
         return False
         
     try:
-        logger.info(f"Updating search result with AI response for ID: {search_id}")
+        logger.debug("Queueing AI response update for ID: %s", search_id)
         
-        # Update the search result with the AI response
-        response = supabase_client.table("search_results") \
-            .update({"ai_response": ai_response}) \
-            .eq("id", search_id) \
-            .execute()
-            
-        # Access data directly from response object
-        data = response.data
+        # Update the search result with the AI response (merged into the insert if it is still queued)
+        await write_queue.update("search_results", search_id, {"ai_response": ai_response})
         
-        if not data:
-            logger.error(f"Failed to update search result with AI response: {response}")
-            return False
-            
-        logger.info(f"Search result updated with AI response")
-            
         # Also save in the ai_responses table for a more detailed record
-        try:
-            ai_response_record = AIResponse(
-                search_id=search_id,
-                response=ai_response
-            )
-            
-            ai_response_dict = ai_response_record.model_dump()
-            ai_response_dict["timestamp"] = ai_response_dict["timestamp"].isoformat()
-            
-            logger.info(f"Saving AI response to ai_responses table for search_id: {search_id}")
-            ai_response_result = supabase_client.table("ai_responses").insert(ai_response_dict).execute()
-            
-            ai_data = ai_response_result.data
-            
-            if not ai_data:
-                logger.error(f"Failed to save AI response record to ai_responses table")
-                # Continue even if this fails, since we already updated the main record
-            else:
-                logger.info(f"AI response record saved to ai_responses table with ID: {ai_data[0].get('id', 'unknown')}")
-        except Exception as ai_resp_error:
-            logger.error(f"Error saving to ai_responses table: {str(ai_resp_error)}")
-            logger.exception("Full exception details for ai_responses save:")
-        
-        # Return True even if the ai_responses table update failed, as long as the main record was updated
+        ai_response_record = AIResponse(
+            search_id=search_id,
+            response=ai_response,
+            fingerprint=fingerprint
+        )
+        
+        ai_response_dict = ai_response_record.model_dump(exclude_none=True)
+        ai_response_dict["timestamp"] = ai_response_dict["timestamp"].isoformat()
+        
+        await write_queue.insert("ai_responses", ai_response_dict)
         return True
         
     except Exception as e:
-        logger.error(f"Error updating search with AI response: {str(e)}")
+        logger.error("Error updating search with AI response: %s", e)
         logger.exception("Full exception details:")
         return False
 
 
+async def get_ai_response_by_fingerprint(fingerprint: str, since: str) -> Optional[str]:
+    """
+    Find the newest stored AI answer with the given fingerprint.
+    
+    Args:
+        fingerprint: Content address of the answer (see ai_cache.make_ai_fingerprint)
+        since: ISO timestamp; older answers are ignored
+        
+    Returns:
+        Optional[str]: The answer text, or None if there is none
+    """
+    if not storage_client:
+        return None
+    rows = await storage_client.select(
+        "ai_responses",
+        columns="response",
+        filters={"fingerprint": f"eq.{fingerprint}", "timestamp": f"gte.{since}"},
+        order="timestamp.desc",
+        limit=1
+    )
+    return rows[0]["response"] if rows else None
+
+
+async def update_search_result(search_id: str, update_data: Dict[str, Any]) -> bool:
+    """
+    Queue a partial update of a search result.
+    
+    Args:
+        search_id: ID of the search result to update
+        update_data: Column values to set
+        
+    Returns:
+        bool: True if the update was queued, False otherwise
+    """
+    if not storage_client:
+        logger.warning("Database not available. Search result not updated.")
+        return False
+        
+    try:
+        await write_queue.update("search_results", search_id, update_data)
+        return True
+    except Exception as e:
+        logger.error("Error updating search result: %s", e)
+        return False
+
+
+async def save_recent_query(normalized_query: str, query: str, timestamp: str) -> bool:
+    """
+    Upsert a query into the recent_queries table, keyed by its normalized form.
+    
+    The upsert is always queued, so it never adds a round trip to the search path.
+    
+    Args:
+        normalized_query: Lowercased, whitespace-collapsed query (the primary key)
+        query: Query as the user typed it
+        timestamp: ISO timestamp of the search
+        
+    Returns:
+        bool: True if the upsert was queued
+    """
+    if not storage_client:
+        return False
+    try:
+        await write_queue.upsert(
+            "recent_queries",
+            {"normalized_query": normalized_query, "query": query, "timestamp": timestamp},
+            on_conflict="normalized_query"
+        )
+        return True
+    except Exception as e:
+        logger.error("Error saving recent query: %s", e)
+        return False
+
+
+async def get_recent_query_rows(limit: int) -> List[Dict[str, Any]]:
+    """
+    Fetch the most recently searched unique queries from recent_queries.
+    
+    Args:
+        limit: Maximum number of rows to return
+        
+    Returns:
+        List[Dict[str, Any]]: Rows ordered by timestamp, newest first
+    """
+    if not storage_client:
+        return []
+    return await storage_client.select(
+        "recent_queries",
+        columns="normalized_query,query,timestamp",
+        order="timestamp.desc",
+        limit=limit
+    )
+
+
+async def select_page_after(
+    table: str,
+    columns: str,
+    after: Optional[Tuple[str, str]],
+    limit: int,
+    filters: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Read one page of rows in (timestamp, id) order, for incremental readers.
+
+    Keyset pagination: rows sharing the cursor's timestamp are continued by
+    id, so a page can never get stuck on many rows with one timestamp.
+
+    Args:
+        table: Table with ``timestamp`` and ``id`` columns
+        columns: Columns to select; must include timestamp and id
+        after: (timestamp, id) of the last row already read, or None to start at the beginning
+        limit: Maximum number of rows to return
+        filters: Further PostgREST filters, e.g. a lower bound on timestamp for the first page
+
+    Returns:
+        List[Dict[str, Any]]: Rows after the cursor, oldest first
+    """
+    filters = dict(filters or {})
+    rows: List[Dict[str, Any]] = []
+    if after is not None:
+        timestamp, row_id = after
+        rows = await storage_client.select(
+            table,
+            columns=columns,
+            filters={**filters, "timestamp": f"eq.{timestamp}", "id": f"gt.{row_id}"},
+            order="id.asc",
+            limit=limit
+        )
+        filters["timestamp"] = f"gt.{timestamp}"
+    if len(rows) < limit:
+        rows += await storage_client.select(
+            table,
+            columns=columns,
+            filters=filters,
+            order="timestamp.asc,id.asc",
+            limit=limit - len(rows)
+        )
+    return rows
+
+
+async def get_search_results_after(after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Fetch stored live searches in (timestamp, id) order, for incremental indexing.
+    
+    Mock fallback rows are skipped (once the database has the flag), and
+    ``payload_hash`` is only read with content-addressed payload storage.
+    
+    Args:
+        after: (timestamp, id) cursor of the last row read (None for all)
+        limit: Maximum number of rows to return
+        
+    Returns:
+        List[Dict[str, Any]]: Rows with id, query, timestamp and organic_results, oldest first
+    """
+    if not storage_client:
+        return []
+    columns = "id,query,timestamp,organic_results"
+    if payload_store.enabled:
+        columns += ",payload_hash"
+    rows = await select_page_after(
+        "search_results",
+        columns,
+        after,
+        limit,
+        filters={"using_mock_data": "is.false"} if mock_flag_stored else None
+    )
+    return [await payload_store.expand(row) for row in rows]
+
+
+async def get_query_history_after(
+    after: Optional[Tuple[str, str]],
+    limit: int,
+    since: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch the queries of stored live searches in (timestamp, id) order, for query suggestions.
+    
+    Only inline columns are read, so no payloads are fetched or expanded.
+    Mock fallback rows are skipped (once the database has the flag).
+    
+    Args:
+        after: (timestamp, id) cursor of the last row read (None to start at ``since``)
+        limit: Maximum number of rows to return
+        since: ISO timestamp; older rows are never returned (None for all)
+        
+    Returns:
+        List[Dict[str, Any]]: Rows with id, query, timestamp and related_searches, oldest first
+    """
+    if not storage_client:
+        return []
+    filters = {"using_mock_data": "is.false"} if mock_flag_stored else {}
+    if since:
+        filters["timestamp"] = f"gte.{since}"
+    return await select_page_after(
+        "search_results",
+        "id,query,timestamp,related_searches",
+        after,
+        limit,
+        filters=filters
+    )
+
+
 async def get_search_result(search_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieve a search result by ID.
     
+    Rows stored by payload hash are expanded transparently.
+    
     Args:
         search_id: ID of the search result to retrieve
         
     Returns:
         Optional[Dict[str, Any]]: The search result as a dictionary or None if not found
     """
-    if not supabase_client:
-        logger.warning("Supabase client not available. Cannot retrieve search result.")
+    if not storage_client:
+        logger.warning("Database not available. Cannot retrieve search result.")
         return None
         
     try:
-        logger.info(f"Attempting to retrieve search result with ID: {search_id}")
-        response = supabase_client.table("search_results") \
-            .select("*") \
-            .eq("id", search_id) \
-            .execute()
-            
-        # Access data directly from the response object
-        data = response.data
+        # Rows still waiting in the write queue are served from memory
+        pending = write_queue.get_unflushed("search_results", search_id)
+        if pending:
+            return await payload_store.expand(pending)
+        
+        logger.debug("Attempting to retrieve search result with ID: %s", search_id)
+        with search_stage_seconds.time("db_read"):
+            data = await storage_client.select(
+                "search_results",
+                filters={"id": f"eq.{search_id}"}
+            )
         
         if not data:
-            logger.warning(f"No search result found with ID: {search_id}")
+            logger.warning("No search result found with ID: %s", search_id)
             return None
             
-        logger.info(f"Retrieved search result with ID: {search_id}")
-        logger.info(f"Result data keys: {list(data[0].keys())}")
-        logger.info(f"Result contains organic_results: {bool(data[0].get('organic_results'))}")
-        logger.info(f"Result contains ai_response: {bool(data[0].get('ai_response'))}")
+        logger.debug("Retrieved search result with ID: %s", search_id)
+        logger.debug("Result data keys: %s", data[0].keys())
+        logger.debug("Result contains organic_results: %s", bool(data[0].get('organic_results')))
+        logger.debug("Result contains ai_response: %s", bool(data[0].get('ai_response')))
         
-        return data[0]
+        return await payload_store.expand(data[0])
         
     except Exception as e:
-        logger.error(f"Error retrieving search result: {str(e)}")
+        logger.error("Error retrieving search result: %s", e)
         logger.exception("Full exception details:")
         return None
 
 
-async def fix_search_record_components(search_id: str, mock_data_path: str = None) -> bool:
+async def fix_search_record_components(search_id: str) -> bool:
     """
     Fix a specific search record by adding missing components from mock data.
     
     Args:
         search_id: ID of the search record to fix
-        mock_data_path: Path to the mock data file (optional)
         
     Returns:
         bool: True if the record was fixed successfully, False otherwise
     """
-    if not supabase_client:
-        logger.warning("Supabase client not available. Cannot fix search record.")
+    if not storage_client:
+        logger.warning("Database not available. Cannot fix search record.")
         return False
         
     try:
@@ -236,31 +509,24 @@ async def fix_search_record_components(search_id: str, mock_data_path: str = Non
         record = await get_search_result(search_id)
         
         if not record:
-            logger.warning(f"No search record found with ID: {search_id}")
+            logger.warning("No search record found with ID: %s", search_id)
             return False
             
-        logger.info(f"Found search record with ID: {search_id}")
+        logger.debug("Found search record with ID: %s", search_id)
         
         # Check if the record already has components
         has_organic_results = bool(record.get("organic_results"))
-        logger.info(f"Record has organic_results: {has_organic_results}")
+        logger.debug("Record has organic_results: %s", has_organic_results)
         
         # Only fix if components are missing
         if has_organic_results and len(record.get("organic_results", [])) > 0:
             logger.info("Record already has organic_results, skipping fix")
             return True
             
-        # Load mock data
-        if not mock_data_path:
-            mock_data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "mockSerpData.json")
-            
-        logger.info(f"Loading mock data from: {mock_data_path}")
-        
-        try:
-            with open(mock_data_path, 'r') as f:
-                mock_data = json.load(f)
-        except Exception as load_error:
-            logger.error(f"Error loading mock data: {str(load_error)}")
+        # Mock payload for the record's query from the shared fixture store (parsed once per fixture)
+        mock_data = fixture_store.get(record.get("query"))
+        if not mock_data:
+            logger.error("No mock data fixture available")
             return False
             
         # Extract components
@@ -280,16 +546,12 @@ async def fix_search_record_components(search_id: str, mock_data_path: str = Non
         }
         
         logger.info("Updating record with missing components")
-        response = supabase_client.table("search_results").update(update_data).eq("id", search_id).execute()
-        
-        if not response.data:
-            logger.error(f"Failed to update search record: {response}")
-            return False
+        await write_queue.update("search_results", search_id, update_data)
             
-        logger.info(f"Successfully updated search record with ID: {search_id}")
+        logger.info("Queued update for search record with ID: %s", search_id)
         return True
         
     except Exception as e:
-        logger.error(f"Error fixing search record: {str(e)}")
+        logger.error("Error fixing search record: %s", e)
         logger.exception("Full exception details:")
         return False 
\ No newline at end of file
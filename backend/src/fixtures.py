@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import logging
+import argparse
+import threading
+from functools import lru_cache
+from urllib.parse import quote_plus
+from typing import Dict, Any, List, Optional, Pattern, Set, Tuple
+
+from .cache import normalize_query_text
+
+logger = logging.getLogger(__name__)
+
+# Fixture store configuration
+FIXTURES_DIR = os.getenv(
+    "FIXTURES_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../fixtures")),
+)
+INDEX_FILE = "index.json"
+
+# Placeholders in template fixtures: the query as typed, and URL-encoded
+QUERY_PLACEHOLDER = "{query}"
+QUERY_URL_PLACEHOLDER = "{query_url}"
+
+
+def render_template(value: Any, query: str, query_url: str) -> Any:
+    """Copy ``value`` with the query placeholders in every string replaced."""
+    if isinstance(value, str):
+        if "{query" not in value:
+            return value
+        return value.replace(QUERY_URL_PLACEHOLDER, query_url).replace(QUERY_PLACEHOLDER, query)
+    if isinstance(value, dict):
+        return {key: render_template(item, query, query_url) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render_template(item, query, query_url) for item in value]
+    return value
+
+
+class FixtureStore:
+    """
+    Query-keyed mock payloads, loaded lazily and parsed once.
+
+    Payloads are compact JSON files in ``directory`` next to an ``index.json``
+    mapping query patterns to files::
+
+        {"default": "generic.json", "fixtures": [{"pattern": "\\bcoffee\\b", "file": "coffee.json"}]}
+
+    The index is read on first use. Each fixture file is read and parsed the
+    first time a query needs it, and the parsed payload is kept. Query-to-fixture
+    matches are memoized, so a fallback from a captured payload costs a dict
+    lookup and a shallow copy.
+
+    A fixture containing ``{query}`` or ``{query_url}`` is a template: each
+    query gets its own copy with the placeholders filled in, so titles,
+    snippets, related searches and the answer box follow the query.
+    """
+
+    def __init__(self, directory: str = FIXTURES_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index: Optional[Tuple[List[Tuple[Pattern, str]], Optional[str]]] = None
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._templates: Set[str] = set()
+        self._sizes: Dict[str, Optional[int]] = {}
+        self._match = lru_cache(maxsize=4096)(self._match_uncached)
+        self.served = 0
+
+    def _load_index(self) -> Tuple[List[Tuple[Pattern, str]], Optional[str]]:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    try:
+                        with open(os.path.join(self.directory, INDEX_FILE), "rb") as f:
+                            index = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.error("Could not read fixture index in %s: %s", self.directory, e)
+                        index = {}
+                    patterns = [(re.compile(entry["pattern"], re.IGNORECASE), entry["file"]) for entry in index.get("fixtures", [])]
+                    default = index.get("default")
+                    names = {name for _, name in patterns} | ({default} if default else set())
+                    self._sizes = {name: self._size(name) for name in sorted(names)}
+                    self._index = (patterns, default)
+        return self._index
+
+    def _match_uncached(self, normalized_query: str) -> Optional[str]:
+        patterns, default = self._load_index()
+        for pattern, name in patterns:
+            if pattern.search(normalized_query):
+                return name
+        return default
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """The parsed fixture, shared between callers; do not mutate it."""
+        payload = self._payloads.get(name)
+        if payload is None:
+            with self._lock:
+                payload = self._payloads.get(name)
+                if payload is None:
+                    try:
+                        with open(os.path.join(self.directory, name), "rb") as f:
+                            data = f.read()
+                        payload = json.loads(data)
+                    except (OSError, ValueError) as e:
+                        logger.error("Could not load fixture %s: %s", name, e)
+                        return None
+                    if b"{query" in data:
+                        self._templates.add(name)
+                    self._payloads[name] = payload
+        return payload
+
+    def close(self) -> None:
+        """Drop the parsed payloads and memoized matches; they are loaded again on next use."""
+        with self._lock:
+            self._payloads.clear()
+            self._templates.clear()
+            self._index = None
+        self._match.cache_clear()
+
+    def get(self, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Mock SerpAPI payload for ``query``.
+
+        Args:
+            query: The search query; picks the first fixture whose pattern matches,
+                else the default fixture
+
+        Returns:
+            Optional[Dict[str, Any]]: The template rendered for the query, or a
+            shallow copy with ``search_parameters.q`` set to the query; None if
+            no fixture is available
+        """
+        name = self._match(normalize_query_text(query or ""))
+        payload = self.load(name) if name else None
+        if payload is None:
+            return None
+        self.served += 1
+        if name in self._templates:
+            query = " ".join((query or "").split())
+            return render_template(payload, query, quote_plus(query))
+        if not query:
+            return payload
+        variant = dict(payload)
+        variant["search_parameters"] = dict(payload.get("search_parameters") or {}, q=query)
+        return variant
+
+    def describe(self) -> Dict[str, Any]:
+        """Fixture metadata for /api/debug, without parsing any payloads."""
+        patterns, default = self._load_index()
+        return {
+            "available": default is not None and self._sizes.get(default) is not None,
+            "directory": self.directory,
+            "default": default,
+            "patterns": len(patterns),
+            "files": self._sizes,
+            "parsed": len(self._payloads),
+            "templates": sorted(self._templates),
+            "served": self.served,
+        }
+
+    def _size(self, name: str) -> Optional[int]:
+        try:
+            return os.path.getsize(os.path.join(self.directory, name))
+        except OSError:
+            return None
+
+
+def _slug(query: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", normalize_query_text(query)).strip("-")[:60] or "query"
+
+
+def import_payloads(paths: List[str], directory: str = FIXTURES_DIR, pattern: Optional[str] = None) -> int:
+    """
+    Add fixtures from SerpAPI payloads.
+
+    Args:
+        paths: Payload capture files (JSON lines) or single SerpAPI JSON responses
+        directory: Fixture directory to write to
+        pattern: Pattern for a single imported payload; defaults to the exact query
+
+    Returns:
+        int: Number of fixtures written
+    """
+    index_path = os.path.join(directory, INDEX_FILE)
+    with open(index_path, "r") as f:
+        index = json.load(f)
+    entries = index.setdefault("fixtures", [])
+
+    payloads = []
+    for path in paths:
+        with open(path, "r") as f:
+            if path.endswith(".jsonl"):
+                for line in f:
+                    record = json.loads(line)
+                    response = record.get("payload", {}).get("response")
+                    if record.get("kind") == "serpapi_response" and isinstance(response, dict) and "error" not in response:
+                        payloads.append((record["payload"]["query"], response))
+            else:
+                response = json.load(f)
+                payloads.append(((response.get("search_parameters") or {}).get("q", ""), response))
+
+    for query, response in payloads:
+        name = _slug(query) + ".json"
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump(response, f, separators=(",", ":"), ensure_ascii=False)
+        entry_pattern = pattern if pattern and len(payloads) == 1 else "^" + re.escape(normalize_query_text(query)) + "$"
+        entries[:] = [entry for entry in entries if entry["pattern"] != entry_pattern]
+        # Exact-query fixtures go first so they win over broader patterns
+        entries.insert(0, {"pattern": entry_pattern, "file": name})
+
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+        f.write("\n")
+    return len(payloads)
+
+
+# Shared fixture store
+fixture_store = FixtureStore()
+
+
+# Add captured SerpAPI responses (see PAYLOAD_CAPTURE_SAMPLE_RATE) as fixtures:
+#   python -m src.fixtures import logs/payloads.jsonl
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage mock SerpAPI fixtures")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    importer = subcommands.add_parser("import", help="add fixtures from captured payloads or SerpAPI JSON files")
+    importer.add_argument("paths", nargs="+")
+    importer.add_argument("--pattern", help="query pattern for a single payload (default: the exact query)")
+    args = parser.parse_args()
+    count = import_payloads(args.paths, pattern=args.pattern)
+    print(f"Imported {count} fixture(s) into {FIXTURES_DIR}")
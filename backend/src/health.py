@@ -0,0 +1,98 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from .serpapi_client import SerpAPIClient, serpapi_client
+
+logger = logging.getLogger(__name__)
+
+# Upstream health check configuration
+HEALTH_CHECK_ENABLED = os.getenv("HEALTH_CHECK_ENABLED", "true").lower() in ("1", "true", "yes")
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "60"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+
+
+class UpstreamHealthChecker:
+    """
+    Periodically probes SerpAPI in the background and caches the outcome.
+
+    The probe calls SerpAPI's account endpoint, which checks reachability and
+    the API key without spending search credits. ``/api/debug`` reads the last
+    result from memory instead of running a live test search per request.
+    """
+
+    def __init__(
+        self,
+        client: SerpAPIClient = serpapi_client,
+        enabled: bool = HEALTH_CHECK_ENABLED,
+        interval: float = HEALTH_CHECK_INTERVAL,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+    ):
+        self.client = client
+        self.enabled = enabled
+        self.interval = interval
+        self.timeout = timeout
+        self._worker: Optional[asyncio.Task] = None
+        self.checks = 0
+        self.last: Dict[str, Any] = {"success": None, "error": "Not checked yet", "latency_ms": None, "checked_at": None}
+
+    async def start(self) -> None:
+        if self.enabled and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    async def check(self) -> Dict[str, Any]:
+        """Probe SerpAPI once and store the result."""
+        api_key = os.getenv("SERPAPI_KEY")
+        start = time.perf_counter()
+        error = None
+        status_code = None
+        if not api_key:
+            error = "SERPAPI_KEY not configured"
+        else:
+            try:
+                status_code, body = await asyncio.wait_for(self.client.account(api_key), self.timeout)
+                if status_code != 200 or "error" in body:
+                    error = body.get("error") or f"HTTP {status_code}"
+            except asyncio.TimeoutError:
+                error = f"Timed out after {self.timeout}s"
+            except Exception as e:
+                error = str(e)
+
+        self.checks += 1
+        self.last = {
+            "success": error is None,
+            "error": error,
+            "status_code": status_code,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": datetime.utcnow().isoformat(),
+        }
+        if error is not None:
+            logger.warning("SerpAPI health check failed: %s", error)
+        return self.last
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("SerpAPI health check crashed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "interval": self.interval, "checks": self.checks, **self.last}
+
+
+# Shared upstream health checker
+health_checker = UpstreamHealthChecker()
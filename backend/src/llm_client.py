@@ -0,0 +1,244 @@
+import os
+import json
+import random
+import asyncio
+import logging
+from typing import Dict, Any, Optional, AsyncIterator
+
+import httpx
+
+from .resilience import UpstreamGuard
+
+logger = logging.getLogger(__name__)
+
+# DeepSeek client configuration (the URL can be pointed at a local mock LLM server)
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+DEEPSEEK_TIMEOUT = float(os.getenv("DEEPSEEK_TIMEOUT", "30"))
+DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "5"))
+DEEPSEEK_HTTP2 = os.getenv("DEEPSEEK_HTTP2", "false").lower() in ("1", "true", "yes")
+DEEPSEEK_MAX_CONNECTIONS = int(os.getenv("DEEPSEEK_MAX_CONNECTIONS", "20"))
+DEEPSEEK_MAX_KEEPALIVE = int(os.getenv("DEEPSEEK_MAX_KEEPALIVE", "10"))
+DEEPSEEK_KEEPALIVE_EXPIRY = float(os.getenv("DEEPSEEK_KEEPALIVE_EXPIRY", "60"))
+DEEPSEEK_MAX_RETRIES = int(os.getenv("DEEPSEEK_MAX_RETRIES", "3"))
+DEEPSEEK_RETRY_BASE_DELAY = float(os.getenv("DEEPSEEK_RETRY_BASE_DELAY", "0.5"))
+DEEPSEEK_RETRY_MAX_DELAY = float(os.getenv("DEEPSEEK_RETRY_MAX_DELAY", "8"))
+DEEPSEEK_RATE_LIMIT = float(os.getenv("DEEPSEEK_RATE_LIMIT", "0"))
+DEEPSEEK_RATE_BURST = int(os.getenv("DEEPSEEK_RATE_BURST", "10"))
+DEEPSEEK_RATE_MAX_WAIT = float(os.getenv("DEEPSEEK_RATE_MAX_WAIT", "5"))
+DEEPSEEK_BREAKER_FAILURES = int(os.getenv("DEEPSEEK_BREAKER_FAILURES", "5"))
+DEEPSEEK_BREAKER_RESET = float(os.getenv("DEEPSEEK_BREAKER_RESET", "30"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class DeepSeekAPIError(Exception):
+    """Raised when a streaming chat completion is rejected with a non-200 status."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"DeepSeek API error: {status_code}")
+        self.status_code = status_code
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class DeepSeekClient:
+    """
+    App-lifetime HTTP client for the DeepSeek chat completions API.
+
+    One pooled ``httpx.AsyncClient`` is shared by every AI generation so
+    connections (and their TLS sessions) are reused instead of being set up for
+    each call. Requests that fail with 429/5xx or a connection error are retried
+    with full-jitter exponential backoff, honouring ``Retry-After`` when sent.
+    Once retries are exhausted the failure counts against the circuit breaker;
+    while it is open, or the rate limit is exhausted, calls raise
+    ``UpstreamUnavailable`` without being sent.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_url: str = DEEPSEEK_API_URL,
+        timeout: float = DEEPSEEK_TIMEOUT,
+        connect_timeout: float = DEEPSEEK_CONNECT_TIMEOUT,
+        http2: bool = DEEPSEEK_HTTP2,
+        max_connections: int = DEEPSEEK_MAX_CONNECTIONS,
+        max_keepalive: int = DEEPSEEK_MAX_KEEPALIVE,
+        keepalive_expiry: float = DEEPSEEK_KEEPALIVE_EXPIRY,
+        max_retries: int = DEEPSEEK_MAX_RETRIES,
+        retry_base_delay: float = DEEPSEEK_RETRY_BASE_DELAY,
+        retry_max_delay: float = DEEPSEEK_RETRY_MAX_DELAY,
+        guard: Optional[UpstreamGuard] = None,
+    ):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and not http2_available():
+            logger.warning("DEEPSEEK_HTTP2 is enabled but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._client: Optional[httpx.AsyncClient] = None
+        self.guard = guard or UpstreamGuard(
+            "deepseek",
+            rate=DEEPSEEK_RATE_LIMIT,
+            burst=DEEPSEEK_RATE_BURST,
+            max_wait=DEEPSEEK_RATE_MAX_WAIT,
+            failure_threshold=DEEPSEEK_BREAKER_FAILURES,
+            reset_timeout=DEEPSEEK_BREAKER_RESET,
+        )
+
+        # Counters used to size the pool
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.tcp_connects = 0
+        self.tls_handshakes = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the client also works outside the app lifespan
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def start(self) -> None:
+        _ = self.client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore reports connection setup through the "trace" request extension
+        if event_name == "connection.connect_tcp.complete":
+            self.tcp_connects += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.retry_max_delay)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    async def stream_chat_completion(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+
+        Requests answered with 429/5xx or failing to connect are retried with
+        jittered exponential backoff (honouring ``Retry-After``), but only until
+        the first token has been received.
+
+        Args:
+            payload: Chat completion request body; ``stream`` is forced on
+
+        Raises:
+            DeepSeekAPIError: If the final attempt is answered with a non-200 status
+            httpx.HTTPError: On transport failures
+            UpstreamUnavailable: If the circuit is open or the rate limit is exhausted
+        """
+        await self.guard.admit()
+        body = dict(payload, stream=True)
+        attempt = 0
+        started = False
+        self.requests += 1
+        while True:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = None
+            try:
+                async with self.client.stream(
+                    "POST",
+                    self.api_url,
+                    headers=self._headers(),
+                    json=body,
+                    extensions={"trace": self._trace},
+                ) as response:
+                    if response.status_code != 200:
+                        if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                            self.failures += 1
+                            if response.status_code in RETRYABLE_STATUS_CODES:
+                                self.guard.record_failure()
+                            else:
+                                self.guard.record_success()
+                            raise DeepSeekAPIError(response.status_code)
+                        delay = self._backoff(attempt, response)
+                        logger.warning("DeepSeek returned %s, retrying in %.2fs", response.status_code, delay)
+                    else:
+                        self.guard.record_success()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                # Keep reading to the end of the body so the connection returns to the pool
+                                continue
+                            chunk = json.loads(data)
+                            delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content")
+                            if delta:
+                                started = True
+                                yield delta
+                        return
+            except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+                if started or attempt >= self.max_retries:
+                    self.failures += 1
+                    self.guard.record_failure()
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("DeepSeek connection error (%s), retrying in %.2fs", e, delay)
+            except httpx.HTTPError:
+                self.failures += 1
+                self.guard.record_failure()
+                raise
+            finally:
+                self.in_flight -= 1
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        max_connections = self.limits.max_connections
+        return {
+            "http2": self.http2,
+            "max_connections": max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "pool_utilization": round(self.in_flight / max_connections, 4) if max_connections else None,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "tcp_connects": self.tcp_connects,
+            "tls_handshakes": self.tls_handshakes,
+        }
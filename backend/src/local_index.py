@@ -0,0 +1,458 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from .db import get_search_results_after
+from .shared_state import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+# Local full-text index configuration
+LOCAL_INDEX_ENABLED = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+LOCAL_INDEX_PATH = os.getenv(
+    "LOCAL_INDEX_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/local-index.sqlite3")),
+)
+LOCAL_INDEX_QUEUE_SIZE = int(os.getenv("LOCAL_INDEX_QUEUE_SIZE", "1000"))
+LOCAL_INDEX_REFRESH_INTERVAL = float(os.getenv("LOCAL_INDEX_REFRESH_INTERVAL", "30"))
+LOCAL_INDEX_BATCH_SIZE = int(os.getenv("LOCAL_INDEX_BATCH_SIZE", "200"))
+# Terms in more than this fraction of documents are left out of any-term matching
+LOCAL_INDEX_COMMON_TERM_RATIO = float(os.getenv("LOCAL_INDEX_COMMON_TERM_RATIO", "0.1"))
+# BM25 weights of the title and snippet columns
+LOCAL_INDEX_TITLE_WEIGHT = float(os.getenv("LOCAL_INDEX_TITLE_WEIGHT", "2.0"))
+LOCAL_INDEX_SNIPPET_WEIGHT = float(os.getenv("LOCAL_INDEX_SNIPPET_WEIGHT", "1.0"))
+
+# Search ids indexed from this process, skipped when the refresher sees them again
+RECENT_IDS = 10000
+
+# Tokenizer of the index; query terms are stemmed with the same one
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+# One document per result URL; documents_fts is an FTS5 index over its title and
+# snippet, kept in sync by triggers
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    snippet TEXT NOT NULL,
+    thumbnail TEXT,
+    query TEXT,
+    search_id TEXT,
+    indexed_at TEXT NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, snippet, content='documents', content_rowid='id', tokenize='{TOKENIZER}'
+);
+
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+END;
+
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+END;
+
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE OF title, snippet ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+    INSERT INTO documents_fts (rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+END;
+
+-- Document frequency per indexed (stemmed) term
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_vocab USING fts5vocab(documents_fts, 'row');
+
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Per-connection scratch table that runs query terms through the index's tokenizer,
+# so they can be looked up in documents_vocab by their stemmed form
+STEM_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS temp.query_terms USING fts5(term, tokenize='{TOKENIZER}');
+CREATE VIRTUAL TABLE IF NOT EXISTS temp.query_terms_vocab USING fts5vocab(temp, query_terms, instance);
+"""
+
+# Unchanged documents are left alone, so re-indexing a repeated search does not touch the FTS index
+UPSERT_DOCUMENT = (
+    "INSERT INTO documents (link, title, snippet, thumbnail, query, search_id, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(link) DO UPDATE SET title = excluded.title, snippet = excluded.snippet, thumbnail = excluded.thumbnail, "
+    "query = excluded.query, search_id = excluded.search_id, indexed_at = excluded.indexed_at "
+    "WHERE documents.title IS NOT excluded.title OR documents.snippet IS NOT excluded.snippet"
+)
+
+SEARCH_DOCUMENTS = (
+    "SELECT d.title, d.link, d.snippet, d.thumbnail, d.query "
+    "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+    "WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts, ?, ?) LIMIT ?"
+)
+
+CURSOR_KEY = "refreshed_through"
+
+# Shared-store key naming the worker that runs the refresher
+REFRESH_LEASE_KEY = "lease:local-index-refresh"
+# Refresh intervals the lease outlives its last renewal by, before another worker takes over
+REFRESH_LEASE_INTERVALS = 3
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct lowercased terms of ``query``, in order."""
+    return list(OrderedDict.fromkeys(TERM_PATTERN.findall(query.lower())))
+
+
+def match_expression(terms: List[str], operator: str = " ") -> str:
+    """
+    FTS5 query for ``terms``: all of them with the default operator, any with ``" OR "``.
+
+    Terms are quoted, so user input can never be parsed as FTS5 syntax.
+    """
+    return operator.join(f'"{term}"' for term in terms)
+
+
+class LocalIndex:
+    """
+    On-disk inverted index of stored organic results with BM25 ranking.
+
+    Backs ``mode=local`` searches, which are answered from results SerpAPI
+    returned earlier instead of calling it again. The index is a SQLite FTS5
+    table: one document per result URL, updated in place when its title or
+    snippet changes. Mock fallback searches are never indexed.
+
+    It is kept current in two ways. Searches saved by this process are queued
+    with ``add`` and indexed by a background worker in batches. A refresher
+    also reads stored rows after a (timestamp, id) cursor kept in the index,
+    which backfills an empty index and picks up rows written by other workers.
+    With a cross-worker shared store only one worker refreshes at a time: it
+    holds a lease it renews every cycle, and another worker takes over once a
+    dead holder's lease expires. Writes happen in worker threads, one batch at a time, and queries run on
+    per-thread connections, so the event loop never waits on SQLite.
+    """
+
+    def __init__(
+        self,
+        path: str = LOCAL_INDEX_PATH,
+        enabled: bool = LOCAL_INDEX_ENABLED,
+        max_size: int = LOCAL_INDEX_QUEUE_SIZE,
+        refresh_interval: float = LOCAL_INDEX_REFRESH_INTERVAL,
+        batch_size: int = LOCAL_INDEX_BATCH_SIZE,
+        store: SharedStore = shared_store,
+    ):
+        self.path = path
+        self.store = store
+        self.enabled = enabled
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._recent_ids: "OrderedDict[str, None]" = OrderedDict()
+
+        self.documents = 0
+        self.searches_indexed = 0
+        self.documents_written = 0
+        self.refreshed_rows = 0
+        self.refreshing = False
+        self.queries = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+            self.documents = conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+            self._writer = conn
+        return self._writer
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.executescript(STEM_SCHEMA)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    async def start(self) -> None:
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._writer_conn)
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        if self.refresh_interval > 0 and (self._refresher is None or self._refresher.done()):
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Index what is still queued, then stop the workers and close the index."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+        self._refresher = None
+        if self.refreshing and self.store.shared:
+            try:
+                if await self.store.get(REFRESH_LEASE_KEY) == self._lease_holder():
+                    await self.store.delete(REFRESH_LEASE_KEY)
+            except Exception as e:
+                logger.error("Failed to release local index refresh lease: %s", e)
+        self.refreshing = False
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.error("Local index did not catch up within %ss", timeout)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self._local = threading.local()
+
+    def add(self, search_id: str, query: str, organic_results: List[Dict[str, Any]]) -> bool:
+        """
+        Queue a saved search for indexing without waiting for it.
+
+        Returns:
+            bool: False if indexing is off or the queue is full (the refresher will still pick the row up)
+        """
+        if self._queue is None or not organic_results:
+            return False
+        try:
+            self._queue.put_nowait((search_id, query, organic_results))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    def _remember(self, search_id: str) -> None:
+        self._recent_ids[search_id] = None
+        while len(self._recent_ids) > RECENT_IDS:
+            self._recent_ids.popitem(last=False)
+
+    def _index_batch(self, batch: List[Tuple[str, str, List[Dict[str, Any]]]], cursor: Optional[Tuple[str, str]] = None) -> int:
+        indexed_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (result["link"], result.get("title") or "", result.get("snippet") or "", result.get("thumbnail"),
+             query, search_id, indexed_at)
+            for search_id, query, organic_results in batch
+            for result in organic_results or []
+            if isinstance(result, dict) and result.get("link")
+        ]
+        conn = self._writer_conn()
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = conn.executemany(UPSERT_DOCUMENT, rows).rowcount
+                if cursor is not None:
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (CURSOR_KEY, json.dumps(cursor)))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if changed:
+                self.documents = conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+        return changed
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                self.documents_written += await asyncio.to_thread(self._index_batch, batch)
+                self.searches_indexed += len(batch)
+                for search_id, _, _ in batch:
+                    self._remember(search_id)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Failed to index %s searches: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _cursor(self) -> Optional[Tuple[str, str]]:
+        row = self._reader().execute("SELECT value FROM meta WHERE key = ?", (CURSOR_KEY,)).fetchone()
+        if not row:
+            return None
+        try:
+            timestamp, row_id = json.loads(row[0])
+        except ValueError:
+            # Indexes written before the cursor included the id: re-read that timestamp's rows
+            timestamp, row_id = row[0], ""
+        return timestamp, row_id
+
+    async def refresh(self) -> int:
+        """
+        Index stored searches after the cursor.
+
+        Returns:
+            int: Number of stored rows read
+        """
+        after = await asyncio.to_thread(self._cursor)
+        total = 0
+        while True:
+            rows = await get_search_results_after(after, self.batch_size)
+            if not rows:
+                break
+            batch = [
+                (row["id"], row.get("query") or "", row.get("organic_results"))
+                for row in rows
+                if row["id"] not in self._recent_ids
+            ]
+            after = (rows[-1]["timestamp"], rows[-1]["id"])
+            self.documents_written += await asyncio.to_thread(self._index_batch, batch, after)
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        self.refreshed_rows += total
+        return total
+
+    def _lease_holder(self) -> bytes:
+        # Read at call time: workers forked after import share the instance but not the pid
+        return f"{os.getpid()}:{id(self)}".encode("ascii")
+
+    async def _take_refresh_lease(self) -> bool:
+        """Whether this worker should run the next refresh; takes or renews the lease."""
+        if not self.store.shared:
+            return True
+        holder = self._lease_holder()
+        ttl = self.refresh_interval * REFRESH_LEASE_INTERVALS
+        try:
+            if await self.store.add(REFRESH_LEASE_KEY, holder, ttl):
+                return True
+            if await self.store.get(REFRESH_LEASE_KEY) == holder:
+                await self.store.set(REFRESH_LEASE_KEY, holder, ttl)
+                return True
+        except Exception as e:
+            # Refreshing twice is better than not refreshing at all
+            logger.error("Failed to take local index refresh lease: %s", e)
+            return True
+        return False
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self.refreshing = await self._take_refresh_lease()
+                if self.refreshing:
+                    await self.refresh()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Local index refresh failed: %s", e)
+            await asyncio.sleep(self.refresh_interval)
+
+    def _match(self, expression: str, limit: int) -> List[tuple]:
+        return self._reader().execute(
+            SEARCH_DOCUMENTS, (expression, LOCAL_INDEX_TITLE_WEIGHT, LOCAL_INDEX_SNIPPET_WEIGHT, limit)
+        ).fetchall()
+
+    def _common_terms(self, terms: List[str]) -> set:
+        conn = self._reader()
+        # documents_vocab holds stemmed terms, so stem the query's terms the same way first
+        conn.execute("DELETE FROM temp.query_terms")
+        conn.executemany("INSERT INTO temp.query_terms (rowid, term) VALUES (?, ?)", enumerate(terms))
+        stems: Dict[int, set] = {}
+        for position, stem in conn.execute("SELECT doc, term FROM temp.query_terms_vocab"):
+            stems.setdefault(position, set()).add(stem)
+        all_stems = sorted(set().union(*stems.values())) if stems else []
+        if not all_stems:
+            return set()
+        placeholders = ", ".join("?" for _ in all_stems)
+        rows = conn.execute(
+            f"SELECT term, doc FROM documents_vocab WHERE term IN ({placeholders})", all_stems
+        ).fetchall()
+        common = {stem for stem, documents in rows if documents > self.documents * LOCAL_INDEX_COMMON_TERM_RATIO}
+        # A term the tokenizer splits in parts is common only if every part is
+        return {term for position, term in enumerate(terms) if stems.get(position) and stems[position] <= common}
+
+    def _search(self, terms: List[str], limit: int) -> List[Dict[str, Any]]:
+        # Documents with every term rank first; that query is also far cheaper than
+        # OR-ing common terms, so the any-term query only runs to fill up the page
+        rows = self._match(match_expression(terms), limit)
+        if len(terms) > 1 and len(rows) < limit:
+            # Near-universal terms add little to BM25 but make every document a candidate
+            common = self._common_terms(terms)
+            rare = [term for term in terms if term not in common]
+            if rare:
+                seen = {row[1] for row in rows}
+                rows.extend(row for row in self._match(match_expression(rare, " OR "), limit) if row[1] not in seen)
+                del rows[limit:]
+        return [
+            {"title": title, "link": link, "snippet": snippet, "thumbnail": thumbnail, "query": query}
+            for title, link, snippet, thumbnail, query in rows
+        ]
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Best-matching stored results for ``query``, ranked by BM25.
+
+        Results containing all of the query's terms come first, followed by
+        those containing any of its less common terms.
+
+        Returns:
+            List[Dict[str, Any]]: Hits with title, link, snippet, thumbnail and the query
+            that originally returned them, best first
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        self.queries += 1
+        if self._writer is None:
+            # Creates the schema when searched before start()
+            await asyncio.to_thread(self._writer_conn)
+        return await asyncio.to_thread(self._search, terms, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "documents": self.documents,
+            "searches_indexed": self.searches_indexed,
+            "documents_written": self.documents_written,
+            "refreshed_rows": self.refreshed_rows,
+            "refreshing": self.refreshing,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queries": self.queries,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+# Shared local search index
+local_index = LocalIndex()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "httpx=WARNING,httpcore=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Sampled payload capture (replaces the old logs/response.json and logs/ai_response.json dumps)
+PAYLOAD_CAPTURE_SAMPLE_RATE = float(os.getenv("PAYLOAD_CAPTURE_SAMPLE_RATE", "0"))
+PAYLOAD_CAPTURE_PATH = os.getenv(
+    "PAYLOAD_CAPTURE_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../logs/payloads.jsonl")),
+)
+PAYLOAD_CAPTURE_MAX_BYTES = int(os.getenv("PAYLOAD_CAPTURE_MAX_BYTES", str(10 * 1024 * 1024)))
+PAYLOAD_CAPTURE_BACKUPS = int(os.getenv("PAYLOAD_CAPTURE_BACKUPS", "3"))
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Render records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that defers all formatting to the listener thread.
+
+    The stock QueueHandler merges ``msg % args`` on the calling thread; here the
+    record is enqueued untouched, so the event loop only pays for creating it.
+    Records are dropped (and counted) instead of blocking when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class PayloadCapture:
+    """
+    Opt-in, sampled capture of upstream payloads to a rotating JSONL file.
+
+    Each sampled payload is written as one line by a background thread; the
+    file is size-capped and rotated, so concurrent requests never clobber each
+    other and disk use stays bounded.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = PAYLOAD_CAPTURE_SAMPLE_RATE,
+        path: str = PAYLOAD_CAPTURE_PATH,
+        max_bytes: int = PAYLOAD_CAPTURE_MAX_BYTES,
+        backups: int = PAYLOAD_CAPTURE_BACKUPS,
+    ):
+        self.sample_rate = sample_rate
+        self.captured = 0
+        self._logger = logging.getLogger("payloads")
+        self._logger.propagate = False
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        if sample_rate > 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+            self._logger.addHandler(LazyQueueHandler(log_queue))
+            self._logger.setLevel(logging.INFO)
+            self._listener = logging.handlers.QueueListener(log_queue, file_handler)
+            self._listener.start()
+            atexit.register(self._listener.stop)
+
+    def capture(self, kind: str, payload: Dict[str, Any]) -> None:
+        """Record ``payload`` with probability ``sample_rate``. Serialization happens off the event loop."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        self.captured += 1
+        self._logger.info("%s", _JSONLine(kind, payload))
+
+
+class _JSONLine:
+    """Defers ``json.dumps`` until the writer thread formats the record."""
+
+    __slots__ = ("kind", "payload", "ts")
+
+    def __init__(self, kind: str, payload: Dict[str, Any]):
+        self.kind = kind
+        self.payload = payload
+        self.ts = time.time()
+
+    def __str__(self) -> str:
+        return json.dumps({"ts": self.ts, "kind": self.kind, "payload": self.payload}, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[LazyQueueHandler] = None
+
+
+def parse_log_levels(spec: str) -> Dict[str, str]:
+    """Parse ``"src.db=WARNING,httpx=ERROR"`` into a logger -> level mapping."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue drained by a background writer thread.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    _queue_handler = LazyQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_log_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def logging_stats() -> Dict[str, Any]:
+    return {
+        "queue_depth": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "payloads_captured": payload_capture.captured,
+    }
+
+
+# Shared payload capture
+payload_capture = PayloadCapture()
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from types import FrameType
+from typing import Dict, Any, Optional
+
+from .metrics import event_loop_lag_seconds, event_loop_blocked_total
+
+logger = logging.getLogger(__name__)
+
+# Event-loop monitor configuration
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+LOOP_MONITOR_THRESHOLD = float(os.getenv("LOOP_MONITOR_THRESHOLD", "0.5"))
+
+# Innermost frames included in a blocked-loop report
+STACK_DEPTH = 40
+
+
+def _request_path(frame: Optional[FrameType]) -> Optional[str]:
+    """Method and path of the innermost ASGI ``scope`` found on the stack, if any."""
+    while frame is not None:
+        # Only materialize f_locals for frames that actually have a scope variable
+        if "scope" in frame.f_code.co_varnames:
+            scope = frame.f_locals.get("scope")
+            if isinstance(scope, dict) and scope.get("type") == "http":
+                return f"{scope.get('method')} {scope.get('path')}"
+        frame = frame.f_back
+    return None
+
+
+class LoopMonitor:
+    """
+    Measures event-loop scheduling lag and reports blocking calls.
+
+    A ticker task sleeps for ``interval`` on the loop and records how late it
+    wakes up in the ``event_loop_lag_seconds`` histogram. A watchdog thread
+    checks the ticker's heartbeat; when the loop has not run it for longer than
+    ``threshold``, the watchdog captures the loop thread's current stack (the
+    code that is blocking it) and logs it once per stall, together with the
+    request being handled.
+    """
+
+    def __init__(self, enabled: bool = LOOP_MONITOR_ENABLED, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = LOOP_MONITOR_THRESHOLD):
+        self.enabled = enabled
+        self.interval = interval
+        self.threshold = threshold
+        self._ticker: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._beats = 0
+        self._reported_beat = -1
+        self.max_lag = 0.0
+        self.blocked = 0
+        self.last_blocked: Optional[Dict[str, Any]] = None
+
+    async def start(self) -> None:
+        if not self.enabled or (self._ticker is not None and not self._ticker.done()):
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._ticker = asyncio.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+        self._ticker = None
+        self._watchdog = None
+
+    async def _tick(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            event_loop_lag_seconds.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            self._heartbeat = time.monotonic()
+            self._beats += 1
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled > self.threshold and self._reported_beat != self._beats:
+                # Report each stall once, however long it lasts
+                self._reported_beat = self._beats
+                self._report(stalled)
+
+    def _report(self, stalled: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        path = _request_path(frame)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+        self.blocked += 1
+        event_loop_blocked_total.inc()
+        self.last_blocked = {"stalled_ms": round(stalled * 1000, 1), "request": path, "at": time.time()}
+        logger.warning(
+            "Event loop blocked for %.0f ms while handling %s; loop thread stack:\n%s",
+            stalled * 1000, path or "no request", stack,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "interval_ms": round(self.interval * 1000, 1),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocked": self.blocked,
+            "last_blocked": self.last_blocked,
+        }
+
+
+# Shared event-loop monitor
+loop_monitor = LoopMonitor()
@@ -1,21 +1,49 @@
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import time
 from dotenv import load_dotenv
 from typing import List, Optional, Dict, Any
 import logging
-import json
 import httpx
 from datetime import datetime
 import uvicorn
-from fastapi.responses import JSONResponse
-from serpapi import GoogleSearch
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 
-from .models import SearchQuery, SearchResult, OrganicResult, LocalResult, KnowledgeGraph, RelatedQuestion, AIResponse, SearchResponse, AIResponseResult
-from .db import save_search_result, update_search_with_ai_response, get_search_result, supabase_client, fix_search_record_components
+from .models import SearchQuery, SearchResult, AIResponse, SearchResponse, AIResponseResult
+from .db import (
+    save_search_result, update_search_with_ai_response, get_search_result, storage_client, fix_search_record_components,
+    init_db, close_db, db_stats
+)
+from .serpapi_client import serpapi_client
+from .llm_client import DeepSeekClient, DeepSeekAPIError
+from .ai_stream import ai_streams, format_sse
+from .cache import search_cache, make_search_cache_key, normalize_query_text
+from .singleflight import SingleFlight, SharedLease
+from .shared_state import shared_store
+from .reconcile import search_repairs
+from .logging_config import configure_logging, payload_capture, logging_stats
+from .loop_monitor import loop_monitor
+from .health import health_checker
+from .fixtures import fixture_store
+from .normalize import normalize_search_payload, stored_sections, extract_local_places, extract_related_searches
+from .responses import FastJSONResponse, encoder_stats
+from .recent import recent_queries
+from .local_index import local_index
+from .suggest import query_suggestions
+from .prefetch import prefetch_scheduler
+from .ai_cache import ai_response_cache, extract_snippets, make_ai_fingerprint
+from .ai_jobs import ai_jobs, JOB_REJECTED, STATE_QUEUED, STATE_RUNNING, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from .metrics import (
+    registry, search_stage_seconds, http_request_seconds, mock_fallbacks_total, cache_requests_total,
+    upstream_errors_total, FALLBACK_EMPTY_RESULTS, FALLBACK_API_ERROR, FALLBACK_TIMEOUT, FALLBACK_EXCEPTION,
+    FALLBACK_CIRCUIT_OPEN, FALLBACK_RATE_LIMITED
+)
+from .resilience import UpstreamUnavailable, CIRCUIT_STATE_VALUES
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -26,9 +54,41 @@ DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 if not DEEPSEEK_API_KEY:
     logger.error("DEEPSEEK_API_KEY not found in environment variables")
     raise ValueError("DEEPSEEK_API_KEY environment variable is required")
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 
-app = FastAPI()
+# Shared DeepSeek client, opened and closed by the app lifespan
+deepseek_client = DeepSeekClient(api_key=DEEPSEEK_API_KEY)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await loop_monitor.start()
+    await deepseek_client.start()
+    await init_db()
+    await search_repairs.start()
+    await recent_queries.start()
+    await query_suggestions.start()
+    await ai_jobs.start()
+    await health_checker.start()
+    await local_index.start()
+    await prefetch_scheduler.start(prefetch_search)
+    yield
+    await prefetch_scheduler.close()
+    await local_index.close()
+    await health_checker.close()
+    # Stop AI generations, finish pending repairs and flush queued database writes before closing connections
+    await ai_jobs.close()
+    await query_suggestions.close()
+    await recent_queries.close()
+    await search_repairs.close()
+    await close_db()
+    # Close pooled upstream connections on shutdown
+    await serpapi_client.close()
+    await deepseek_client.close()
+    await search_cache.close()
+    await shared_store.close()
+    fixture_store.close()
+    await loop_monitor.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -39,91 +99,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Path to mock data
-MOCK_DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../mockSerpData.json"))
-
-# Load mock data
-def load_mock_data():
-    try:
-        with open(MOCK_DATA_PATH, 'r') as f:
-            data = json.load(f)
-            logger.info("Mock data loaded successfully")
-            return data
-    except Exception as e:
-        logger.error(f"Error loading mock data: {str(e)}")
-        return None
-
-# Load mock data at startup
-mock_data = load_mock_data()
+# Coalesces identical in-flight searches
+search_flight = SingleFlight()
+# Coalesces upstream fetches across worker processes; waiting only pays off if the
+# winner's payload lands in a cache tier this worker can read
+search_leases = SharedLease(enabled=search_cache.shared)
+if shared_store.shared and not search_cache.shared:
+    logger.warning("SHARED_STATE_BACKEND is set but the search cache is not shared; fetch leases are disabled")
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"Incoming request: {request.method} {request.url}")
+    logger.info("Incoming request: %s %s", request.method, request.url)
+    start = time.perf_counter()
     response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
+    elapsed = time.perf_counter() - start
+    # Label by route template so /api/search/{search_id}/... stays one series
+    route = request.scope.get("route")
+    http_request_seconds.observe(elapsed, request.method, route.path if route else "unmatched", str(response.status_code))
+    logger.info("Response status: %s (%.1f ms)", response.status_code, elapsed * 1000)
     return response
 
-def normalize_organic_results(results: List[Dict[str, Any]]) -> List[OrganicResult]:
-    normalized = []
-    if not isinstance(results, list):
-        return normalized
-    for result in results:
-        if not isinstance(result, dict):
-            continue
-        normalized.append(OrganicResult(
-            title=result.get("title", ""),
-            link=result.get("link", ""),
-            snippet=result.get("snippet", ""),
-            position=result.get("position", 0),
-            thumbnail=result.get("thumbnail", None)
-        ))
-    return normalized
-
-def normalize_local_results(results: List[Dict[str, Any]]) -> List[LocalResult]:
-    normalized = []
-    if not isinstance(results, list):
-        return normalized
-    for result in results:
-        if not isinstance(result, dict):
-            continue
-        normalized.append(LocalResult(
-            title=result.get("title", ""),
-            address=result.get("address", ""),
-            rating=result.get("rating", None),
-            reviews=result.get("reviews", None),
-            phone=result.get("phone", None),
-            website=result.get("website", None),
-            thumbnail=result.get("thumbnail", None)
-        ))
-    return normalized
-
-def normalize_knowledge_graph(graph: Dict[str, Any]) -> KnowledgeGraph:
-    if not graph or not isinstance(graph, dict):
-        return None
-    
-    attributes = {}
-    for key, value in graph.items():
-        if key not in ["title", "description"]:
-            attributes[key] = value
-
-    return KnowledgeGraph(
-        title=graph.get("title", ""),
-        description=graph.get("description", None),
-        attributes=attributes
-    )
-
-def extract_related_searches(related_searches: List[Dict[str, Any]]) -> List[str]:
-    if not related_searches or not isinstance(related_searches, list):
-        return []
-    return [item.get("query", "") for item in related_searches if isinstance(item, dict) and "query" in item]
-
 async def generate_ai_response(query: str, search_results: List[Dict[str, Any]], search_id: str) -> Optional[str]:
+    stream = ai_streams.open(search_id)
     try:
         # Extract snippets from search results
-        snippets = [result.get("snippet", "") for result in search_results if result.get("snippet")]
+        snippets = extract_snippets(search_results)
+        fingerprint = make_ai_fingerprint(query, snippets)
         
         if not snippets:
-            logger.warning(f"No snippets available for AI response generation for query: {query}")
+            logger.warning("No snippets available for AI response generation for query: %s", query)
             snippets = ["No search results available."]
         
         # Prepare the prompt
@@ -140,226 +144,415 @@ async def generate_ai_response(query: str, search_results: List[Dict[str, Any]],
             "max_tokens": 500
         }
         
-        # Make the API request
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    DEEPSEEK_API_URL,
-                    headers={
-                        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    logger.info(f"Generated AI response for search_id: {search_id}")
-                    
-                    # Save the AI response to the database
-                    success = await update_search_with_ai_response(search_id, ai_response)
-                    if not success:
-                        logger.error(f"Failed to save AI response to database for search_id: {search_id}")
-                    
-                    # Save to logs for debugging
-                    try:
-                        os.makedirs(os.path.join(os.path.dirname(__file__), "../logs"), exist_ok=True)
-                        with open(os.path.join(os.path.dirname(__file__), "../logs/ai_response.json"), "w") as f:
-                            json.dump({"query": query, "search_id": search_id, "ai_response": ai_response}, f, indent=2)
-                    except Exception as e:
-                        logger.error(f"Failed to save AI response to file: {e}")
-                    
-                    return ai_response
-                else:
-                    logger.error(f"DeepSeek API error: {response.status_code}")
-                    return None
-            except httpx.TimeoutException:
-                logger.error("DeepSeek API request timed out")
-                return None
-            except Exception as api_error:
-                logger.error(f"Error making DeepSeek API request: {str(api_error)}")
-                return None
-                
+        # Stream the completion over the shared connection pool, publishing tokens to SSE subscribers
+        try:
+            start = time.perf_counter()
+            async for delta in deepseek_client.stream_chat_completion(payload):
+                if not stream.chunks:
+                    search_stage_seconds.observe(time.perf_counter() - start, "deepseek_first_token")
+                stream.publish(delta)
+            search_stage_seconds.observe(time.perf_counter() - start, "deepseek")
+            
+            ai_response = stream.text
+            stream.finish()
+            logger.info("Generated AI response for search_id: %s", search_id)
+            ai_response_cache.set(fingerprint, ai_response)
+            
+            # Save the AI response to the database once the stream is complete
+            success = await update_search_with_ai_response(
+                search_id, ai_response, fingerprint if ai_response_cache.persist else None
+            )
+            if not success:
+                logger.error("Failed to save AI response to database for search_id: %s", search_id)
+            
+            # Sampled capture for debugging (written off the event loop)
+            payload_capture.capture("ai_response", {"query": query, "search_id": search_id, "ai_response": ai_response})
+            
+            return ai_response
+        except UpstreamUnavailable as e:
+            logger.warning("Skipping AI generation for search_id %s: DeepSeek %s", search_id, e.reason)
+            stream.fail(f"AI generation unavailable: {e.reason}")
+            return None
+        except DeepSeekAPIError as api_error:
+            logger.error("DeepSeek API error: %s", api_error.status_code)
+            upstream_errors_total.inc("deepseek", f"http_{api_error.status_code}")
+            return None
+        except httpx.TimeoutException:
+            logger.error("DeepSeek API request timed out")
+            upstream_errors_total.inc("deepseek", "timeout")
+            return None
+        except Exception as api_error:
+            logger.error("Error making DeepSeek API request: %s", api_error)
+            upstream_errors_total.inc("deepseek", "exception")
+            return None
+            
     except Exception as e:
-        logger.error(f"Error generating AI response: {str(e)}")
+        logger.error("Error generating AI response: %s", e)
         return None
+    finally:
+        if not stream.done:
+            stream.fail("AI response generation failed")
 
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok"}
 
-@app.post("/api/search", response_model=SearchResponse)
-async def search(query_request: SearchQuery, background_tasks: BackgroundTasks):
+# Queue depths are sampled when /metrics is scraped
+registry.gauge("ai_jobs_queue_depth", "AI generations waiting for a worker", lambda: ai_jobs.stats()["queue_depth"])
+registry.gauge("ai_jobs_running", "AI generations in progress", lambda: ai_jobs.running)
+registry.gauge("db_write_queue_depth", "Database writes waiting to be flushed", lambda: db_stats().get("write_queue", {}).get("queue_depth", 0))
+registry.gauge(
+    "upstream_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)",
+    lambda: {(client.guard.name,): CIRCUIT_STATE_VALUES[client.guard.breaker.state] for client in (serpapi_client, deepseek_client)},
+    ["upstream"],
+)
+registry.gauge("search_cache_bytes", "Serialized size of the in-memory search cache", lambda: search_cache.memory.current_bytes)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text-format metrics: per-stage latency histograms and error counters.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def upstream_guard_stats() -> Dict[str, Any]:
+    return {client.guard.name: client.guard.stats() for client in (serpapi_client, deepseek_client)}
+
+@app.get("/api/stats")
+async def stats():
+    """
+    Get runtime counters for the search cache and upstream clients.
+    """
+    return {
+        "search_cache": search_cache.stats(),
+        "search_singleflight": search_flight.stats(),
+        "search_leases": search_leases.stats(),
+        "shared_state": shared_store.stats(),
+        "serpapi": serpapi_client.stats(),
+        "deepseek": deepseek_client.stats(),
+        "upstreams": upstream_guard_stats(),
+        "ai_streams": ai_streams.stats(),
+        "db": db_stats(),
+        "search_repairs": search_repairs.stats(),
+        "logging": logging_stats(),
+        "responses": encoder_stats(),
+        "recent_queries": recent_queries.stats(),
+        "ai_cache": ai_response_cache.stats(),
+        "ai_jobs": ai_jobs.stats(),
+        "event_loop": loop_monitor.stats(),
+        "health_check": health_checker.stats(),
+        "local_index": local_index.stats(),
+        "suggest": query_suggestions.stats(),
+        "prefetch": prefetch_scheduler.stats()
+    }
+
+def serpapi_params(query_request: SearchQuery, serpapi_key: str) -> Dict[str, Any]:
+    """Build the SerpAPI parameters for a search request."""
+    params = {
+        "engine": "google",
+        "q": query_request.query,
+        "num": query_request.num_results,
+        "api_key": serpapi_key,
+        "gl": "us",  # Set to US for consistent results
+        "hl": "en",  # Set to English for consistent results
+    }
+     
+    # Only add location if it's provided
+    if query_request.location:
+        params["location"] = query_request.location
+    return params
+
+async def prefetch_search(query_request: SearchQuery, cache_key: str) -> bool:
+    """
+    Fetch a search into the result cache ahead of demand, for the prefetch scheduler.
+
+    Nothing is stored or shown to anyone: only a valid SerpAPI payload is cached.
+    The request never waits for a rate-limit token, so it cannot delay live searches,
+    and its outcome is kept out of the circuit breaker, so it cannot open the
+    circuit for them either.
+
+    Returns:
+        bool: Whether the payload was fetched and cached
+    """
+    serpapi_key = os.getenv("SERPAPI_KEY")
+    if not serpapi_key:
+        return False
+    # Another worker is fetching the same query already
+    if not await search_leases.acquire(cache_key):
+        return False
     try:
-        logger.info(f"Search query received: {query_request.query}")
-        
-        # Get SerpAPI key from environment variables
-        serpapi_key = os.getenv("SERPAPI_KEY")
-        if not serpapi_key:
-            logger.error("SERPAPI_KEY not found in environment variables")
-            raise HTTPException(status_code=500, detail="SERPAPI_KEY not configured")
-        
-        # Create search parameters
-        params = {
-            "engine": "google",
-            "q": query_request.query,
-            "num": query_request.num_results,
-            "api_key": serpapi_key,
-            "gl": "us",  # Set to US for consistent results
-            "hl": "en",  # Set to English for consistent results
-        }
-         
-        # Only add location if it's provided
-        if query_request.location:
-            params["location"] = query_request.location
-
-        # Flag to track if we're using live data or mock data
-        using_mock_data = False
-        mock_data_reason = ""
-        
+        results = await serpapi_client.search(serpapi_params(query_request, serpapi_key), max_wait=0, track_health=False)
+        if not results or "error" in results:
+            return False
+        await search_cache.set(cache_key, results)
+        return True
+    finally:
+        await search_leases.release(cache_key)
+
+def start_ai_generation(query_request: SearchQuery, response: Dict[str, Any], organic_results_raw: List[Dict[str, Any]]) -> None:
+    """
+    Register the AI stream for a served search and queue its generation.
+
+    Called from ``execute_search``, so it runs exactly once per search even if
+    the request that started it is cancelled. Answers about mock fallback data
+    are queued behind those for live results.
+    """
+    search_id = response["search_id"]
+    # Register the stream now so SSE clients can subscribe before generation starts
+    stream = ai_streams.open(search_id)
+    
+    if response["ai_response"] is not None:
+        # AI cache hit: the answer is already complete
+        stream.publish(response["ai_response"])
+        stream.finish()
+    else:
+        # Queue the DeepSeek call on the bounded AI worker pool
+        ai_jobs.submit(
+            search_id,
+            lambda: generate_ai_response(query_request.query, organic_results_raw, search_id),
+            priority=PRIORITY_BACKGROUND if response["using_mock_data"] else PRIORITY_INTERACTIVE,
+            on_discard=stream.fail
+        )
+
+async def execute_search(query_request: SearchQuery, cache_key: str) -> Dict[str, Any]:
+    """
+    Fetch, normalize and store a single search, and start its AI generation.
+
+    Runs once per single-flight key, in a task shielded from the requests that
+    wait on it, so its result is shared by every concurrent request for the
+    same normalized query and the follow-up work happens even if the first
+    request goes away.
+
+    Returns:
+        Dict[str, Any]: The ``SearchResponse`` body
+    """
+    # Get SerpAPI key from environment variables
+    serpapi_key = os.getenv("SERPAPI_KEY")
+    if not serpapi_key:
+        logger.error("SERPAPI_KEY not found in environment variables")
+        raise HTTPException(status_code=500, detail="SERPAPI_KEY not configured")
+    
+    params = serpapi_params(query_request, serpapi_key)
+
+    # Flag to track if we're using live data or mock data
+    using_mock_data = False
+    mock_data_reason = ""
+    mock_data_category = None
+    
+    # Serve repeated queries from the result cache
+    results, cache_status = await search_cache.get(cache_key)
+    holds_lease = False
+    if results is None and search_cache.enabled:
+        # Another worker may already be fetching this query; wait for its result instead
+        holds_lease = await search_leases.acquire(cache_key)
+        while not holds_lease:
+            await search_leases.wait(cache_key)
+            results, cache_status = await search_cache.get(cache_key)
+            if results is not None:
+                break
+            # The holder failed or its lease expired; take over the fetch
+            holds_lease = await search_leases.acquire(cache_key)
+    cache_requests_total.inc("search", cache_status)
+    prefetch_scheduler.record_lookup(cache_key, results is not None)
+    
+    if results is not None:
+        logger.info("Search cache hit for query: %s", query_request.query)
+    else:
         try:
-            # Perform the search
-            search = GoogleSearch(params)
-            logger.info(f"Sending request to SerpAPI with params: {params}")
-            results = search.get_dict()
-            
+            # Perform the search without blocking the event loop
+            logger.info("Sending request to SerpAPI for query: %s", query_request.query)
+            with search_stage_seconds.time("serpapi_fetch"):
+                results = await serpapi_client.search(params)
+        
             # Check if results are valid
             if not results:
                 logger.error("SerpAPI returned empty results")
                 using_mock_data = True
                 mock_data_reason = "SerpAPI returned empty results"
+                mock_data_category = FALLBACK_EMPTY_RESULTS
             elif "error" in results:
                 error_msg = results.get('error', 'Unknown error')
-                logger.error(f"SerpAPI returned an error: {error_msg}")
+                logger.error("SerpAPI returned an error: %s", error_msg)
                 using_mock_data = True
                 mock_data_reason = f"SerpAPI error: {error_msg}"
+                mock_data_category = FALLBACK_API_ERROR
             else:
-                logger.info(f"Query '{query_request.query}' returned {len(results.get('organic_results', []))} organic results")
-            
-            # Save the SerpAPI response for debugging
-            try:
-                os.makedirs(os.path.join(os.path.dirname(__file__), "../logs"), exist_ok=True)
-                with open(os.path.join(os.path.dirname(__file__), "../logs/response.json"), "w") as f:
-                    json.dump(results, f)
-                logger.info("Saved SerpAPI response to logs/response.json")
-            except Exception as e:
-                logger.error(f"Failed to save SerpAPI response: {e}")
-            
+                logger.info("Query '%s' returned %s organic results", query_request.query, len(results.get('organic_results', [])))
+                await search_cache.set(cache_key, results)
+        
+            # Sampled capture for debugging (written off the event loop)
+            payload_capture.capture("serpapi_response", {"query": query_request.query, "response": results})
+        
+        except UpstreamUnavailable as e:
+            # Refused locally in microseconds; nothing was sent upstream
+            using_mock_data = True
+            mock_data_reason = f"SerpAPI unavailable: {e.reason}"
+            mock_data_category = e.reason
         except Exception as e:
-            logger.error(f"Error calling SerpAPI: {e}")
-            logger.error(f"Exception type: {type(e).__name__}")
-            logger.error(f"Exception details: {str(e)}")
+            logger.error("Error calling SerpAPI: %s", e)
+            logger.error("Exception type: %s", type(e).__name__)
+            logger.error("Exception details: %s", e)
             using_mock_data = True
             mock_data_reason = f"SerpAPI exception: {str(e)}"
+            mock_data_category = FALLBACK_TIMEOUT if isinstance(e.__cause__, httpx.TimeoutException) else FALLBACK_EXCEPTION
+        finally:
+            if holds_lease:
+                await search_leases.release(cache_key)
+    
+    # Fallback to mock data if needed
+    if using_mock_data:
+        logger.warning("Falling back to mock data. Reason: %s", mock_data_reason)
+        mock_fallbacks_total.inc(mock_data_category)
+        if mock_data_category not in (FALLBACK_CIRCUIT_OPEN, FALLBACK_RATE_LIMITED):
+            upstream_errors_total.inc("serpapi", mock_data_category)
+        # Fixture picked by query pattern; parsed once per fixture, so this costs no disk I/O
+        results = fixture_store.get(query_request.query)
+        if not results:
+            logger.error("Mock data not available")
+            raise HTTPException(status_code=500, detail="No valid search results available")
+        logger.info("Using mock data fallback")
+    
+    if not isinstance(results, dict):
+        logger.error("Unexpected response type: %s", type(results))
+        raise HTTPException(status_code=500, detail="Invalid response format")
+
+    # Normalize every section once; the stored row and the response body share them
+    with search_stage_seconds.time("normalize"):
+        sections = normalize_search_payload(results)
+    
+    # Reuse the AI answer for an identical query and snippet list; it is stored with the row
+    cached_ai_response = await ai_response_cache.get(
+        make_ai_fingerprint(query_request.query, extract_snippets(results.get("organic_results") or []))
+    )
+    if ai_response_cache.enabled:
+        cache_requests_total.inc("ai", "hit" if cached_ai_response is not None else "miss")
+    
+    # The sections are already JSON-ready, so skip re-validating them
+    search_result = SearchResult.model_construct(
+        query=query_request.query,
+        location=query_request.location,
+        ai_response=cached_ai_response,
+        using_mock_data=using_mock_data,
+        **stored_sections(sections)
+    )
+    
+    # Keep the recent-searches index current (in memory, upsert queued)
+    await recent_queries.record(query_request.query)
+    
+    # Try to save the search result, but continue if it fails
+    try:
+        # Save to database; the insert returns the persisted row, so it is validated in memory
+        with search_stage_seconds.time("db_insert"):
+            saved_result = await save_search_result(search_result)
+        search_id = saved_result["id"] if saved_result else search_result.id
+        logger.info("Search result saved with ID: %s", search_id)
         
-        # Fallback to mock data if needed
-        if using_mock_data:
-            logger.warning(f"Falling back to mock data. Reason: {mock_data_reason}")
-            if not mock_data:
-                logger.error("Mock data not available")
-                raise HTTPException(status_code=500, detail="No valid search results available")
-            
-            results = mock_data
-            logger.info("Using mock data fallback")
-        
-        if not isinstance(results, dict):
-            logger.error(f"Unexpected response type: {type(results)}")
-            raise HTTPException(status_code=500, detail="Invalid response format")
-
-        # Extract and normalize local results
-        local_results_data = []
-        if isinstance(results.get("local_results"), dict) and isinstance(results.get("local_results").get("places"), list):
-            local_results_data = results["local_results"]["places"]
-        
-        # Create separate components for SearchResult
-        organic_results_normalized = normalize_organic_results(results.get("organic_results", []))
-        local_results_normalized = normalize_local_results(local_results_data)
-        knowledge_graph_normalized = normalize_knowledge_graph(results.get("knowledge_graph"))
-        related_questions_normalized = [RelatedQuestion(**q) for q in results.get("related_questions", [])]
-        related_searches_normalized = extract_related_searches(results.get("related_searches", []))
-        
-        # Ensure all data is properly serializable
-        organic_results_serialized = [result.model_dump() for result in organic_results_normalized]
-        local_results_serialized = [result.model_dump() for result in local_results_normalized] if local_results_normalized else None
-        knowledge_graph_serialized = knowledge_graph_normalized.model_dump() if knowledge_graph_normalized else None
-        related_questions_serialized = [q.model_dump() for q in related_questions_normalized] if related_questions_normalized else None
-        
-        # Create a SearchResult object with all serialized data
-        search_result = SearchResult(
-            query=query_request.query,
-            organic_results=organic_results_serialized if organic_results_serialized else [], 
-            local_results=local_results_serialized,
-            knowledge_graph=knowledge_graph_serialized,
-            related_questions=related_questions_serialized,
-            related_searches=related_searches_normalized if related_searches_normalized else [],
-            inline_images=results.get("inline_images", []),
-            answer_box=results.get("answer_box"),
-            location=query_request.location
-        )
+        # Make the new results searchable with mode=local (indexed in the background)
+        if not using_mock_data:
+            local_index.add(search_id, query_request.query, sections["organic_results"])
         
-        # Try to save the search result, but continue if it fails
-        try:
-            # Save to database
-            search_id = await save_search_result(search_result)
-            logger.info(f"Search result saved with ID: {search_id}")
+        # If any essential search components are missing, repair the record off the request path
+        if saved_result and not saved_result.get("organic_results"):
+            logger.warning("Organic results missing in saved record, scheduling fallback fix")
+            # Ensure we have at least the raw search results even if normalized ones failed
+            organic_results_raw = results.get("organic_results", [])[:5]
             
-            # Verify the save was successful
-            saved_result = await get_search_result(search_id)
-            if saved_result:
-                # If any essential search components are missing, use a direct database update as a failsafe
-                if not saved_result.get("organic_results") or len(saved_result.get("organic_results", [])) == 0:
-                    logger.warning("Organic results missing in saved record, applying fallback fix")
-                    # Use direct db update to fix missing data
-                    try:
-                        # Ensure we have at least the raw search results even if normalized ones failed
-                        organic_results_raw = results.get("organic_results", [])[:5] if results else []
-                        
-                        update_data = {
-                            "organic_results": organic_results_raw if organic_results_raw else search_result.model_dump()["organic_results"],
-                            "knowledge_graph": results.get("knowledge_graph") if results else search_result.model_dump()["knowledge_graph"],
-                            "local_results": local_results_data if local_results_data else search_result.model_dump()["local_results"],
-                            "related_questions": results.get("related_questions", [])[:3] if results else search_result.model_dump()["related_questions"],
-                            "related_searches": extract_related_searches(results.get("related_searches", [])) if results else search_result.model_dump()["related_searches"]
-                        }
-                        
-                        supabase_client.table("search_results").update(update_data).eq("id", search_id).execute()
-                    except Exception as fallback_error:
-                        logger.error(f"Error applying fallback fix: {str(fallback_error)}")
-                
-        except Exception as db_error:
-            logger.error(f"Error saving search result: {str(db_error)}")
-            search_id = search_result.id
+            update_data = {
+                "organic_results": organic_results_raw if organic_results_raw else sections["organic_results"],
+                "knowledge_graph": results.get("knowledge_graph"),
+                "local_results": extract_local_places(results) or None,
+                "related_questions": results.get("related_questions", [])[:3],
+                "related_searches": sections["related_searches"]
+            }
+            
+            search_repairs.schedule(search_id, update_data)
+            
+    except Exception as db_error:
+        logger.error("Error saving search result: %s", db_error)
+        search_id = search_result.id
+    
+    # Count the query for type-ahead suggestions (in memory)
+    if not using_mock_data:
+        query_suggestions.add(search_id, query_request.query, sections["related_searches"])
+    
+    # Prepare the response body (already in its serialized shape)
+    response = {
+        "query": query_request.query,
+        **sections,
+        "ai_response": cached_ai_response,  # None until generated, unless cached
+        "search_id": search_id,  # Add the search ID to the response
+        "using_mock_data": using_mock_data,  # Add flag indicating mock data usage
+        "mock_data_reason": mock_data_reason if using_mock_data else None,  # Add reason for mock data use
+        "cache_status": cache_status
+    }
+    
+    if not using_mock_data:
+        # Warm the cache for the searches users are likely to click next
+        prefetch_scheduler.schedule_related(query_request, response["related_searches"] or [])
+    start_ai_generation(query_request, response, results.get("organic_results", []))
+    
+    return response
+
+async def execute_local_search(query_request: SearchQuery) -> Dict[str, Any]:
+    """
+    Answer a search from the local index of stored results, without SerpAPI.
+
+    Nothing is stored and no AI response is generated; ``related_searches``
+    lists the earlier queries that returned the best matches.
+    """
+    with search_stage_seconds.time("local_index"):
+        hits = await local_index.search(query_request.query, query_request.num_results)
+    normalized_query = normalize_query_text(query_request.query)
+    related_searches = list(dict.fromkeys(
+        hit["query"] for hit in hits if hit["query"] and normalize_query_text(hit["query"]) != normalized_query
+    ))
+    return {
+        "query": query_request.query,
+        "organic_results": [
+            {"title": hit["title"], "link": hit["link"], "snippet": hit["snippet"], "position": position, "thumbnail": hit["thumbnail"]}
+            for position, hit in enumerate(hits, start=1)
+        ],
+        "local_results": None,
+        "knowledge_graph": None,
+        "related_questions": None,
+        "related_searches": related_searches,
+        "inline_images": [],
+        "answer_box": None,
+        "ai_response": None,
+        "search_id": None,
+        "using_mock_data": False,
+        "mock_data_reason": None,
+        "cache_status": "local"
+    }
+
+@app.post("/api/search", response_model=SearchResponse, response_class=FastJSONResponse)
+async def search(query_request: SearchQuery):
+    if query_request.mode == "local":
+        if not local_index.enabled:
+            raise HTTPException(status_code=400, detail="Local search is disabled (LOCAL_INDEX_ENABLED=false)")
+        logger.info("Local search query received: %s", query_request.query)
+        return FastJSONResponse(content=await execute_local_search(query_request))
+    
+    try:
+        logger.info("Search query received: %s", query_request.query)
         
-        # Prepare the response
-        response = SearchResponse(
-            query=query_request.query,
-            organic_results=organic_results_normalized,
-            local_results=local_results_normalized,
-            knowledge_graph=knowledge_graph_normalized,
-            related_questions=related_questions_normalized,
-            related_searches=related_searches_normalized,
-            inline_images=results.get("inline_images", []),
-            answer_box=results.get("answer_box"),
-            ai_response=None,  # Initially set to None
-            search_id=search_id,  # Add the search ID to the response
-            using_mock_data=using_mock_data,  # Add flag indicating mock data usage
-            mock_data_reason=mock_data_reason if using_mock_data else None  # Add reason for mock data use
+        # Identical concurrent searches share one upstream fetch, stored row and AI generation
+        cache_key = make_search_cache_key(query_request)
+        response, leader = await search_flight.do(
+            cache_key,
+            lambda: execute_search(query_request, cache_key)
         )
         
-        # Start the DeepSeek API call asynchronously
-        background_tasks.add_task(
-            generate_ai_response,
-            query_request.query,
-            results.get("organic_results", []),
-            search_id
-        )
+        if not leader and response["query"] != query_request.query:
+            response = {**response, "query": query_request.query}
         
-        return response
+        # The body is built in its serialized shape; returning a Response skips
+        # FastAPI's second validation pass (SearchResponse still documents it)
+        return FastJSONResponse(content=response)
         
     except Exception as e:
-        logger.error(f"Error processing search request: {str(e)}")
+        logger.error("Error processing search request: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/search/{search_id}/ai_response")
@@ -368,6 +561,36 @@ async def get_ai_response(search_id: str):
     Get the AI-generated response for a specific search.
     """
     try:
+        # Generations finished by this process are answered from memory
+        stream = ai_streams.get(search_id)
+        if stream is not None and stream.done and not stream.error:
+            return {
+                "search_id": search_id,
+                "ai_response": stream.text,
+                "status": "complete"
+            }
+        
+        # Rejected by a full AI queue: report it instead of leaving the client polling
+        job_status = ai_jobs.status(search_id)
+        if job_status == JOB_REJECTED:
+            return {
+                "search_id": search_id,
+                "ai_response": None,
+                "status": "queue_full"
+            }
+        if job_status in (STATE_QUEUED, STATE_RUNNING):
+            return {
+                "search_id": search_id,
+                "ai_response": None,
+                "status": "pending"
+            }
+        if stream is not None and stream.error:
+            return {
+                "search_id": search_id,
+                "ai_response": None,
+                "status": "failed"
+            }
+        
         # Try to get the search result from the database
         try:
             search_record = await get_search_result(search_id)
@@ -379,7 +602,7 @@ async def get_ai_response(search_id: str):
                     "status": "complete"
                 }
         except Exception as db_error:
-            logger.error(f"Error retrieving search result: {str(db_error)}")
+            logger.error("Error retrieving search result: %s", db_error)
             
         # If we couldn't retrieve from database or the AI response is not ready yet
         return {
@@ -388,9 +611,49 @@ async def get_ai_response(search_id: str):
             "status": "pending"
         }
     except Exception as e:
-        logger.error(f"Error retrieving AI response: {str(e)}")
+        logger.error("Error retrieving AI response: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def ai_response_events(search_id: str):
+    stream = ai_streams.get(search_id)
+    
+    if stream is None:
+        # Not generated by this process; answer from the database if it is already stored
+        try:
+            search_record = await get_search_result(search_id)
+        except Exception as db_error:
+            logger.error("Error retrieving search result: %s", db_error)
+            search_record = None
+        
+        if search_record and search_record.get("ai_response"):
+            yield format_sse("done", {"search_id": search_id, "ai_response": search_record["ai_response"]})
+        else:
+            yield format_sse("pending", {"search_id": search_id})
+        return
+    
+    async for delta in stream.subscribe():
+        yield format_sse("token", {"content": delta})
+    
+    if stream.error:
+        yield format_sse("error", {"search_id": search_id, "error": stream.error})
+    else:
+        yield format_sse("done", {"search_id": search_id, "ai_response": stream.text})
+
+@app.get("/api/search/{search_id}/ai_response/stream")
+async def stream_ai_response(search_id: str):
+    """
+    Stream the AI-generated response for a specific search as Server-Sent Events.
+    
+    Emits ``token`` events as DeepSeek produces them, then ``done`` with the full
+    text (or ``error``). ``pending`` means the generation is not known to this
+    server and the client should fall back to polling.
+    """
+    return StreamingResponse(
+        ai_response_events(search_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/search/{search_id}/fix")
 async def fix_search_record(search_id: str):
     """
@@ -427,117 +690,58 @@ async def fix_search_record(search_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fixing search record: {str(e)}")
+        logger.error("Error fixing search record: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Add a new endpoint to get recent searches
 @app.get("/api/recent_searches")
 async def get_recent_searches(limit: int = 6):
     """
-    Retrieve the most recent search queries from the database.
+    Retrieve the most recent unique search queries.
     """
     try:
-        logger.info(f"Received request for recent searches with limit={limit}")
-        
-        if not supabase_client:
-            logger.warning("Supabase client not available. Cannot retrieve recent searches.")
-            return {"recent_searches": []}
-            
-        # Query the search_results table, order by timestamp desc, and select only unique queries
-        response = supabase_client.table("search_results") \
-            .select("query, timestamp") \
-            .order("timestamp", desc=True) \
-            .limit(limit * 3) \
-            .execute()  # Get more than needed to filter for unique values
-            
-        data = response.data
-        
-        if not data:
-            logger.info("No recent searches found")
-            return {"recent_searches": []}
-            
-        # Extract unique queries (case-insensitive) while preserving order
-        seen_queries = set()
-        unique_searches = []
+        logger.info("Received request for recent searches with limit=%s", limit)
         
-        for item in data:
-            query = item.get("query", "").strip()
-            query_lower = query.lower()
-            
-            if query and query_lower not in seen_queries:
-                seen_queries.add(query_lower)
-                unique_searches.append({
-                    "query": query,
-                    "timestamp": item.get("timestamp")
-                })
-                
-                if len(unique_searches) >= limit:
-                    break
+        # Served from the in-memory recent-queries buffer (the table past its capacity); unique per normalized query
+        unique_searches = await recent_queries.fetch(limit)
         
-        logger.info(f"Retrieved {len(unique_searches)} recent searches")
+        logger.info("Retrieved %s recent searches", len(unique_searches))
         return {"recent_searches": unique_searches}
         
     except Exception as e:
-        logger.error(f"Error retrieving recent searches: {str(e)}")
+        logger.error("Error retrieving recent searches: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve recent searches: {str(e)}")
 
+@app.get("/api/suggest")
+async def suggest(prefix: str = "", limit: int = 8):
+    """
+    Suggest past queries starting with ``prefix``, ranked by how often and how recently they were searched.
+    """
+    if not query_suggestions.enabled:
+        raise HTTPException(status_code=404, detail="Query suggestions are disabled")
+    return {"prefix": prefix, "suggestions": query_suggestions.suggest(prefix, limit)}
+
 @app.get("/api/debug")
 async def debug():
     """
-    Get debug information about the API and the last search.
+    Get debug information about the API and its upstreams.
+
+    Everything is read from memory: the SerpAPI probe runs in the background
+    health checker and the mock data metadata is computed at startup.
     """
-    try:
-        serpapi_key = os.getenv("SERPAPI_KEY", "Not found")
-        
-        # Mask the API key for security
-        masked_key = "Not found" if serpapi_key == "Not found" else f"{serpapi_key[:5]}...{serpapi_key[-5:]}"
-        
-        # Try a test query with SerpAPI directly
-        test_results = None
-        test_error = None
-        try:
-            params = {
-                "engine": "google",
-                "q": "test query",
-                "num": 1,
-                "api_key": serpapi_key,
-                "gl": "us",
-                "hl": "en"
-            }
-            search = GoogleSearch(params)
-            test_results = search.get_dict()
-            if "error" in test_results:
-                test_error = test_results.get("error")
-                test_results = None
-        except Exception as e:
-            test_error = str(e)
-        
-        # Get info about the mock data
-        mock_data_info = {
-            "available": mock_data is not None,
-            "path": MOCK_DATA_PATH,
-            "file_exists": os.path.exists(MOCK_DATA_PATH),
-            "sample": str(mock_data)[:100] + "..." if mock_data else None
+    serpapi_key = os.getenv("SERPAPI_KEY")
+    return {
+        "api_status": "ok",
+        "serpapi_key_available": serpapi_key is not None,
+        "serpapi_key_masked": f"{serpapi_key[:5]}...{serpapi_key[-5:]}" if serpapi_key else "Not found",
+        "serpapi_test": health_checker.last,
+        "upstreams": upstream_guard_stats(),
+        "mock_data": fixture_store.describe(),
+        "environment": {
+            "BACKEND_API_URL": os.getenv("BACKEND_API_URL", "Not set"),
+            "CORS_ORIGINS": os.getenv("CORS_ORIGINS", "Not set")
         }
-        
-        return {
-            "api_status": "ok",
-            "serpapi_key_available": serpapi_key != "Not found",
-            "serpapi_key_masked": masked_key,
-            "serpapi_test": {
-                "success": test_results is not None,
-                "error": test_error,
-                "sample": str(test_results)[:100] + "..." if test_results else None
-            },
-            "mock_data": mock_data_info,
-            "environment": {
-                "BACKEND_API_URL": os.getenv("BACKEND_API_URL", "Not set"),
-                "CORS_ORIGINS": os.getenv("CORS_ORIGINS", "Not set")
-            }
-        }
-    except Exception as e:
-        logger.error(f"Error in debug endpoint: {str(e)}")
-        return {"error": str(e)}
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
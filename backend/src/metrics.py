@@ -0,0 +1,231 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Metrics configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Latency buckets in seconds, from sub-millisecond in-process work to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels, e.g. ``errors.inc("serpapi", "timeout")``."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if METRICS_ENABLED:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Gauge:
+    """
+    Gauge read from a callback when metrics are rendered, so hot paths never update it.
+
+    With ``label_names`` the callback returns a dict of label tuples to values.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Any], label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.label_names = tuple(label_names)
+
+    def samples(self) -> Iterable[str]:
+        if not self.label_names:
+            yield f"{self.name} {_format_value(self.callback())}"
+            return
+        for labels, value in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with optional labels.
+
+    An observation is one bisect and two increments per label set; cumulative
+    bucket counts are only computed when ``/metrics`` is scraped.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self) -> Iterable[str]:
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class MetricsRegistry:
+    """Collects metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets or DEFAULT_BUCKETS))
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], Any], label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, callback, label_names))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.samples())
+            except Exception:
+                # A failing gauge callback must not break the whole scrape
+                continue
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry and the metrics recorded across the backend
+registry = MetricsRegistry()
+
+search_stage_seconds = registry.histogram(
+    "search_stage_seconds",
+    "Latency of each stage of the search and AI pipelines",
+    ["stage"],
+)
+http_request_seconds = registry.histogram(
+    "http_request_seconds",
+    "HTTP request latency by route and status",
+    ["method", "route", "status"],
+)
+mock_fallbacks_total = registry.counter(
+    "search_mock_fallbacks_total",
+    "Searches answered from mock data, by reason category",
+    ["reason"],
+)
+cache_requests_total = registry.counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+upstream_errors_total = registry.counter(
+    "upstream_errors_total",
+    "Errors returned by or raised while calling upstream services",
+    ["upstream", "kind"],
+)
+upstream_rejections_total = registry.counter(
+    "upstream_rejections_total",
+    "Upstream calls refused locally by the circuit breaker or rate limiter",
+    ["upstream", "reason"],
+)
+prefetch_total = registry.counter(
+    "search_prefetch_total",
+    "Speculative search prefetches, by source and outcome",
+    ["source", "outcome"],
+)
+circuit_transitions_total = registry.counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes, by the state entered",
+    ["upstream", "state"],
+)
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a scheduled tick",
+)
+event_loop_blocked_total = registry.counter(
+    "event_loop_blocked_total",
+    "Stalls where the event loop was blocked past the watchdog threshold",
+)
+
+
+# Mock-data fallback categories (the full reason text stays in logs and the response)
+FALLBACK_EMPTY_RESULTS = "empty_results"
+FALLBACK_API_ERROR = "api_error"
+FALLBACK_TIMEOUT = "timeout"
+FALLBACK_EXCEPTION = "exception"
+FALLBACK_CIRCUIT_OPEN = "circuit_open"
+FALLBACK_RATE_LIMITED = "rate_limited"
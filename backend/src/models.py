@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Literal
 from datetime import datetime
 import uuid
 
@@ -8,6 +8,8 @@ class SearchQuery(BaseModel):
     query: str
     num_results: int = 10
     location: Optional[str] = None
+    # "local" answers from the index of stored results instead of calling SerpAPI
+    mode: Literal["live", "local"] = "live"
 
 
 class OrganicResult(BaseModel):
@@ -52,12 +54,14 @@ class SearchResult(BaseModel):
     answer_box: Optional[Dict[str, Any]] = None
     ai_response: Optional[str] = None
     location: Optional[str] = None
+    using_mock_data: bool = False
 
 
 class AIResponse(BaseModel):
     search_id: str
     response: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    fingerprint: Optional[str] = None
 
 
 class SearchResponse(BaseModel):
@@ -71,9 +75,12 @@ class SearchResponse(BaseModel):
     answer_box: Optional[Dict[str, Any]] = None
     ai_response: Optional[str] = None
     search_id: Optional[str] = None
+    using_mock_data: bool = False
+    mock_data_reason: Optional[str] = None
+    cache_status: Optional[str] = None
 
 
 class AIResponseResult(BaseModel):
     search_id: str
     ai_response: Optional[str] = None
-    status: str = "pending" 
\ No newline at end of file
+    status: str = "pending"  # pending | complete | queue_full | failed 
\ No newline at end of file
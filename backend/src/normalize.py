@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Any
+
+# Knowledge graph keys that are not folded into ``attributes``
+KNOWLEDGE_GRAPH_FIELDS = ("title", "description")
+
+# Sections stored as null rather than an empty list in ``search_results``
+NULLABLE_SECTIONS = ("local_results", "related_questions")
+
+
+def normalize_organic_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not isinstance(results, list):
+        return []
+    return [
+        {
+            "title": result.get("title", ""),
+            "link": result.get("link", ""),
+            "snippet": result.get("snippet", ""),
+            "position": result.get("position", 0),
+            "thumbnail": result.get("thumbnail"),
+        }
+        for result in results
+        if isinstance(result, dict)
+    ]
+
+
+def normalize_local_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not isinstance(results, list):
+        return []
+    return [
+        {
+            "title": result.get("title", ""),
+            "address": result.get("address", ""),
+            "rating": result.get("rating"),
+            "reviews": result.get("reviews"),
+            "phone": result.get("phone"),
+            "website": result.get("website"),
+            "thumbnail": result.get("thumbnail"),
+        }
+        for result in results
+        if isinstance(result, dict)
+    ]
+
+
+def normalize_knowledge_graph(graph: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not graph or not isinstance(graph, dict):
+        return None
+    return {
+        "title": graph.get("title", ""),
+        "description": graph.get("description"),
+        "attributes": {key: value for key, value in graph.items() if key not in KNOWLEDGE_GRAPH_FIELDS},
+    }
+
+
+def normalize_related_questions(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not isinstance(questions, list):
+        return []
+    return [
+        {"question": question["question"], "snippet": question.get("snippet")}
+        for question in questions
+        if isinstance(question, dict) and "question" in question
+    ]
+
+
+def extract_related_searches(related_searches: List[Dict[str, Any]]) -> List[str]:
+    if not related_searches or not isinstance(related_searches, list):
+        return []
+    return [item.get("query", "") for item in related_searches if isinstance(item, dict) and "query" in item]
+
+
+def extract_local_places(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    local_results = results.get("local_results")
+    if isinstance(local_results, dict) and isinstance(local_results.get("places"), list):
+        return local_results["places"]
+    return []
+
+
+def normalize_search_payload(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize a raw SerpAPI payload in a single pass.
+
+    The returned sections are plain JSON-ready dicts and lists with the same
+    shape the API models would dump to. They are built once and shared by the
+    response body and, via ``stored_sections``, the ``search_results`` row, so
+    nothing is validated, dumped and re-validated on the way through.
+
+    Args:
+        results: Raw SerpAPI (or mock) payload
+
+    Returns:
+        Dict[str, Any]: The normalized sections, keyed by ``SearchResult`` field name
+    """
+    return {
+        "organic_results": normalize_organic_results(results.get("organic_results", [])),
+        "local_results": normalize_local_results(extract_local_places(results)),
+        "knowledge_graph": normalize_knowledge_graph(results.get("knowledge_graph")),
+        "related_questions": normalize_related_questions(results.get("related_questions", [])),
+        "related_searches": extract_related_searches(results.get("related_searches", [])),
+        "inline_images": results.get("inline_images", []),
+        "answer_box": results.get("answer_box"),
+    }
+
+
+def stored_sections(sections: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``sections`` as stored in a row: empty local results and related questions become null."""
+    return {**sections, **{key: sections[key] or None for key in NULLABLE_SECTIONS}}
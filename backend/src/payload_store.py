@@ -0,0 +1,314 @@
+import os
+import json
+import zlib
+import asyncio
+import hashlib
+import logging
+import argparse
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from .storage import StorageClient
+from .write_queue import WriteBehindQueue
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# How search_results stores SerpAPI sections: inline (JSONB columns) or content_addressed
+SEARCH_PAYLOAD_STORAGE = os.getenv("SEARCH_PAYLOAD_STORAGE", "inline").lower()
+PAYLOAD_COMPRESSION_LEVEL = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "3"))
+PAYLOAD_CACHE_SIZE = int(os.getenv("PAYLOAD_CACHE_SIZE", "256"))
+
+PAYLOAD_TABLE = "search_payloads"
+STORAGE_REPORT_VIEW = "search_payload_storage"
+
+# Sections moved into the payload table; related_searches is a short list of strings and stays inline
+PAYLOAD_SECTIONS = ("organic_results", "knowledge_graph", "local_results", "related_questions", "inline_images", "answer_box")
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+
+
+def canonical_payload(sections: Dict[str, Any]) -> Tuple[str, bytes]:
+    """
+    Serialize sections canonically and hash them.
+
+    Returns:
+        Tuple[str, bytes]: The sha256 hex digest and the canonical JSON it was computed over
+    """
+    data = json.dumps(sections, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest(), data
+
+
+def compress(data: bytes, level: int = PAYLOAD_COMPRESSION_LEVEL) -> Tuple[str, bytes]:
+    """Compress with zstd, or zlib when the zstandard package is not installed."""
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=level).compress(data)
+    return CODEC_ZLIB, zlib.compress(data, min(level, 9))
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd payload found but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown payload codec: {codec}")
+
+
+def _to_bytea(data: bytes) -> str:
+    # PostgREST reads and writes bytea columns as hex strings
+    return "\\x" + data.hex()
+
+
+def _from_bytea(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+
+
+class PayloadStore:
+    """
+    Content-addressed, compressed storage of search result sections.
+
+    In ``content_addressed`` mode the sections of a search row are hashed
+    (sha256 of their canonical JSON), compressed and written once to
+    ``search_payloads``; the ``search_results`` row only keeps the hash in
+    ``payload_hash``. Repeated queries therefore add a small row instead of
+    another copy of the payload, and rows are expanded again on read.
+
+    Decoded payloads are kept in a small in-process LRU. A separate bounded
+    set of hashes whose insert the database has confirmed lets the writer skip
+    payloads it already stored; a payload whose insert is still queued or was
+    dropped is sent again. Sections set directly on a row (e.g. by a later
+    repair) take precedence over the referenced payload.
+    """
+
+    def __init__(
+        self,
+        client: StorageClient,
+        queue: Optional[WriteBehindQueue] = None,
+        mode: str = SEARCH_PAYLOAD_STORAGE,
+        level: int = PAYLOAD_COMPRESSION_LEVEL,
+        cache_size: int = PAYLOAD_CACHE_SIZE,
+    ):
+        self.client = client
+        self.queue = queue
+        self.mode = mode
+        self.level = level
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stored: "OrderedDict[str, None]" = OrderedDict()
+
+        self.packed = 0
+        self.deduplicated = 0
+        self.payloads_written = 0
+        self.logical_bytes = 0
+        self.stored_bytes = 0
+        self.expanded = 0
+        self.fetched = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "content_addressed"
+
+    def _remember(self, payload_hash: str, sections: Dict[str, Any]) -> None:
+        self._cache[payload_hash] = sections
+        self._cache.move_to_end(payload_hash)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _mark_stored(self, payload_hash: str) -> None:
+        """Record that ``search_payloads`` holds ``payload_hash``; call only once the insert succeeded."""
+        self._stored[payload_hash] = None
+        self._stored.move_to_end(payload_hash)
+        while len(self._stored) > self.cache_size:
+            self._stored.popitem(last=False)
+
+    def encode(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], str, Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Split a search row into its compact form and payload.
+
+        Returns:
+            Tuple: The row without sections but with ``payload_hash``, the hash, the
+            sections, and the ``search_payloads`` row to write (None if this
+            process has confirmed it is stored)
+        """
+        sections = {key: row.get(key) for key in PAYLOAD_SECTIONS}
+        payload_hash, data = canonical_payload(sections)
+        compact = {key: value for key, value in row.items() if key not in PAYLOAD_SECTIONS}
+        compact["payload_hash"] = payload_hash
+
+        self.packed += 1
+        self.logical_bytes += len(data)
+        if payload_hash in self._stored:
+            self.deduplicated += 1
+            self._stored.move_to_end(payload_hash)
+            return compact, payload_hash, sections, None
+
+        codec, compressed = compress(data, self.level)
+        self.payloads_written += 1
+        self.stored_bytes += len(compressed)
+        payload_row = {
+            "hash": payload_hash,
+            "codec": codec,
+            "data": _to_bytea(compressed),
+            "raw_size": len(data),
+            "stored_size": len(compressed),
+        }
+        return compact, payload_hash, sections, payload_row
+
+    async def pack(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a search row's sections by hash and return the row to insert.
+
+        The payload goes through the write queue ahead of the row (payloads are
+        flushed first), so the row's foreign key always resolves. Its hash
+        counts as stored only once the queue confirms the insert.
+        """
+        compact, payload_hash, sections, payload_row = self.encode(row)
+        if payload_row is not None:
+            await self.queue.insert(
+                PAYLOAD_TABLE, payload_row, on_conflict="hash",
+                on_written=lambda: self._mark_stored(payload_hash)
+            )
+        self._remember(payload_hash, sections)
+        return compact
+
+    async def _sections(self, payload_hash: str) -> Optional[Dict[str, Any]]:
+        sections = self._cache.get(payload_hash)
+        if sections is not None:
+            self._cache.move_to_end(payload_hash)
+            return sections
+        rows = await self.client.select(PAYLOAD_TABLE, columns="codec,data", filters={"hash": f"eq.{payload_hash}"})
+        if not rows:
+            logger.error("Search payload %s not found", payload_hash)
+            return None
+        self.fetched += 1
+        sections = json.loads(decompress(rows[0]["codec"], _from_bytea(rows[0]["data"])))
+        self._remember(payload_hash, sections)
+        return sections
+
+    async def expand(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return a copy of ``row`` with its referenced sections filled back in.
+
+        Rows without ``payload_hash`` (inline storage) are returned unchanged.
+        Section values are shared with the payload cache; do not mutate them.
+        """
+        payload_hash = row.get("payload_hash")
+        if not payload_hash:
+            return row
+        sections = await self._sections(payload_hash)
+        row = dict(row)
+        if sections:
+            self.expanded += 1
+            for key in PAYLOAD_SECTIONS:
+                if row.get(key) is None:
+                    row[key] = sections.get(key)
+        return row
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "codec": CODEC_ZSTD if zstandard is not None else CODEC_ZLIB,
+            "packed": self.packed,
+            "deduplicated": self.deduplicated,
+            "payloads_written": self.payloads_written,
+            "logical_bytes": self.logical_bytes,
+            "stored_bytes": self.stored_bytes,
+            "saved_bytes": self.logical_bytes - self.stored_bytes,
+            "expanded": self.expanded,
+            "fetched": self.fetched,
+            "cached": len(self._cache),
+        }
+
+
+async def migrate_inline_rows(store: PayloadStore, batch_size: int = 100) -> Dict[str, int]:
+    """
+    Move inline sections of existing search_results rows into search_payloads.
+
+    Run after ``supabase/payload_storage.sql``. Rows are processed in batches
+    until none without ``payload_hash`` are left, so an interrupted run can
+    simply be restarted.
+
+    Returns:
+        Dict[str, int]: Rows migrated, payloads written and bytes before/after
+    """
+    client = store.client
+    columns = ",".join(("id",) + PAYLOAD_SECTIONS)
+    migrated = 0
+    while True:
+        rows = await client.select(
+            "search_results",
+            columns=columns,
+            filters={"payload_hash": "is.null"},
+            order="id",
+            limit=batch_size
+        )
+        if not rows:
+            break
+        payload_rows: Dict[str, Dict[str, Any]] = {}
+        updates: List[Tuple[str, str]] = []
+        for row in rows:
+            _, payload_hash, _, payload_row = store.encode(row)
+            if payload_row is not None:
+                payload_rows[payload_hash] = payload_row
+            updates.append((row["id"], payload_hash))
+        if payload_rows:
+            await client.insert(PAYLOAD_TABLE, list(payload_rows.values()), on_conflict="hash")
+            for payload_hash in payload_rows:
+                store._mark_stored(payload_hash)
+        cleared = {key: None for key in PAYLOAD_SECTIONS}
+        for row_id, payload_hash in updates:
+            await client.update("search_results", dict(cleared, payload_hash=payload_hash), {"id": f"eq.{row_id}"})
+        migrated += len(rows)
+        logger.info("Migrated %s search rows (%s payloads written so far)", migrated, store.payloads_written)
+    return {
+        "rows": migrated,
+        "payloads": store.payloads_written,
+        "logical_bytes": store.logical_bytes,
+        "stored_bytes": store.stored_bytes,
+    }
+
+
+async def storage_report(client: StorageClient) -> Dict[str, Any]:
+    """Read the storage totals computed by the ``search_payload_storage`` view."""
+    rows = await client.select(STORAGE_REPORT_VIEW)
+    return rows[0] if rows else {}
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from .db import create_storage_client
+
+    client = create_storage_client()
+    if client is None:
+        raise SystemExit("No storage backend configured (see DB_BACKEND)")
+    try:
+        if args.command == "migrate":
+            store = PayloadStore(client, mode="content_addressed", level=args.level)
+            result = await migrate_inline_rows(store, args.batch_size)
+            print(f"Migrated {result['rows']} rows into {result['payloads']} payloads: "
+                  f"{result['logical_bytes']} bytes of JSON stored in {result['stored_bytes']} bytes")
+        report = await storage_report(client)
+        for key, value in report.items():
+            print(f"{key:>24}: {value}")
+    finally:
+        await client.close()
+
+
+# Move existing rows to content-addressed storage and report the space saved:
+#   python -m src.payload_store migrate
+#   python -m src.payload_store report
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Content-addressed search payload storage")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="move inline sections of existing rows into search_payloads")
+    migrate.add_argument("--batch-size", type=int, default=100)
+    migrate.add_argument("--level", type=int, default=PAYLOAD_COMPRESSION_LEVEL, help="compression level")
+    subcommands.add_parser("report", help="print storage totals from the search_payload_storage view")
+    asyncio.run(_main(parser.parse_args()))
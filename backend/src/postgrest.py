@@ -0,0 +1,153 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from .storage import StorageClient
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration for the Supabase REST API
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "10"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", str(DB_POOL_MAX_CONNECTIONS)))
+
+
+class PostgrestError(Exception):
+    """Raised when PostgREST answers with an error status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"PostgREST error {status_code}: {message}")
+        self.status_code = status_code
+
+
+class AsyncPostgrestClient(StorageClient):
+    """
+    Minimal async client for the Supabase PostgREST API.
+
+    Uses one pooled ``httpx.AsyncClient`` so database calls never block the
+    event loop and reuse connections. Only the operations the app needs are
+    implemented: multi-row insert/upsert, filtered update and select.
+    """
+
+    name = "supabase"
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        timeout: float = DB_TIMEOUT,
+        max_connections: int = DB_POOL_MAX_CONNECTIONS,
+        max_keepalive: int = DB_POOL_MAX_KEEPALIVE,
+    ):
+        super().__init__()
+        self.base_url = url.rstrip("/") + "/rest/v1"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        }
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so scripts that never run the app lifespan still work
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> List[Dict[str, Any]]:
+        self.requests += 1
+        response = await self.client.request(method, path, **kwargs)
+        if response.status_code >= 400:
+            raise PostgrestError(response.status_code, response.text[:500])
+        if not response.content:
+            return []
+        data = response.json()
+        return data if isinstance(data, list) else [data]
+
+    async def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        returning: bool = False,
+        on_conflict: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert one or more rows in a single multi-row statement.
+
+        Args:
+            table: Table name
+            rows: Rows to insert
+            returning: Return the persisted rows (``Prefer: return=representation``)
+            on_conflict: Column(s) to upsert on; conflicting rows are merged
+
+        Returns:
+            List[Dict[str, Any]]: The persisted rows when ``returning`` is set, else an empty list
+        """
+        prefer = ["return=representation" if returning else "return=minimal"]
+        params = {}
+        if on_conflict:
+            prefer.append("resolution=merge-duplicates")
+            params["on_conflict"] = on_conflict
+        if len(rows) > 1:
+            # Rows may not share every key; name the columns so missing ones become NULL
+            columns = []
+            for row in rows:
+                columns.extend(key for key in row if key not in columns)
+            params["columns"] = ",".join(columns)
+        return await self._request(
+            "POST",
+            f"/{table}",
+            params=params,
+            json=rows if len(rows) > 1 else rows[0],
+            headers={"Prefer": ",".join(prefer)},
+        )
+
+    async def update(
+        self,
+        table: str,
+        values: Dict[str, Any],
+        filters: Dict[str, str],
+        returning: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update the rows matching ``filters`` (PostgREST syntax, e.g. ``{"id": "eq.<id>"}``).
+        """
+        return await self._request(
+            "PATCH",
+            f"/{table}",
+            params=filters,
+            json=values,
+            headers={"Prefer": "return=representation" if returning else "return=minimal"},
+        )
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Dict[str, str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        params = {"select": columns}
+        if filters:
+            params.update(filters)
+        if order:
+            params["order"] = order
+        if limit is not None:
+            params["limit"] = str(limit)
+        return await self._request("GET", f"/{table}", params=params)
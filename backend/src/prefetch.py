@@ -0,0 +1,325 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+from .models import SearchQuery
+from .cache import search_cache, make_search_cache_key
+from .serpapi_client import serpapi_client, SERPAPI_MAX_CONCURRENCY
+from .resilience import CIRCUIT_CLOSED, UpstreamUnavailable
+from .shared_state import shared_store
+from .suggest import query_suggestions
+from .recent import recent_queries
+from .metrics import prefetch_total
+
+logger = logging.getLogger(__name__)
+
+# Speculative prefetch configuration
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+# Upstream calls prefetching may make per minute, across all workers sharing the store
+PREFETCH_MAX_PER_MINUTE = int(os.getenv("PREFETCH_MAX_PER_MINUTE", "30"))
+PREFETCH_RELATED_PER_QUERY = int(os.getenv("PREFETCH_RELATED_PER_QUERY", "2"))
+PREFETCH_TRENDING_COUNT = int(os.getenv("PREFETCH_TRENDING_COUNT", "10"))
+PREFETCH_TRENDING_INTERVAL = float(os.getenv("PREFETCH_TRENDING_INTERVAL", "120"))
+PREFETCH_QUEUE_SIZE = int(os.getenv("PREFETCH_QUEUE_SIZE", "100"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+# Prefetch only while fewer SerpAPI requests than this are in flight; the rest
+# of SERPAPI_MAX_CONCURRENCY is left to live searches
+PREFETCH_MAX_IN_FLIGHT = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", str(SERPAPI_MAX_CONCURRENCY // 2)))
+
+SOURCE_RELATED = "related"
+SOURCE_TRENDING = "trending"
+
+# Outcomes counted in stats and the search_prefetch_total metric
+OUTCOME_FETCHED = "fetched"
+OUTCOME_USED = "used"
+OUTCOME_EXPIRED = "expired"
+OUTCOME_CACHED = "skipped_cached"
+OUTCOME_BUDGET = "skipped_budget"
+OUTCOME_UNAVAILABLE = "skipped_unavailable"
+OUTCOME_DROPPED = "dropped"
+OUTCOME_FAILED = "failed"
+
+# Seconds between checks while waiting for SerpAPI concurrency to free up
+CAPACITY_POLL_INTERVAL = 0.05
+# Most prefetched keys tracked for hit accounting
+TRACKED_KEYS = 10000
+
+PrefetchFetch = Callable[[SearchQuery, str], Awaitable[bool]]
+
+
+class PrefetchScheduler:
+    """
+    Warms the search result cache with queries users are likely to run next.
+
+    After a search is served, its top related searches are queued; every
+    ``trending_interval`` seconds the most popular recent queries are queued
+    too, so they stay cached. The newest queued searches are fetched first
+    (a user is about to click them), and the oldest are dropped when the
+    queue is full.
+
+    A few background workers fetch them, only when that does not compete
+    with live traffic: fewer than ``max_in_flight`` SerpAPI requests running,
+    the circuit closed, and a rate-limit token free right away (prefetches
+    never wait for one). Upstream calls are also capped at ``max_per_minute``,
+    counted in the shared store so the budget holds across workers.
+
+    Each prefetched cache key is tracked until a live search looks it up, so
+    ``stats`` can report how many prefetches were used before they expired
+    and how much upstream time they saved users.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = PREFETCH_ENABLED,
+        max_per_minute: int = PREFETCH_MAX_PER_MINUTE,
+        related_per_query: int = PREFETCH_RELATED_PER_QUERY,
+        trending_count: int = PREFETCH_TRENDING_COUNT,
+        trending_interval: float = PREFETCH_TRENDING_INTERVAL,
+        max_size: int = PREFETCH_QUEUE_SIZE,
+        concurrency: int = PREFETCH_CONCURRENCY,
+        max_in_flight: int = PREFETCH_MAX_IN_FLIGHT,
+    ):
+        self.enabled = enabled
+        self.max_per_minute = max_per_minute
+        self.related_per_query = related_per_query
+        self.trending_count = trending_count
+        self.trending_interval = trending_interval
+        self.max_size = max_size
+        self.concurrency = max(1, concurrency)
+        self.max_in_flight = max_in_flight
+        self._fetch: Optional[PrefetchFetch] = None
+        # (source, request, cache key), newest last
+        self._queue: Optional[deque] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._trending: Optional[asyncio.Task] = None
+        # Cache keys queued or being fetched
+        self._pending: set = set()
+        # Prefetched cache key -> (source, upstream seconds, monotonic time fetched)
+        self._prefetched: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+
+        self.scheduled = 0
+        self.fetched = 0
+        self.used = 0
+        self.expired = 0
+        self.saved_seconds = 0.0
+        self.skipped: Dict[str, int] = {OUTCOME_CACHED: 0, OUTCOME_BUDGET: 0, OUTCOME_UNAVAILABLE: 0}
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def active(self) -> bool:
+        return self._queue is not None
+
+    async def start(self, fetch: PrefetchFetch) -> None:
+        """
+        Start prefetching with ``fetch``.
+
+        Args:
+            fetch: Coroutine function that fetches a search into the result cache
+                with the given cache key, returning whether it did
+        """
+        if not self.enabled:
+            return
+        if not search_cache.enabled:
+            logger.warning("Prefetching needs the search cache (SEARCH_CACHE_ENABLED); not starting it")
+            return
+        self._fetch = fetch
+        if self._queue is None:
+            self._queue = deque()
+            self._ready = asyncio.Event()
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        if self.trending_interval > 0 and self.trending_count > 0 and (self._trending is None or self._trending.done()):
+            self._trending = asyncio.create_task(self._trending_loop())
+
+    async def close(self) -> None:
+        """Stop prefetching; queued prefetches are dropped."""
+        for task in [self._trending] + self._workers:
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._trending = None
+        self._workers = []
+        self._queue = None
+        self._pending.clear()
+
+    def _count(self, source: str, outcome: str) -> None:
+        prefetch_total.inc(source, outcome)
+
+    def schedule(self, queries: List[str], source: str, num_results: int = 10, location: Optional[str] = None) -> int:
+        """
+        Queue searches to prefetch without waiting for them.
+
+        Returns:
+            int: Number of searches queued (duplicates of queued ones are skipped)
+        """
+        if self._queue is None:
+            return 0
+        queued = 0
+        for query in queries:
+            if not query or not query.strip():
+                continue
+            query_request = SearchQuery(query=query, num_results=num_results, location=location)
+            cache_key = make_search_cache_key(query_request)
+            if cache_key in self._pending:
+                continue
+            if len(self._queue) >= self.max_size:
+                # The oldest queued search is the least likely to be asked for soon
+                old_source, _, old_key = self._queue.popleft()
+                self._pending.discard(old_key)
+                self.dropped += 1
+                self._count(old_source, OUTCOME_DROPPED)
+            self._queue.append((source, query_request, cache_key))
+            self._pending.add(cache_key)
+            self.scheduled += 1
+            queued += 1
+        if queued:
+            self._ready.set()
+        return queued
+
+    def schedule_related(self, query_request: SearchQuery, related_searches: List[str]) -> int:
+        """Queue the top related searches of a served search, with the same options."""
+        return self.schedule(
+            related_searches[:self.related_per_query],
+            SOURCE_RELATED,
+            query_request.num_results,
+            query_request.location,
+        )
+
+    def trending_queries(self) -> List[str]:
+        """The most searched queries lately, from the suggestion index or else the recent-queries buffer."""
+        if query_suggestions.enabled and query_suggestions.loaded:
+            return query_suggestions.popular(self.trending_count)
+        return [item["query"] for item in recent_queries.get(self.trending_count)]
+
+    async def _trending_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.trending_interval)
+            try:
+                self.schedule(self.trending_queries(), SOURCE_TRENDING)
+            except Exception as e:
+                logger.error("Failed to schedule trending prefetches: %s", e)
+
+    def record_lookup(self, cache_key: str, hit: bool) -> None:
+        """
+        Account for a live search of ``cache_key``, called after its cache lookup.
+
+        A hit on a prefetched key counts as used (once); a miss means the
+        prefetched entry expired or was evicted before anyone asked for it.
+        """
+        if not self._prefetched:
+            return
+        entry = self._prefetched.pop(cache_key, None)
+        if entry is None:
+            return
+        source, upstream_seconds, _ = entry
+        if hit:
+            self.used += 1
+            self.saved_seconds += upstream_seconds
+            self._count(source, OUTCOME_USED)
+        else:
+            self.expired += 1
+            self._count(source, OUTCOME_EXPIRED)
+
+    def _track(self, cache_key: str, source: str, upstream_seconds: float) -> None:
+        self._prefetched[cache_key] = (source, upstream_seconds, time.monotonic())
+        self._prefetched.move_to_end(cache_key)
+        # Entries older than the cache TTL can no longer be used
+        deadline = time.monotonic() - search_cache.ttl
+        while self._prefetched:
+            key, (old_source, _, fetched_at) = next(iter(self._prefetched.items()))
+            if fetched_at > deadline and len(self._prefetched) <= TRACKED_KEYS:
+                break
+            del self._prefetched[key]
+            self.expired += 1
+            self._count(old_source, OUTCOME_EXPIRED)
+
+    async def _take_budget(self) -> bool:
+        if self.max_per_minute <= 0:
+            return True
+        minute = int(time.time() // 60)
+        try:
+            count = await shared_store.incr(f"prefetch:budget:{minute}", 1, 120)
+        except Exception as e:
+            logger.error("Prefetch budget check failed: %s", e)
+            return False
+        return count <= self.max_per_minute
+
+    async def _wait_for_capacity(self) -> None:
+        while serpapi_client.in_flight >= self.max_in_flight:
+            await asyncio.sleep(CAPACITY_POLL_INTERVAL)
+
+    def _skip(self, source: str, outcome: str) -> None:
+        self.skipped[outcome] += 1
+        self._count(source, outcome)
+
+    async def _prefetch(self, source: str, query_request: SearchQuery, cache_key: str) -> None:
+        if await search_cache.contains(cache_key):
+            self._skip(source, OUTCOME_CACHED)
+            return
+        await self._wait_for_capacity()
+        if serpapi_client.guard.breaker.state != CIRCUIT_CLOSED:
+            self._skip(source, OUTCOME_UNAVAILABLE)
+            return
+        if not await self._take_budget():
+            self._skip(source, OUTCOME_BUDGET)
+            return
+        start = time.perf_counter()
+        try:
+            fetched = await self._fetch(query_request, cache_key)
+        except UpstreamUnavailable:
+            self._skip(source, OUTCOME_UNAVAILABLE)
+            return
+        if not fetched:
+            self.failed += 1
+            self._count(source, OUTCOME_FAILED)
+            return
+        self.fetched += 1
+        self._count(source, OUTCOME_FETCHED)
+        self._track(cache_key, source, time.perf_counter() - start)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            source, query_request, cache_key = self._queue.pop()
+            try:
+                await self._prefetch(source, query_request, cache_key)
+            except Exception as e:
+                self.failed += 1
+                self._count(source, OUTCOME_FAILED)
+                logger.error("Prefetch of %r failed: %s", query_request.query, e)
+            finally:
+                self._pending.discard(cache_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "max_per_minute": self.max_per_minute,
+            "queue_depth": len(self._queue) if self._queue is not None else 0,
+            "scheduled": self.scheduled,
+            "fetched": self.fetched,
+            "used": self.used,
+            # Share of upstream calls spent on prefetches that a user then hit
+            "hit_ratio": round(self.used / self.fetched, 4) if self.fetched else 0.0,
+            "expired": self.expired,
+            "outstanding": len(self._prefetched),
+            "saved_seconds": round(self.saved_seconds, 3),
+            "skipped": dict(self.skipped),
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+# Shared prefetch scheduler
+prefetch_scheduler = PrefetchScheduler()
@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from .cache import normalize_query_text
+from .db import save_recent_query, get_recent_query_rows
+
+logger = logging.getLogger(__name__)
+
+# Recent-queries configuration
+RECENT_QUERIES_CAPACITY = int(os.getenv("RECENT_QUERIES_CAPACITY", "50"))
+RECENT_QUERIES_REFRESH_INTERVAL = float(os.getenv("RECENT_QUERIES_REFRESH_INTERVAL", "30"))
+
+
+class RecentQueries:
+    """
+    In-memory ring buffer of the most recent unique queries.
+
+    Each search moves its normalized query to the front and queues an upsert
+    into the ``recent_queries`` table. A background task periodically reloads
+    the buffer from that table so queries served by other workers show up,
+    re-applying local searches made since the previous refresh (their upserts
+    may still be queued). Reads within the buffer's capacity never touch the
+    database.
+    """
+
+    def __init__(self, capacity: int = RECENT_QUERIES_CAPACITY, refresh_interval: float = RECENT_QUERIES_REFRESH_INTERVAL):
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        # normalized query -> entry, oldest first
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+        self._last_refresh_started = 0.0
+        self.recorded = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    async def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def _push(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    async def record(self, query: str) -> None:
+        """Move ``query`` to the front of the buffer and queue its upsert."""
+        query = query.strip()
+        key = normalize_query_text(query)
+        if not key:
+            return
+        timestamp = datetime.now(timezone.utc).isoformat()
+        self._push(key, {"query": query, "timestamp": timestamp, "recorded_at": time.monotonic()})
+        self.recorded += 1
+        await save_recent_query(key, query, timestamp)
+
+    def get(self, limit: int) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` unique queries, newest first."""
+        recent = []
+        for entry in reversed(self._entries.values()):
+            if len(recent) >= limit:
+                break
+            recent.append({"query": entry["query"], "timestamp": entry["timestamp"]})
+        return recent
+
+    async def fetch(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return up to ``limit`` unique queries, newest first.
+
+        Limits beyond the buffer's capacity are topped up from the
+        recent_queries table, after the buffered (possibly unflushed) entries.
+        """
+        recent = self.get(limit)
+        if limit <= self.capacity:
+            return recent
+        seen = {normalize_query_text(entry["query"]) for entry in recent}
+        for row in await get_recent_query_rows(limit):
+            if len(recent) >= limit:
+                break
+            if row["normalized_query"] not in seen:
+                seen.add(row["normalized_query"])
+                recent.append({"query": row["query"], "timestamp": row["timestamp"]})
+        return recent
+
+    async def refresh(self) -> None:
+        """Reload the buffer from the recent_queries table."""
+        previous_refresh = self._last_refresh_started
+        self._last_refresh_started = time.monotonic()
+        rows = await get_recent_query_rows(self.capacity)
+        if not rows:
+            return
+
+        entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for row in reversed(rows):
+            entries[row["normalized_query"]] = {"query": row["query"], "timestamp": row["timestamp"], "recorded_at": 0.0}
+        # Local searches since the previous refresh may not be flushed yet
+        local = [(key, entry) for key, entry in self._entries.items() if entry["recorded_at"] >= previous_refresh]
+        self._entries = entries
+        for key, entry in local:
+            self._push(key, entry)
+        self.refreshes += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.error("Failed to refresh recent queries: %s", e)
+            await asyncio.sleep(self.refresh_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "recorded": self.recorded,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+# Shared recent-queries buffer
+recent_queries = RecentQueries()
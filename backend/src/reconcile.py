@@ -0,0 +1,102 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+from .db import update_search_result
+from .metrics import search_stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of repairs waiting to be applied
+SEARCH_REPAIR_QUEUE_SIZE = int(os.getenv("SEARCH_REPAIR_QUEUE_SIZE", "500"))
+
+
+class SearchRepairJob:
+    """
+    Background reconciliation of stored searches with missing components.
+
+    The search handler validates the persisted row in memory and, when
+    essential components are missing, schedules the repair here instead of
+    issuing another database update on the request path.
+    """
+
+    def __init__(self, max_size: int = SEARCH_REPAIR_QUEUE_SIZE):
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.scheduled = 0
+        self.applied = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def _ensure_worker(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def start(self) -> None:
+        self._ensure_worker()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Search repairs did not finish within %ss", timeout)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def schedule(self, search_id: str, update_data: Dict[str, Any]) -> bool:
+        """
+        Queue a repair without waiting for it.
+        
+        Returns:
+            bool: False if the queue is full and the repair was dropped
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((search_id, update_data))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error("Search repair queue is full, dropping repair for ID: %s", search_id)
+            return False
+        self.scheduled += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            search_id, update_data = await self._queue.get()
+            try:
+                with search_stage_seconds.time("repair_update"):
+                    applied = await update_search_result(search_id, update_data)
+                if applied:
+                    self.applied += 1
+                    logger.info("Applied fallback fix for search ID: %s", search_id)
+                else:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Error applying fallback fix: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "scheduled": self.scheduled,
+            "applied": self.applied,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+# Shared reconciliation job
+search_repairs = SearchRepairJob()
@@ -0,0 +1,218 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+from .metrics import upstream_rejections_total, circuit_transitions_total
+from .shared_state import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Reasons an upstream call is refused without being sent
+REJECT_CIRCUIT_OPEN = "circuit_open"
+REJECT_RATE_LIMITED = "rate_limited"
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose circuit is open or whose rate limit is exhausted."""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class RateLimiter:
+    """
+    Token bucket limiting calls to ``rate`` per second with bursts of ``burst``.
+
+    When the shared store is cross-process, the bucket lives in the store so
+    the limit is enforced for all workers together. A rate of 0 disables the
+    limiter.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, store: SharedStore = shared_store):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.store = store
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self.limited = 0
+
+    def _take_local(self) -> float:
+        """Take a token; returns 0, or the seconds until the next one is available."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def _take_shared(self) -> float:
+        # An idle bucket refills completely after burst / rate seconds, so it can expire then
+        return await self.store.take_token(f"ratelimit:{self.name}", self.rate, self.burst, self.burst / self.rate + 1)
+
+    async def _take_shared_or_local(self) -> float:
+        try:
+            return await self._take_shared()
+        except Exception as e:
+            # Fall back to this worker's own bucket rather than failing the call
+            logger.error("Shared rate limit check for %s failed: %s", self.name, e)
+            return self._take_local()
+
+    async def acquire(self, max_wait: float) -> bool:
+        """Take a token, waiting up to ``max_wait`` seconds for one. Returns False if none came."""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = await self._take_shared_or_local() if self.store.shared else self._take_local()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                self.limited += 1
+                return False
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "shared": self.store.shared,
+            "limited": self.limited,
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    are refused immediately. Once ``reset_timeout`` has passed, up to
+    ``half_open_max`` probe calls are let through: a success closes the circuit,
+    a failure opens it for another ``reset_timeout``. State is per process.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, half_open_max: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_at = 0.0
+        self.opened = 0
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit for %s changed from %s to %s", self.name, self.state, state)
+        self.state = state
+        circuit_transitions_total.inc(self.name, state)
+
+    def allow(self) -> bool:
+        if self.state == CIRCUIT_CLOSED or self.failure_threshold <= 0:
+            return True
+        if self.state == CIRCUIT_OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._transition(CIRCUIT_HALF_OPEN)
+            self.probes = 0
+        # A probe that never reported back (cancelled, rate limited) frees its slot after reset_timeout
+        if self.probes >= self.half_open_max and time.monotonic() - self.probe_at < self.reset_timeout:
+            return False
+        if self.probes >= self.half_open_max:
+            self.probes = 0
+        self.probes += 1
+        self.probe_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CIRCUIT_CLOSED:
+            self._transition(CIRCUIT_CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or (self.state == CIRCUIT_CLOSED and 0 < self.failure_threshold <= self.failures):
+            self.opened_at = time.monotonic()
+            self.opened += 1
+            self._transition(CIRCUIT_OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = self.reset_timeout - (time.monotonic() - self.opened_at) if self.state == CIRCUIT_OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_in": round(max(0.0, retry_in), 3),
+            "times_opened": self.opened,
+        }
+
+
+class UpstreamGuard:
+    """Rate limiter and circuit breaker in front of one upstream service."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_wait: float,
+        failure_threshold: int,
+        reset_timeout: float,
+    ):
+        self.name = name
+        self.max_wait = max_wait
+        self.limiter = RateLimiter(name, rate, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.rejected = 0
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        upstream_rejections_total.inc(self.name, reason)
+        raise UpstreamUnavailable(self.name, reason)
+
+    async def admit(self, max_wait: Optional[float] = None) -> None:
+        """
+        Wait for permission to call the upstream.
+
+        Args:
+            max_wait: Seconds to wait for a rate-limit token, instead of the
+                guard's own ``max_wait`` (0 for calls that only use spare capacity)
+
+        Raises:
+            UpstreamUnavailable: If the circuit is open or no rate-limit token
+            became available within ``max_wait``
+        """
+        if not self.breaker.allow():
+            self._reject(REJECT_CIRCUIT_OPEN)
+        if not await self.limiter.acquire(self.max_wait if max_wait is None else max_wait):
+            self._reject(REJECT_RATE_LIMITED)
+
+    def record_success(self) -> None:
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "rate_limit": self.limiter.stats(),
+            "rejected": self.rejected,
+        }
+
+
+# Numeric circuit state for the metrics gauge
+CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
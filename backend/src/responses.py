@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import logging
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .metrics import search_stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# JSON encoder for large response bodies: json (stdlib, default), orjson, msgspec or auto
+JSON_ENCODER = os.getenv("JSON_ENCODER", "json").lower()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _default(value: Any) -> Any:
+    """Encode the few non-JSON types response bodies may contain."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_stdlib(content: Any) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+def _encode_orjson(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _make_msgspec_encoder() -> Callable[[Any], bytes]:
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    return encoder.encode
+
+
+def resolve_encoder(name: str = JSON_ENCODER) -> Tuple[str, Callable[[Any], bytes]]:
+    """
+    Pick the JSON encoder for ``FastJSONResponse``.
+
+    Args:
+        name: ``json``, ``orjson``, ``msgspec`` or ``auto`` (the fastest installed one)
+
+    Returns:
+        Tuple[str, Callable[[Any], bytes]]: The encoder actually used and its encode function.
+        A requested library that is not installed falls back to the stdlib encoder.
+    """
+    if name in ("orjson", "auto") and orjson is not None:
+        return "orjson", _encode_orjson
+    if name in ("msgspec", "auto") and msgspec is not None:
+        return "msgspec", _make_msgspec_encoder()
+    if name not in ("json", "auto"):
+        logger.warning("JSON_ENCODER=%s is unavailable, falling back to the stdlib json encoder", name)
+    return "json", _encode_stdlib
+
+
+ENCODER_NAME, _encode = resolve_encoder()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the configured encoder.
+
+    Meant for bodies that are already validated (or built in their serialized
+    shape): endpoints return an instance directly, so FastAPI skips its
+    response-model validation and only this encoder touches the payload.
+    Pydantic models and datetimes in the content are encoded as well.
+    """
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = _encode(content)
+        search_stage_seconds.observe(time.perf_counter() - start, "serialize")
+        return body
+
+
+def encoder_stats() -> Dict[str, Any]:
+    return {"json_encoder": ENCODER_NAME, "requested": JSON_ENCODER}
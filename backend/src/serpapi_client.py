@@ -0,0 +1,170 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+
+from .resilience import UpstreamGuard
+
+logger = logging.getLogger(__name__)
+
+# SerpAPI configuration (the base URL can be pointed at a local fake server)
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com")
+SERPAPI_TIMEOUT = float(os.getenv("SERPAPI_TIMEOUT", "20"))
+SERPAPI_CONNECT_TIMEOUT = float(os.getenv("SERPAPI_CONNECT_TIMEOUT", "5"))
+SERPAPI_MAX_CONCURRENCY = int(os.getenv("SERPAPI_MAX_CONCURRENCY", "20"))
+SERPAPI_MAX_CONNECTIONS = int(os.getenv("SERPAPI_MAX_CONNECTIONS", str(SERPAPI_MAX_CONCURRENCY)))
+SERPAPI_MAX_KEEPALIVE = int(os.getenv("SERPAPI_MAX_KEEPALIVE", str(SERPAPI_MAX_CONNECTIONS)))
+SERPAPI_RATE_LIMIT = float(os.getenv("SERPAPI_RATE_LIMIT", "0"))
+SERPAPI_RATE_BURST = int(os.getenv("SERPAPI_RATE_BURST", "10"))
+SERPAPI_RATE_MAX_WAIT = float(os.getenv("SERPAPI_RATE_MAX_WAIT", "0.5"))
+SERPAPI_BREAKER_FAILURES = int(os.getenv("SERPAPI_BREAKER_FAILURES", "5"))
+SERPAPI_BREAKER_RESET = float(os.getenv("SERPAPI_BREAKER_RESET", "30"))
+
+
+class SerpAPIError(Exception):
+    """Raised when SerpAPI cannot be reached or returns a non-JSON response."""
+
+
+class SerpAPIClient:
+    """
+    Native async SerpAPI client.
+
+    Replaces the blocking ``serpapi.GoogleSearch(params).get_dict()`` call with a
+    pooled ``httpx.AsyncClient``. A semaphore caps the number of in-flight
+    upstream requests so a burst of searches queues here instead of opening an
+    unbounded number of connections.
+
+    Calls pass an ``UpstreamGuard`` first: while the circuit is open (after
+    repeated timeouts, transport errors or 5xx/429 answers) or the rate limit
+    is exhausted, ``search`` raises ``UpstreamUnavailable`` without sending.
+    """
+
+    def __init__(
+        self,
+        base_url: str = SERPAPI_BASE_URL,
+        timeout: float = SERPAPI_TIMEOUT,
+        connect_timeout: float = SERPAPI_CONNECT_TIMEOUT,
+        max_concurrency: int = SERPAPI_MAX_CONCURRENCY,
+        max_connections: int = SERPAPI_MAX_CONNECTIONS,
+        max_keepalive: int = SERPAPI_MAX_KEEPALIVE,
+        guard: Optional[UpstreamGuard] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.guard = guard or UpstreamGuard(
+            "serpapi",
+            rate=SERPAPI_RATE_LIMIT,
+            burst=SERPAPI_RATE_BURST,
+            max_wait=SERPAPI_RATE_MAX_WAIT,
+            failure_threshold=SERPAPI_BREAKER_FAILURES,
+            reset_timeout=SERPAPI_BREAKER_RESET,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so scripts that never run the app lifespan still work
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def search(
+        self,
+        params: Dict[str, Any],
+        max_wait: Optional[float] = None,
+        track_health: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Run a search against the SerpAPI JSON endpoint.
+
+        Args:
+            params: SerpAPI query parameters (engine, q, num, api_key, ...)
+            max_wait: Seconds to wait for a rate-limit token (defaults to ``SERPAPI_RATE_MAX_WAIT``)
+            track_health: Whether the outcome counts towards the circuit breaker
+                (False for speculative calls, so they cannot open it for live searches)
+
+        Returns:
+            Dict[str, Any]: The decoded JSON payload. Like ``GoogleSearch.get_dict()``,
+            API-level failures are returned as a dict with an ``error`` key.
+
+        Raises:
+            SerpAPIError: On transport failures, timeouts or undecodable responses
+            UpstreamUnavailable: If the circuit is open or the rate limit is exhausted
+        """
+        request_params = dict(params)
+        request_params.setdefault("output", "json")
+        request_params.setdefault("source", "python")
+
+        await self.guard.admit(max_wait)
+        async with self._semaphore:
+            try:
+                response = await self.client.get("/search", params=request_params)
+            except httpx.TimeoutException as e:
+                if track_health:
+                    self.guard.record_failure()
+                raise SerpAPIError(f"SerpAPI request timed out: {e}") from e
+            except httpx.HTTPError as e:
+                if track_health:
+                    self.guard.record_failure()
+                raise SerpAPIError(f"SerpAPI request failed: {e}") from e
+
+        if track_health:
+            # Client errors (bad key, bad query) say nothing about the upstream's health
+            if response.status_code >= 500 or response.status_code == 429:
+                self.guard.record_failure()
+            else:
+                self.guard.record_success()
+
+        try:
+            return response.json()
+        except ValueError as e:
+            raise SerpAPIError(f"SerpAPI returned invalid JSON (status {response.status_code})") from e
+
+    async def account(self, api_key: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        Fetch the SerpAPI account summary, which does not use search credits.
+
+        Used by the background health check; it bypasses the circuit breaker so
+        the probe still runs while the circuit is open.
+
+        Returns:
+            Tuple[int, Dict[str, Any]]: HTTP status and decoded JSON body
+        """
+        response = await self.client.get("/account.json", params={"api_key": api_key})
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return response.status_code, body if isinstance(body, dict) else {}
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_concurrency - self._semaphore._value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "max_connections": self.limits.max_connections,
+        }
+
+
+# Shared client instance, opened and closed by the app lifespan
+serpapi_client = SerpAPIClient()
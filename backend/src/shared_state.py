@@ -0,0 +1,334 @@
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cross-worker state configuration
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "local").lower()
+SHARED_STATE_PATH = os.getenv(
+    "SHARED_STATE_PATH",
+    # /dev/shm is memory-backed, so the SQLite store never touches the disk
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "google-clone-state.sqlite3"),
+)
+SHARED_STATE_REDIS_URL = os.getenv("SHARED_STATE_REDIS_URL", "redis://localhost:6379/1")
+
+# Expired SQLite rows are purged after this many writes
+PURGE_EVERY = 1000
+
+
+class SharedStore:
+    """
+    Interface for key/value state shared by all workers on a host.
+
+    Values are bytes, except for counters created with ``incr``. Every key has
+    a TTL. ``shared`` is False for the in-process store, so callers can skip
+    cross-worker coordination when there is only one process to coordinate.
+    """
+
+    name = "local"
+    shared = False
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def add(self, key: str, data: bytes, ttl: float) -> bool:
+        """Set ``key`` only if it is absent or expired; returns whether it was set."""
+        raise NotImplementedError
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        """Add ``amount`` to a counter, creating it with ``ttl`` if absent; returns the new value."""
+        raise NotImplementedError
+
+    async def take_token(self, key: str, rate: float, burst: int, ttl: float) -> float:
+        """
+        Take one token from the bucket at ``key``, refilled at ``rate`` per second up to ``burst``.
+
+        A missing or expired bucket starts full. Nothing is taken when the
+        bucket is empty.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+def refill_bucket(state: Optional[Tuple[float, float]], rate: float, burst: int, now: float) -> Tuple[Tuple[float, float], float]:
+    """Apply ``take_token`` to a bucket ``state`` of (tokens, updated); returns the new state and the wait."""
+    tokens, updated = state if state is not None else (float(burst), now)
+    tokens = min(float(burst), tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalSharedStore(SharedStore):
+    """In-process store for single-worker deployments."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+
+    def _live(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._live(key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, data)
+
+    async def add(self, key: str, data: bytes, ttl: float) -> bool:
+        if self._live(key) is not None:
+            return False
+        self._entries[key] = (time.monotonic() + ttl, data)
+        return True
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            entry = (time.monotonic() + ttl, 0)
+        value = entry[1] + amount
+        self._entries[key] = (entry[0], value)
+        return value
+
+    async def take_token(self, key: str, rate: float, burst: int, ttl: float) -> float:
+        state, wait = refill_bucket(self._live(key), rate, burst, time.time())
+        self._entries[key] = (time.monotonic() + ttl, state)
+        return wait
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "keys": len(self._entries)}
+
+
+class SqliteSharedStore(SharedStore):
+    """
+    Store in a SQLite database in WAL mode, shared by every worker on the host.
+
+    The default path is on ``/dev/shm``, so this is effectively a shared-memory
+    table with SQLite doing the cross-process locking. Statements run in worker
+    threads, each with its own connection, so they never block the event loop.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.errors = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires_at REAL NOT NULL)")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _run(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        try:
+            return self._conn().execute(sql, params)
+        except sqlite3.Error:
+            self.errors += 1
+            raise
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self._run("DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._run("SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, data: bytes, ttl: float) -> None:
+        self._run("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, data, time.time() + ttl))
+        self._wrote()
+
+    def _add(self, key: str, data: bytes, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._run(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE kv.expires_at <= ?",
+            (key, data, now + ttl, now),
+        )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def _incr(self, key: str, amount: int, ttl: float) -> int:
+        now = time.time()
+        row = self._run(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN kv.expires_at <= ? THEN excluded.value ELSE kv.value + excluded.value END, "
+            "expires_at = CASE WHEN kv.expires_at <= ? THEN excluded.expires_at ELSE kv.expires_at END "
+            "RETURNING value",
+            (key, amount, now + ttl, now, now),
+        ).fetchone()
+        self._wrote()
+        return int(row[0])
+
+    def _take_token(self, key: str, rate: float, burst: int, ttl: float) -> float:
+        conn = self._conn()
+        try:
+            # The write lock is held from the read to the write, so workers never take the same token
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            previous = tuple(float(part) for part in row[0].split()) if row else None
+            state, wait = refill_bucket(previous, rate, burst, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, "%r %r" % state, now + ttl),
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.errors += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        self._wrote()
+        return wait
+
+    def _delete(self, key: str) -> None:
+        self._run("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, data, ttl)
+
+    async def add(self, key: str, data: bytes, ttl: float) -> bool:
+        return await asyncio.to_thread(self._add, key, data, ttl)
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        return await asyncio.to_thread(self._incr, key, amount, ttl)
+
+    async def take_token(self, key: str, rate: float, burst: int, ttl: float) -> float:
+        return await asyncio.to_thread(self._take_token, key, rate, burst, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "path": self.path, "connections": len(self._connections), "errors": self.errors}
+
+
+# Atomic take_token for Redis; the bucket is stored as "<tokens> <updated>"
+REDIS_TAKE_TOKEN = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens, updated = burst, now
+local state = redis.call('GET', KEYS[1])
+if state then
+    local sep = string.find(state, ' ')
+    tokens, updated = tonumber(string.sub(state, 1, sep - 1)), tonumber(string.sub(state, sep + 1))
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('SET', KEYS[1], string.format('%.17g %.17g', tokens, now), 'PX', ARGV[4])
+return tostring(wait)
+"""
+
+
+class RedisSharedStore(SharedStore):
+    """
+    Store on any Redis-compatible server, e.g. one listening on a local unix socket
+    (``unix:///run/redis.sock``). Requires the optional ``redis`` package.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = SHARED_STATE_REDIS_URL):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis package is required for SHARED_STATE_BACKEND=redis") from e
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        await self._redis.set(key, data, px=max(1, int(ttl * 1000)))
+
+    async def add(self, key: str, data: bytes, ttl: float) -> bool:
+        return bool(await self._redis.set(key, data, px=max(1, int(ttl * 1000)), nx=True))
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        value = await self._redis.incrby(key, amount)
+        if value == amount:
+            await self._redis.pexpire(key, max(1, int(ttl * 1000)))
+        return value
+
+    async def take_token(self, key: str, rate: float, burst: int, ttl: float) -> float:
+        wait = await self._redis.eval(REDIS_TAKE_TOKEN, 1, key, rate, burst, time.time(), max(1, int(ttl * 1000)))
+        return float(wait)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+def create_shared_store(name: str = SHARED_STATE_BACKEND) -> SharedStore:
+    if name in ("", "local", "memory"):
+        return LocalSharedStore()
+    if name == "sqlite":
+        return SqliteSharedStore()
+    if name == "redis":
+        return RedisSharedStore()
+    logger.warning("Unknown SHARED_STATE_BACKEND '%s', keeping state in process", name)
+    return LocalSharedStore()
+
+
+# State shared by all workers (search cache tier, fetch leases, rate-limit buckets)
+shared_store = create_shared_store()
@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .shared_state import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+# Cross-worker fetch lease configuration
+SEARCH_LEASE_TTL = float(os.getenv("SEARCH_LEASE_TTL", "30"))
+SEARCH_LEASE_POLL_INTERVAL = float(os.getenv("SEARCH_LEASE_POLL_INTERVAL", "0.05"))
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key (the leader) starts the work as its own task;
+    callers that arrive while it is running await the same task instead of
+    repeating it. The work is shielded, so a leader whose client disconnects
+    does not cancel the result for everyone else.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` once for all concurrent callers of ``key``.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument coroutine function that does the work
+
+        Returns:
+            Tuple[Any, bool]: The shared result and whether this caller was the leader
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info("Joining in-flight call for key: %s", key)
+            return await asyncio.shield(task), False
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        self.leaders += 1
+        return await asyncio.shield(task), True
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved when every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+class SharedLease:
+    """
+    Extends single-flight across worker processes.
+
+    ``SingleFlight`` only coalesces callers within one process. Before fetching,
+    a leader takes a lease on the key in the shared store; a leader in another
+    worker that finds the lease taken waits for it to be released (the fetched
+    payload is then in the shared cache tier) instead of fetching again. Leases
+    expire after ``ttl`` so a crashed worker cannot block a key. With the
+    in-process store, or when ``enabled`` is False because the fetched payload
+    would not be visible to other workers, there is nothing to coordinate and
+    every call is free.
+    """
+
+    def __init__(
+        self,
+        store: SharedStore = shared_store,
+        ttl: float = SEARCH_LEASE_TTL,
+        poll_interval: float = SEARCH_LEASE_POLL_INTERVAL,
+        enabled: bool = True,
+    ):
+        self.store = store
+        self.enabled = enabled and store.shared
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.acquired = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def acquire(self, key: str) -> bool:
+        """Take the lease for ``key``; returns False if another worker holds it."""
+        if not self.enabled:
+            return True
+        try:
+            acquired = await self.store.add("lease:" + key, str(os.getpid()).encode("ascii"), self.ttl)
+        except Exception as e:
+            # Fetching twice is better than failing the search
+            self.errors += 1
+            logger.error("Failed to take fetch lease: %s", e)
+            return True
+        if acquired:
+            self.acquired += 1
+        return acquired
+
+    async def release(self, key: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.store.delete("lease:" + key)
+        except Exception as e:
+            self.errors += 1
+            logger.error("Failed to release fetch lease: %s", e)
+
+    async def wait(self, key: str) -> None:
+        """Wait until the lease holder releases ``key`` (or the lease expires)."""
+        self.waited += 1
+        deadline = time.monotonic() + self.ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if await self.store.get("lease:" + key) is None:
+                    return
+            except Exception as e:
+                self.errors += 1
+                logger.error("Failed to check fetch lease: %s", e)
+                return
+        self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.store.name,
+            "enabled": self.enabled,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
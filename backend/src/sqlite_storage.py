@@ -0,0 +1,416 @@
+import os
+import json
+import queue
+import asyncio
+import logging
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from .storage import StorageClient
+
+logger = logging.getLogger(__name__)
+
+# Embedded SQLite storage configuration
+DB_SQLITE_PATH = os.getenv(
+    "DB_SQLITE_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/google-clone.sqlite3")),
+)
+# NORMAL is crash-safe in WAL mode; FULL also survives power loss at the cost of an fsync per commit
+DB_SQLITE_SYNCHRONOUS = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+DB_SQLITE_BUSY_TIMEOUT = float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "5"))
+
+# Jobs the writer thread commits together in one transaction
+WRITER_MAX_BATCH = 256
+
+# Same tables as supabase/init.sql; JSON columns are stored as text
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_payloads (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data TEXT NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS search_results (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    organic_results TEXT,
+    knowledge_graph TEXT,
+    local_results TEXT,
+    related_questions TEXT,
+    related_searches TEXT,
+    inline_images TEXT,
+    answer_box TEXT,
+    ai_response TEXT,
+    location TEXT,
+    payload_hash TEXT REFERENCES search_payloads(hash),
+    using_mock_data INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS search_results_query_idx ON search_results(query);
+CREATE INDEX IF NOT EXISTS search_results_payload_hash_idx ON search_results(payload_hash);
+CREATE INDEX IF NOT EXISTS search_results_timestamp_id_idx ON search_results(timestamp, id);
+
+CREATE TABLE IF NOT EXISTS ai_responses (
+    id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    search_id TEXT NOT NULL REFERENCES search_results(id) ON DELETE CASCADE,
+    response TEXT NOT NULL,
+    timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS ai_responses_search_id_idx ON ai_responses(search_id);
+CREATE INDEX IF NOT EXISTS ai_responses_fingerprint_idx ON ai_responses(fingerprint, timestamp DESC);
+
+CREATE TABLE IF NOT EXISTS recent_queries (
+    normalized_query TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS recent_queries_timestamp_idx ON recent_queries(timestamp DESC);
+
+CREATE VIEW IF NOT EXISTS search_payload_storage AS
+SELECT
+    (SELECT count(*) FROM search_results) AS searches,
+    (SELECT count(*) FROM search_results WHERE payload_hash IS NOT NULL) AS searches_by_hash,
+    (SELECT count(*) FROM search_payloads) AS payloads,
+    (SELECT COALESCE(sum(p.raw_size), 0)
+        FROM search_results r JOIN search_payloads p ON p.hash = r.payload_hash) AS logical_bytes,
+    (SELECT COALESCE(sum(stored_size), 0) FROM search_payloads) AS stored_bytes,
+    (SELECT COALESCE(sum(p.raw_size), 0)
+        FROM search_results r JOIN search_payloads p ON p.hash = r.payload_hash)
+        - (SELECT COALESCE(sum(stored_size), 0) FROM search_payloads) AS saved_bytes,
+    (SELECT COALESCE(sum(
+            COALESCE(length(organic_results), 0) + COALESCE(length(knowledge_graph), 0)
+            + COALESCE(length(local_results), 0) + COALESCE(length(related_questions), 0)
+            + COALESCE(length(inline_images), 0) + COALESCE(length(answer_box), 0)
+        ), 0)
+        FROM search_results WHERE payload_hash IS NULL) AS inline_bytes;
+"""
+
+# Columns per table (and view), used to validate names before they are put in SQL
+COLUMNS = {
+    "search_payloads": ("hash", "codec", "data", "raw_size", "stored_size", "created_at"),
+    "search_results": (
+        "id", "query", "timestamp", "organic_results", "knowledge_graph", "local_results", "related_questions",
+        "related_searches", "inline_images", "answer_box", "ai_response", "location", "payload_hash",
+        "using_mock_data",
+    ),
+    "ai_responses": ("id", "search_id", "response", "timestamp", "fingerprint"),
+    "recent_queries": ("normalized_query", "query", "timestamp"),
+    "search_payload_storage": (
+        "searches", "searches_by_hash", "payloads", "logical_bytes", "stored_bytes", "saved_bytes", "inline_bytes",
+    ),
+}
+JSON_COLUMNS = {
+    "search_results": frozenset((
+        "organic_results", "knowledge_graph", "local_results", "related_questions",
+        "related_searches", "inline_images", "answer_box",
+    )),
+}
+
+# Columns added after a table was first created, for database files that predate them
+ADDED_COLUMNS = {
+    "search_results": (("using_mock_data", "INTEGER NOT NULL DEFAULT 0"),),
+}
+
+# PostgREST filter operators the app uses
+OPERATORS = {"eq": "=", "gte": ">=", "gt": ">", "lte": "<=", "lt": "<", "neq": "!="}
+# Values of PostgREST's ``is`` operator
+IS_VALUES = {"null": "NULL", "true": "1", "false": "0"}
+
+
+class StorageError(Exception):
+    """Raised for a table, column or filter the embedded store does not know."""
+
+
+def _columns(table: str, names) -> Tuple[str, ...]:
+    known = COLUMNS.get(table)
+    if known is None:
+        raise StorageError(f"Unknown table: {table}")
+    for name in names:
+        if name not in known:
+            raise StorageError(f"Unknown column {table}.{name}")
+    return tuple(names)
+
+
+# SQL text is built once per shape, so sqlite3's per-connection statement cache
+# keeps each statement prepared across calls
+@lru_cache(maxsize=256)
+def _insert_sql(table: str, columns: Tuple[str, ...], on_conflict: Optional[str], returning: bool) -> str:
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    if on_conflict:
+        keys = _columns(table, [key.strip() for key in on_conflict.split(",")])
+        updates = [f"{column} = excluded.{column}" for column in columns if column not in keys]
+        action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+        sql += f" ON CONFLICT ({', '.join(keys)}) {action}"
+    return sql + (" RETURNING *" if returning else "")
+
+
+def _where(table: str, filters: Optional[Dict[str, str]]) -> Tuple[str, List[Any]]:
+    if not filters:
+        return "", []
+    clauses, params = [], []
+    for column, condition in filters.items():
+        _columns(table, [column])
+        operator, _, value = condition.partition(".")
+        if operator == "is" and value in IS_VALUES:
+            clauses.append(f"{column} IS {IS_VALUES[value]}")
+        elif operator in OPERATORS:
+            clauses.append(f"{column} {OPERATORS[operator]} ?")
+            params.append(value)
+        else:
+            raise StorageError(f"Unsupported filter {column}={condition}")
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SqliteStorageClient(StorageClient):
+    """
+    Embedded SQLite database in WAL mode, for single-node deployments.
+
+    Writes go to one dedicated writer thread that owns the only write
+    connection; jobs queued while a transaction is open are committed together
+    (group commit), each in its own savepoint so a failing job does not undo
+    the others. Reads run in worker threads on per-thread connections, which
+    WAL lets proceed concurrently with the writer. Statement text is cached
+    per shape so statements stay prepared.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str = DB_SQLITE_PATH,
+        synchronous: str = DB_SQLITE_SYNCHRONOUS,
+        busy_timeout: float = DB_SQLITE_BUSY_TIMEOUT,
+    ):
+        super().__init__()
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._jobs: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self.transactions = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        # CREATE TABLE IF NOT EXISTS leaves older tables as they were; add the missing columns
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if not existing:
+                continue
+            for column, definition in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = self._connect()
+                self._migrate(conn)
+                conn.executescript(SCHEMA)
+                self._writer = threading.Thread(target=self._write_loop, args=(conn,), name="sqlite-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self, conn: sqlite3.Connection) -> None:
+        while True:
+            jobs = [self._jobs.get()]
+            while len(jobs) < WRITER_MAX_BATCH:
+                try:
+                    jobs.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in jobs
+            jobs = [job for job in jobs if job is not None]
+            if jobs:
+                self._commit(conn, jobs)
+            if stop:
+                conn.close()
+                return
+
+    def _commit(self, conn: sqlite3.Connection, jobs: list) -> None:
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, _, _ in jobs:
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((fn(conn, *args), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((None, e))
+            conn.execute("COMMIT")
+            self.transactions += 1
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(None, e)] * len(jobs)
+        for (_, _, future, loop), (result, error) in zip(jobs, outcomes):
+            if error is not None:
+                self.errors += 1
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    async def _write(self, fn, *args) -> Any:
+        self._ensure_writer()
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._jobs.put((fn, args, future, loop))
+        return await future
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    @staticmethod
+    def _decode(table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        json_columns = JSON_COLUMNS.get(table, ())
+        return {
+            key: json.loads(row[key]) if key in json_columns and row[key] is not None else row[key]
+            for key in row.keys()
+        }
+
+    @staticmethod
+    def _encode(table: str, row: Dict[str, Any], columns: Tuple[str, ...]) -> tuple:
+        json_columns = JSON_COLUMNS.get(table, ())
+        return tuple(
+            json.dumps(row.get(column), separators=(",", ":"), ensure_ascii=False)
+            if column in json_columns and row.get(column) is not None else row.get(column)
+            for column in columns
+        )
+
+    def _insert_rows(self, conn, table, rows, columns, on_conflict, returning) -> List[Dict[str, Any]]:
+        params = [self._encode(table, row, columns) for row in rows]
+        if not returning:
+            conn.executemany(_insert_sql(table, columns, on_conflict, False), params)
+            self.writes += len(rows)
+            return []
+        sql = _insert_sql(table, columns, on_conflict, True)
+        persisted = [self._decode(table, conn.execute(sql, values).fetchone()) for values in params]
+        self.writes += len(rows)
+        return persisted
+
+    def _update_rows(self, conn, table, values, filters, returning) -> List[Dict[str, Any]]:
+        columns = _columns(table, values.keys())
+        where, params = _where(table, filters)
+        sql = f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)}{where}"
+        cursor = conn.execute(sql + (" RETURNING *" if returning else ""), self._encode(table, values, columns) + tuple(params))
+        if returning:
+            return [self._decode(table, row) for row in cursor.fetchall()]
+        self.writes += cursor.rowcount
+        return []
+
+    def _select_rows(self, table, columns, filters, order, limit) -> List[Dict[str, Any]]:
+        if columns in ("", "*"):
+            _columns(table, ())
+            projection = "*"
+        else:
+            projection = ", ".join(_columns(table, [column.strip() for column in columns.split(",")]))
+        where, params = _where(table, filters)
+        sql = f"SELECT {projection} FROM {table}{where}"
+        if order:
+            terms = []
+            for term in order.split(","):
+                column, _, direction = term.strip().partition(".")
+                _columns(table, [column])
+                terms.append(f"{column} {'DESC' if direction == 'desc' else 'ASC'}")
+            sql += f" ORDER BY {', '.join(terms)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [self._decode(table, row) for row in self._reader().execute(sql, params).fetchall()]
+
+    async def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        returning: bool = False,
+        on_conflict: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        names = []
+        for row in rows:
+            names.extend(key for key in row if key not in names)
+        columns = _columns(table, names)
+        return await self._write(self._insert_rows, table, rows, columns, on_conflict, returning)
+
+    async def update(
+        self,
+        table: str,
+        values: Dict[str, Any],
+        filters: Dict[str, str],
+        returning: bool = False,
+    ) -> List[Dict[str, Any]]:
+        return await self._write(self._update_rows, table, values, filters, returning)
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Dict[str, str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        # Creates the schema on first use, even before anything is written
+        self._ensure_writer()
+        self.requests += 1
+        return await asyncio.to_thread(self._select_rows, table, columns, filters, order, limit)
+
+    async def close(self) -> None:
+        """Commit queued writes, stop the writer thread and close all connections."""
+        if self._writer is not None and self._writer.is_alive():
+            self._jobs.put(None)
+            await asyncio.to_thread(self._writer.join)
+        self._writer = None
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "requests": self.requests,
+            "writes": self.writes,
+            "transactions": self.transactions,
+            "pending_writes": self._jobs.qsize(),
+            "readers": len(self._readers),
+            "errors": self.errors,
+        }
@@ -0,0 +1,66 @@
+from typing import Dict, Any, List, Optional
+
+
+class StorageClient:
+    """
+    Interface for the row store behind ``db.py``.
+
+    The operations follow PostgREST semantics, which the hosted backend speaks
+    natively: multi-row inserts (upserts with ``on_conflict``, merging into the
+    existing row), filtered updates and selects. Filters use PostgREST syntax,
+    e.g. ``{"id": "eq.<id>"}``, ``{"timestamp": "gte.<iso>"}`` or
+    ``{"payload_hash": "is.null"}``, and ``order`` is ``"<column>.asc|desc"``.
+    JSON columns are passed and returned as plain Python values.
+    """
+
+    name = "none"
+
+    def __init__(self):
+        self.requests = 0
+
+    async def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        returning: bool = False,
+        on_conflict: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert one or more rows in a single statement.
+
+        Args:
+            table: Table name
+            rows: Rows to insert; keys missing from some rows become NULL
+            returning: Return the persisted rows
+            on_conflict: Column(s) to upsert on; conflicting rows are merged
+
+        Returns:
+            List[Dict[str, Any]]: The persisted rows when ``returning`` is set, else an empty list
+        """
+        raise NotImplementedError
+
+    async def update(
+        self,
+        table: str,
+        values: Dict[str, Any],
+        filters: Dict[str, str],
+        returning: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Update the rows matching ``filters``."""
+        raise NotImplementedError
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Dict[str, str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "requests": self.requests}
@@ -0,0 +1,335 @@
+import os
+import math
+import heapq
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from .cache import normalize_query_text
+from .db import get_query_history_after
+
+logger = logging.getLogger(__name__)
+
+# Query suggestion configuration
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "true").lower() in ("1", "true", "yes")
+SUGGEST_MAX_RESULTS = int(os.getenv("SUGGEST_MAX_RESULTS", "10"))
+# Past this age a search counts half as much towards a query's rank
+SUGGEST_HALF_LIFE_HOURS = float(os.getenv("SUGGEST_HALF_LIFE_HOURS", "168"))
+# Weight of a query offered as a related search, relative to one actually searched
+SUGGEST_RELATED_WEIGHT = float(os.getenv("SUGGEST_RELATED_WEIGHT", "0.1"))
+SUGGEST_HISTORY_DAYS = float(os.getenv("SUGGEST_HISTORY_DAYS", "90"))
+SUGGEST_REFRESH_INTERVAL = float(os.getenv("SUGGEST_REFRESH_INTERVAL", "60"))
+SUGGEST_BATCH_SIZE = int(os.getenv("SUGGEST_BATCH_SIZE", "1000"))
+SUGGEST_MAX_QUERY_LENGTH = int(os.getenv("SUGGEST_MAX_QUERY_LENGTH", "100"))
+
+# Prefixes matching more queries than this get a maintained top list instead of a scan
+SCAN_LIMIT = 128
+# Prefixes up to this length get their top lists when the snapshot is loaded
+WARM_PREFIX_LENGTH = 2
+# Search ids already counted, skipped when the refresher sees them again
+RECENT_IDS = 10000
+# Sorts after every character a query can contain
+PREFIX_END = chr(0x10FFFF)
+# Scores are relative to this instant, so they stay small
+SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def parse_timestamp(value: Optional[str]) -> float:
+    """Epoch seconds of a stored ISO timestamp; naive timestamps are UTC."""
+    if not value:
+        return datetime.now(timezone.utc).timestamp()
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def add_log2(a: float, b: float) -> float:
+    """log2(2**a + 2**b) without overflow."""
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+class Suggestion:
+    __slots__ = ("query", "count", "score", "timestamp", "searched")
+
+    def __init__(self, query: str):
+        self.query = query
+        self.count = 0
+        # log2 of the decayed count, see QuerySuggestions
+        self.score = float("-inf")
+        self.timestamp: Optional[str] = None
+        self.searched = False
+
+
+class QuerySuggestions:
+    """
+    In-memory prefix index of past queries for type-ahead suggestions.
+
+    Normalized queries are kept in a sorted list, so the queries starting
+    with a prefix are one contiguous slice found by bisection. Suggestions
+    are ranked by a decayed count: each search adds ``2 ** (t / half_life)``
+    for its time ``t``, so recent searches count more than old ones. Every
+    score decays at the same rate, which means the ranking of two queries
+    never changes by time passing alone and scores only ever grow.
+
+    That lets prefixes matching many queries keep a precomputed top list:
+    it is built on first use (or when the snapshot is loaded, for the
+    shortest prefixes) and updated as queries are recorded, so a lookup is
+    a bisection plus either a scan of at most ``SCAN_LIMIT`` queries or a
+    dict hit.
+
+    The index is loaded from stored searches at startup (queries and their
+    related searches), updated as this process saves searches, and
+    refreshed periodically with searches saved by other workers.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SUGGEST_ENABLED,
+        max_results: int = SUGGEST_MAX_RESULTS,
+        half_life_hours: float = SUGGEST_HALF_LIFE_HOURS,
+        related_weight: float = SUGGEST_RELATED_WEIGHT,
+        history_days: float = SUGGEST_HISTORY_DAYS,
+        refresh_interval: float = SUGGEST_REFRESH_INTERVAL,
+        batch_size: int = SUGGEST_BATCH_SIZE,
+    ):
+        self.enabled = enabled
+        self.max_results = max_results
+        self.half_life = half_life_hours * 3600
+        self.related_bonus = math.log2(related_weight) if related_weight > 0 else float("-inf")
+        self.history_days = history_days
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        # Sorted normalized queries and their entries
+        self._keys: List[str] = []
+        self._entries: Dict[str, Suggestion] = {}
+        # prefix -> normalized queries with the highest scores, best first
+        self._top: Dict[str, List[str]] = {}
+        self._top_length = 0
+        self._recent_ids: "OrderedDict[str, None]" = OrderedDict()
+        # (timestamp, id) of the last stored row read
+        self._cursor: Optional[Tuple[str, str]] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.loaded = False
+        self.recorded = 0
+        self.refreshed_rows = 0
+        self.lookups = 0
+        self.errors = 0
+
+    async def start(self) -> None:
+        if self.enabled and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def _points(self, timestamp: Optional[str]) -> float:
+        # log2 of what one search at ``timestamp`` adds to a score
+        return (parse_timestamp(timestamp) - SCORE_EPOCH) / self.half_life
+
+    def _count(
+        self,
+        query: str,
+        timestamp: Optional[str],
+        points: float,
+        searched: bool,
+        new_keys: Optional[List[str]] = None,
+    ) -> None:
+        query = query.strip() if isinstance(query, str) else ""
+        key = normalize_query_text(query)
+        if not key or len(key) > SUGGEST_MAX_QUERY_LENGTH:
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = Suggestion(query)
+            if new_keys is None:
+                insort(self._keys, key)
+            else:
+                new_keys.append(key)
+        if searched:
+            entry.count += 1
+            if not entry.searched or parse_timestamp(timestamp) >= parse_timestamp(entry.timestamp):
+                # Show the spelling of the latest search
+                entry.query, entry.timestamp = query, timestamp
+            entry.searched = True
+        entry.score = add_log2(entry.score, points)
+        if self._top:
+            self._promote(key, entry.score)
+
+    def _promote(self, key: str, score: float) -> None:
+        # Scores only grow, so a query can only move up in the top lists of its prefixes
+        for length in range(min(len(key), self._top_length) + 1):
+            top = self._top.get(key[:length])
+            if top is None:
+                continue
+            if key in top:
+                top.sort(key=self._score, reverse=True)
+            elif len(top) < self.max_results or score > self._entries[top[-1]].score:
+                top.append(key)
+                top.sort(key=self._score, reverse=True)
+                del top[self.max_results:]
+
+    def _score(self, key: str) -> float:
+        return self._entries[key].score
+
+    def _best(self, prefix: str) -> List[str]:
+        top = self._top.get(prefix)
+        if top is not None:
+            return top
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + PREFIX_END, lo)
+        best = heapq.nlargest(self.max_results, self._keys[lo:hi], key=self._score)
+        if hi - lo > SCAN_LIMIT:
+            self._keep_top(prefix, best)
+        return best
+
+    def _keep_top(self, prefix: str, best: List[str]) -> None:
+        self._top[prefix] = best
+        self._top_length = max(self._top_length, len(prefix))
+
+    def _warm(self) -> None:
+        # One pass over all queries builds the top lists of the shortest prefixes
+        heaps: Dict[str, list] = {}
+        for key in self._keys:
+            score = self._entries[key].score
+            for length in range(min(len(key), WARM_PREFIX_LENGTH) + 1):
+                heap = heaps.setdefault(key[:length], [])
+                if len(heap) < self.max_results:
+                    heapq.heappush(heap, (score, key))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, key))
+        for prefix, heap in heaps.items():
+            lo = bisect_left(self._keys, prefix)
+            if bisect_left(self._keys, prefix + PREFIX_END, lo) - lo > SCAN_LIMIT:
+                self._keep_top(prefix, [key for _, key in sorted(heap, reverse=True)])
+
+    def add(self, search_id: str, query: str, related_searches: Optional[List[str]] = None) -> None:
+        """Count a search saved by this process and the related searches it returned."""
+        if not self.enabled:
+            return
+        timestamp = datetime.now(timezone.utc).isoformat()
+        points = self._points(timestamp)
+        self._count(query, timestamp, points, True)
+        for related in related_searches or []:
+            self._count(related, timestamp, points + self.related_bonus, False)
+        self._remember(search_id)
+        self.recorded += 1
+
+    def _remember(self, search_id: str) -> None:
+        self._recent_ids[search_id] = None
+        while len(self._recent_ids) > RECENT_IDS:
+            self._recent_ids.popitem(last=False)
+
+    def _load(self, rows: List[Dict[str, Any]]) -> None:
+        new_keys: List[str] = []
+        for row in rows:
+            if row["id"] in self._recent_ids:
+                continue
+            self._remember(row["id"])
+            timestamp = row.get("timestamp")
+            points = self._points(timestamp)
+            self._count(row.get("query"), timestamp, points, True, new_keys)
+            for related in row.get("related_searches") or []:
+                self._count(related, timestamp, points + self.related_bonus, False, new_keys)
+        if new_keys:
+            # A sort of two sorted runs is a linear merge
+            new_keys.sort()
+            self._keys.extend(new_keys)
+            self._keys.sort()
+
+    async def refresh(self) -> int:
+        """
+        Count stored searches after the cursor; the first call loads the snapshot.
+
+        Returns:
+            int: Number of stored rows read
+        """
+        since = None
+        if self.history_days > 0:
+            since = (datetime.now(timezone.utc) - timedelta(days=self.history_days)).isoformat()
+        total = 0
+        while True:
+            rows = await get_query_history_after(self._cursor, self.batch_size, since)
+            if not rows:
+                break
+            self._load(rows)
+            total += len(rows)
+            self._cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+            if len(rows) < self.batch_size:
+                break
+            # Let requests run between pages of a large snapshot
+            await asyncio.sleep(0)
+        if not self.loaded:
+            self._warm()
+            self.loaded = True
+            logger.info("Loaded %s queries for suggestions from %s stored searches", len(self._keys), total)
+        self.refreshed_rows += total
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Failed to refresh query suggestions: %s", e)
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Past queries starting with ``prefix``, best first.
+
+        The prefix is normalized like queries are; a trailing space is kept, so
+        "coffee " suggests "coffee shops" but not "coffeehouse".
+
+        Returns:
+            List[Dict[str, Any]]: Up to ``limit`` suggestions with query, count and timestamp of the latest search
+        """
+        self.lookups += 1
+        key = normalize_query_text(prefix)
+        if key and prefix[-1:].isspace():
+            key += " "
+        suggestions = []
+        for match in self._best(key)[:max(0, min(limit, self.max_results))]:
+            entry = self._entries[match]
+            suggestions.append({"query": entry.query, "count": entry.count, "timestamp": entry.timestamp})
+        return suggestions
+
+    def popular(self, limit: int) -> List[str]:
+        """
+        The most searched queries by decayed count, best first.
+
+        Queries only ever offered as related searches are left out. This is a
+        full scan for background jobs; it is not counted as a lookup.
+        """
+        searched = (key for key in self._keys if self._entries[key].searched)
+        return [self._entries[key].query for key in heapq.nlargest(limit, searched, key=self._score)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "loaded": self.loaded,
+            "queries": len(self._keys),
+            "top_lists": len(self._top),
+            "recorded": self.recorded,
+            "refreshed_rows": self.refreshed_rows,
+            "lookups": self.lookups,
+            "errors": self.errors,
+        }
+
+
+# Shared query suggestion index
+query_suggestions = QuerySuggestions()
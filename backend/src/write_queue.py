@@ -0,0 +1,319 @@
+import os
+import asyncio
+import logging
+from typing import Callable, Dict, Any, List, Optional
+
+from .postgrest import AsyncPostgrestClient
+from .metrics import upstream_errors_total
+
+logger = logging.getLogger(__name__)
+
+# Write-behind queue configuration
+DB_WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", "1000"))
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))
+DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "0.05"))
+DB_WRITE_MAX_RETRIES = int(os.getenv("DB_WRITE_MAX_RETRIES", "3"))
+DB_SHUTDOWN_TIMEOUT = float(os.getenv("DB_SHUTDOWN_TIMEOUT", "10"))
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+
+# Tables are flushed parent-first so foreign keys always resolve within a batch
+TABLE_ORDER = ["search_payloads", "search_results", "ai_responses", "recent_queries"]
+
+
+class WriteOp:
+    """
+    A queued insert (``values`` is the row) or update (``values`` is the patch) of a row by id.
+
+    ``on_written`` is called once the statement carrying the op has succeeded.
+    """
+
+    __slots__ = ("kind", "table", "row_id", "values", "on_conflict", "on_written")
+
+    def __init__(
+        self,
+        kind: str,
+        table: str,
+        row_id: Optional[str],
+        values: Dict[str, Any],
+        on_conflict: Optional[str] = None,
+        on_written: Optional[Callable[[], None]] = None,
+    ):
+        self.kind = kind
+        self.table = table
+        self.row_id = row_id
+        self.values = values
+        self.on_conflict = on_conflict
+        self.on_written = on_written
+
+
+class WriteBehindQueue:
+    """
+    Bounded write-behind queue in front of PostgREST.
+
+    Writes are acknowledged as soon as they are queued. A single worker drains
+    the queue in batches (up to ``batch_size`` ops or ``flush_interval``
+    seconds), turning consecutive inserts into one multi-row statement per
+    table. When the queue is full, producers wait for space (backpressure)
+    instead of growing memory without bound.
+
+    Rows stay readable from memory until their batch is written, so
+    ``get_search_result`` sees its own writes, and updates to rows that are
+    still queued are merged into the pending insert.
+
+    With ``write_behind`` disabled every write is executed immediately and
+    inserts return the row as persisted by the database.
+    """
+
+    def __init__(
+        self,
+        client: AsyncPostgrestClient,
+        max_size: int = DB_WRITE_QUEUE_SIZE,
+        batch_size: int = DB_WRITE_BATCH_SIZE,
+        flush_interval: float = DB_WRITE_FLUSH_INTERVAL,
+        max_retries: int = DB_WRITE_MAX_RETRIES,
+        write_behind: bool = DB_WRITE_BEHIND,
+    ):
+        self.client = client
+        self.write_behind = write_behind
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Queued inserts that updates can still be merged into
+        self._mergeable: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Every row not yet confirmed by the database, for read-your-writes
+        self._unflushed: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        self.enqueued = 0
+        self.merged_updates = 0
+        self.deduped_upserts = 0
+        self.batches = 0
+        self.statements = 0
+        self.rows_written = 0
+        self.failed_ops = 0
+        self.backpressure_waits = 0
+
+    def _ensure_worker(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def start(self) -> None:
+        self._ensure_worker()
+
+    async def close(self, timeout: float = DB_SHUTDOWN_TIMEOUT) -> None:
+        """Flush everything still queued, then stop the worker."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Write queue did not drain within %ss; %s writes lost", timeout, self._queue.qsize())
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+
+    async def _put(self, op: WriteOp) -> None:
+        self._ensure_worker()
+        if self._queue.full():
+            self.backpressure_waits += 1
+            logger.warning("Write queue is full, waiting for the writer to catch up")
+        await self._queue.put(op)
+        self.enqueued += 1
+
+    async def insert(
+        self,
+        table: str,
+        row: Dict[str, Any],
+        on_conflict: Optional[str] = None,
+        on_written: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Insert a row and return its persisted representation.
+
+        In write-behind mode the row is queued and returned as it will be
+        written; otherwise it is inserted with ``return=representation`` and
+        the database's copy is returned. ``on_written`` is called once the row
+        is confirmed written, and never if it is dropped.
+        """
+        if not self.write_behind:
+            rows = await self.client.insert(table, [row], returning=True, on_conflict=on_conflict)
+            self.statements += 1
+            self.rows_written += 1
+            self._written([WriteOp("insert", table, row.get("id"), row, on_conflict, on_written)])
+            return rows[0] if rows else row
+
+        row_id = row.get("id")
+        if row_id is not None and on_conflict is None:
+            self._mergeable.setdefault(table, {})[row_id] = row
+            self._unflushed.setdefault(table, {})[row_id] = row
+        await self._put(WriteOp("insert", table, row_id, row, on_conflict, on_written))
+        return row
+
+    async def upsert(self, table: str, row: Dict[str, Any], on_conflict: str) -> None:
+        """
+        Queue an insert that merges into the existing row on ``on_conflict``.
+
+        Upserts are idempotent and return nothing, so they are queued even when
+        write-behind is disabled and never cost a round trip on the request path.
+        Several upserts of the same key in one batch collapse to the latest row.
+        """
+        await self._put(WriteOp("insert", table, None, row, on_conflict))
+
+    async def update(self, table: str, row_id: str, values: Dict[str, Any]) -> None:
+        if not self.write_behind:
+            await self.client.update(table, values, {"id": f"eq.{row_id}"})
+            self.statements += 1
+            self.rows_written += 1
+            return
+
+        pending = self._mergeable.get(table, {}).get(row_id)
+        if pending is not None:
+            pending.update(values)
+            self.merged_updates += 1
+            return
+        await self._put(WriteOp("update", table, row_id, values))
+
+    def get_unflushed(self, table: str, row_id: str) -> Optional[Dict[str, Any]]:
+        row = self._unflushed.get(table, {}).get(row_id)
+        return dict(row) if row is not None else None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error("Unexpected error flushing write batch: %s", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _group(self, batch: List[WriteOp]) -> List[List[WriteOp]]:
+        # Freeze queued inserts: later updates must not mutate rows being sent
+        for op in batch:
+            if op.kind == "insert" and op.row_id is not None:
+                self._mergeable.get(op.table, {}).pop(op.row_id, None)
+
+        def rank(op: WriteOp):
+            table_rank = TABLE_ORDER.index(op.table) if op.table in TABLE_ORDER else len(TABLE_ORDER)
+            return (table_rank, 0 if op.kind == "insert" else 1)
+
+        groups: List[List[WriteOp]] = []
+        for op in sorted(batch, key=rank):
+            last = groups[-1][0] if groups else None
+            if (
+                last is not None and op.kind == "insert" and last.kind == "insert"
+                and last.table == op.table and last.on_conflict == op.on_conflict
+            ):
+                groups[-1].append(op)
+            else:
+                groups.append([op])
+        return groups
+
+    @staticmethod
+    def _written(ops: List[WriteOp]) -> None:
+        for op in ops:
+            if op.on_written is not None:
+                try:
+                    op.on_written()
+                except Exception as e:
+                    logger.error("Error in write confirmation callback: %s", e)
+
+    @staticmethod
+    def _dedupe_upserts(group: List[WriteOp]) -> List[List[WriteOp]]:
+        # One statement cannot upsert the same key twice; keep the latest row per key,
+        # grouped with the ops it replaced
+        columns = [column.strip() for column in group[0].on_conflict.split(",")]
+        latest: Dict[tuple, List[WriteOp]] = {}
+        for op in group:
+            key = tuple(op.values.get(column) for column in columns)
+            ops = latest.pop(key, [])
+            ops.append(op)
+            latest[key] = ops
+        return list(latest.values())
+
+    async def _send(self, first: WriteOp, ops: List[WriteOp]) -> None:
+        if first.kind == "insert":
+            await self.client.insert(first.table, [op.values for op in ops], on_conflict=first.on_conflict)
+        else:
+            await self.client.update(first.table, first.values, {"id": f"eq.{first.row_id}"})
+        self.statements += 1
+        self.rows_written += len(ops)
+
+    async def _write(self, first: WriteOp, rows: List[List[WriteOp]], retries: int) -> Optional[Exception]:
+        """Send ``rows`` as one statement, retrying with backoff; returns the last error if it never succeeded."""
+        for attempt in range(retries + 1):
+            try:
+                await self._send(first, [ops[-1] for ops in rows])
+            except Exception as e:
+                upstream_errors_total.inc("postgrest", "write")
+                if attempt >= retries:
+                    return e
+                await asyncio.sleep(min(0.1 * (2 ** attempt), 2.0))
+                continue
+            # Collapsed upserts were written by the op that replaced them
+            for ops in rows:
+                self._written(ops)
+            return None
+        return None
+
+    async def _flush(self, batch: List[WriteOp]) -> None:
+        self.batches += 1
+        for group in self._group(batch):
+            first = group[0]
+            # Each row of the statement, with the queued ops it stands for
+            rows = [[op] for op in group]
+            if first.kind == "insert" and first.on_conflict and len(group) > 1:
+                rows = self._dedupe_upserts(group)
+                self.deduped_upserts += len(group) - len(rows)
+            error = await self._write(first, rows, self.max_retries)
+            if error is not None:
+                dropped = rows
+                if len(rows) > 1:
+                    # One bad row must not take the valid rows batched with it down too
+                    dropped = []
+                    for row in rows:
+                        row_error = await self._write(first, [row], 0)
+                        if row_error is not None:
+                            dropped.append(row)
+                            error = row_error
+                if dropped:
+                    self.failed_ops += len(dropped)
+                    logger.error("Dropping %s %s(s) on %s: %s", len(dropped), first.kind, first.table, error)
+            for op in group:
+                if op.kind == "insert" and op.row_id is not None:
+                    self._unflushed.get(op.table, {}).pop(op.row_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "write_behind": self.write_behind,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "merged_updates": self.merged_updates,
+            "deduped_upserts": self.deduped_upserts,
+            "batches": self.batches,
+            "statements": self.statements,
+            "rows_written": self.rows_written,
+            "failed_ops": self.failed_ops,
+            "backpressure_waits": self.backpressure_waits,
+        }
@@ -0,0 +1,8 @@
+-- Adds the fingerprint column used by the persistent AI response cache (AI_CACHE_PERSIST=true)
+-- Run this once on databases created before the column was part of init.sql
+
+-- sha256 of the prompt version, normalized query and snippets the answer was generated from
+ALTER TABLE ai_responses ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
+-- Create index on fingerprint for AI response cache lookups
+CREATE INDEX IF NOT EXISTS ai_responses_fingerprint_idx ON ai_responses(fingerprint, timestamp DESC);
@@ -1,9 +1,41 @@
+-- Create search_payloads table: search sections stored once per distinct payload
+-- (SEARCH_PAYLOAD_STORAGE=content_addressed), keyed by the sha256 of their canonical JSON
+CREATE TABLE IF NOT EXISTS search_payloads (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data BYTEA NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Compressed bytes are already dense; skip TOAST compression of the column
+ALTER TABLE search_payloads ALTER COLUMN data SET STORAGE EXTERNAL;
+
+-- Create RLS policies for security
+ALTER TABLE search_payloads ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public can read search_payloads"
+    ON search_payloads
+    FOR SELECT
+    USING (true);
+
+CREATE POLICY "Public can insert search_payloads"
+    ON search_payloads
+    FOR INSERT
+    WITH CHECK (true);
+
+CREATE POLICY "Public can update search_payloads"
+    ON search_payloads
+    FOR UPDATE
+    USING (true);
+
 -- Create search_results table to store search queries and results
 CREATE TABLE IF NOT EXISTS search_results (
     id UUID PRIMARY KEY,
     query TEXT NOT NULL,
     timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    organic_results JSONB NOT NULL,
+    organic_results JSONB,
     knowledge_graph JSONB,
     local_results JSONB,
     related_questions JSONB,
@@ -11,12 +43,21 @@ CREATE TABLE IF NOT EXISTS search_results (
     inline_images JSONB,
     answer_box JSONB,
     ai_response TEXT,
-    location TEXT
+    location TEXT,
+    payload_hash TEXT REFERENCES search_payloads(hash),
+    -- Mock fallback rows are stored for /api/search/{id} but kept out of the local index and suggestions
+    using_mock_data BOOLEAN NOT NULL DEFAULT FALSE
 );
 
 -- Create index on query field for faster lookups
 CREATE INDEX IF NOT EXISTS search_results_query_idx ON search_results(query);
 
+-- Create index for paging through searches in (timestamp, id) order
+CREATE INDEX IF NOT EXISTS search_results_timestamp_id_idx ON search_results(timestamp, id);
+
+-- Create index on payload_hash for the storage report and payload cleanup
+CREATE INDEX IF NOT EXISTS search_results_payload_hash_idx ON search_results(payload_hash);
+
 -- Create RLS policies for security
 ALTER TABLE search_results ENABLE ROW LEVEL SECURITY;
 
@@ -41,12 +82,16 @@ CREATE TABLE IF NOT EXISTS ai_responses (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     search_id UUID NOT NULL REFERENCES search_results(id) ON DELETE CASCADE,
     response TEXT NOT NULL,
-    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    fingerprint TEXT
 );
 
 -- Create index on search_id for faster lookups
 CREATE INDEX IF NOT EXISTS ai_responses_search_id_idx ON ai_responses(search_id);
 
+-- Create index on fingerprint for AI response cache lookups
+CREATE INDEX IF NOT EXISTS ai_responses_fingerprint_idx ON ai_responses(fingerprint, timestamp DESC);
+
 -- Create RLS policies for security
 ALTER TABLE ai_responses ENABLE ROW LEVEL SECURITY;
 
@@ -61,6 +106,53 @@ CREATE POLICY "Public can insert ai_responses"
     FOR INSERT
     WITH CHECK (true);
 
+-- Create recent_queries table: one row per normalized query, upserted on every search
+CREATE TABLE IF NOT EXISTS recent_queries (
+    normalized_query TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Create index on timestamp for the newest-first listing
+CREATE INDEX IF NOT EXISTS recent_queries_timestamp_idx ON recent_queries(timestamp DESC);
+
+-- Create RLS policies for security
+ALTER TABLE recent_queries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public can read recent_queries"
+    ON recent_queries
+    FOR SELECT
+    USING (true);
+
+CREATE POLICY "Public can insert recent_queries"
+    ON recent_queries
+    FOR INSERT
+    WITH CHECK (true);
+
+CREATE POLICY "Public can update recent_queries"
+    ON recent_queries
+    FOR UPDATE
+    USING (true);
+
+-- Storage report: JSON bytes the rows reference versus the bytes actually stored
+CREATE OR REPLACE VIEW search_payload_storage AS
+SELECT
+    (SELECT count(*) FROM search_results) AS searches,
+    (SELECT count(*) FROM search_results WHERE payload_hash IS NOT NULL) AS searches_by_hash,
+    (SELECT count(*) FROM search_payloads) AS payloads,
+    (SELECT COALESCE(sum(p.raw_size), 0)
+        FROM search_results r JOIN search_payloads p ON p.hash = r.payload_hash) AS logical_bytes,
+    (SELECT COALESCE(sum(stored_size), 0) FROM search_payloads) AS stored_bytes,
+    (SELECT COALESCE(sum(p.raw_size), 0)
+        FROM search_results r JOIN search_payloads p ON p.hash = r.payload_hash)
+        - (SELECT COALESCE(sum(stored_size), 0) FROM search_payloads) AS saved_bytes,
+    (SELECT COALESCE(sum(
+            COALESCE(pg_column_size(organic_results), 0) + COALESCE(pg_column_size(knowledge_graph), 0)
+            + COALESCE(pg_column_size(local_results), 0) + COALESCE(pg_column_size(related_questions), 0)
+            + COALESCE(pg_column_size(inline_images), 0) + COALESCE(pg_column_size(answer_box), 0)
+        ), 0)
+        FROM search_results WHERE payload_hash IS NULL) AS inline_bytes;
+
 -- Authenticated policies (commented out since we're not using auth)
 /*
 CREATE POLICY "Authenticated users can read search_results"
@@ -0,0 +1,8 @@
+-- Adds the using_mock_data flag and the (timestamp, id) paging index to search_results
+-- Run this once on databases created before they were part of init.sql
+
+-- Mock fallback rows are stored for /api/search/{id} but kept out of the local index and suggestions
+ALTER TABLE search_results ADD COLUMN IF NOT EXISTS using_mock_data BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Create index for paging through searches in (timestamp, id) order
+CREATE INDEX IF NOT EXISTS search_results_timestamp_id_idx ON search_results(timestamp, id);
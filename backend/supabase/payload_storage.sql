@@ -0,0 +1,62 @@
+-- Adds content-addressed payload storage (SEARCH_PAYLOAD_STORAGE=content_addressed)
+-- Run this once on databases created before search_payloads was part of init.sql,
+-- then move existing rows with: python -m src.payload_store migrate
+
+-- One row per distinct set of search sections, keyed by the sha256 of their canonical JSON
+-- and compressed with zstd (or zlib when the backend runs without the zstandard package)
+CREATE TABLE IF NOT EXISTS search_payloads (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data BYTEA NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Compressed bytes are already dense; skip TOAST compression of the column
+ALTER TABLE search_payloads ALTER COLUMN data SET STORAGE EXTERNAL;
+
+-- Rows reference their payload instead of carrying the sections inline
+ALTER TABLE search_results ADD COLUMN IF NOT EXISTS payload_hash TEXT REFERENCES search_payloads(hash);
+ALTER TABLE search_results ALTER COLUMN organic_results DROP NOT NULL;
+
+-- Create index on payload_hash for the storage report and payload cleanup
+CREATE INDEX IF NOT EXISTS search_results_payload_hash_idx ON search_results(payload_hash);
+
+-- Create RLS policies for security
+ALTER TABLE search_payloads ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public can read search_payloads"
+    ON search_payloads
+    FOR SELECT
+    USING (true);
+
+CREATE POLICY "Public can insert search_payloads"
+    ON search_payloads
+    FOR INSERT
+    WITH CHECK (true);
+
+-- Payloads are upserted by hash
+CREATE POLICY "Public can update search_payloads"
+    ON search_payloads
+    FOR UPDATE
+    USING (true);
+
+-- Storage report: JSON bytes the rows reference versus the bytes actually stored
+CREATE OR REPLACE VIEW search_payload_storage AS
+SELECT
+    (SELECT count(*) FROM search_results) AS searches,
+    (SELECT count(*) FROM search_results WHERE payload_hash IS NOT NULL) AS searches_by_hash,
+    (SELECT count(*) FROM search_payloads) AS payloads,
+    (SELECT COALESCE(sum(p.raw_size), 0)
+        FROM search_results r JOIN search_payloads p ON p.hash = r.payload_hash) AS logical_bytes,
+    (SELECT COALESCE(sum(stored_size), 0) FROM search_payloads) AS stored_bytes,
+    (SELECT COALESCE(sum(p.raw_size), 0)
+        FROM search_results r JOIN search_payloads p ON p.hash = r.payload_hash)
+        - (SELECT COALESCE(sum(stored_size), 0) FROM search_payloads) AS saved_bytes,
+    (SELECT COALESCE(sum(
+            COALESCE(pg_column_size(organic_results), 0) + COALESCE(pg_column_size(knowledge_graph), 0)
+            + COALESCE(pg_column_size(local_results), 0) + COALESCE(pg_column_size(related_questions), 0)
+            + COALESCE(pg_column_size(inline_images), 0) + COALESCE(pg_column_size(answer_box), 0)
+        ), 0)
+        FROM search_results WHERE payload_hash IS NULL) AS inline_bytes;
@@ -0,0 +1,46 @@
+-- Adds the recent_queries table that backs GET /api/recent_searches
+-- Run this once on databases created before the table was part of init.sql
+
+-- One row per normalized query (lowercased, whitespace collapsed), upserted on every search
+CREATE TABLE IF NOT EXISTS recent_queries (
+    normalized_query TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Create index on timestamp for the newest-first listing
+CREATE INDEX IF NOT EXISTS recent_queries_timestamp_idx ON recent_queries(timestamp DESC);
+
+-- Create RLS policies for security
+ALTER TABLE recent_queries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public can read recent_queries"
+    ON recent_queries
+    FOR SELECT
+    USING (true);
+
+CREATE POLICY "Public can insert recent_queries"
+    ON recent_queries
+    FOR INSERT
+    WITH CHECK (true);
+
+CREATE POLICY "Public can update recent_queries"
+    ON recent_queries
+    FOR UPDATE
+    USING (true);
+
+-- Backfill from existing searches, keeping the latest spelling of each query
+INSERT INTO recent_queries (normalized_query, query, timestamp)
+SELECT DISTINCT ON (normalized_query) normalized_query, query, timestamp
+FROM (
+    SELECT
+        lower(regexp_replace(trim(query), '\s+', ' ', 'g')) AS normalized_query,
+        trim(query) AS query,
+        timestamp
+    FROM search_results
+) AS searches
+WHERE normalized_query <> ''
+ORDER BY normalized_query, timestamp DESC
+ON CONFLICT (normalized_query) DO UPDATE
+    SET query = EXCLUDED.query, timestamp = EXCLUDED.timestamp
+    WHERE recent_queries.timestamp < EXCLUDED.timestamp;
@@ -1,6 +1,8 @@
-from serpapi import GoogleSearch
+import asyncio
 import json
 
+from src.serpapi_client import SerpAPIClient
+
 # Parameters based on what's in our backend code
 params = {
     'q': 'testing serpapi',
@@ -11,10 +13,12 @@ params = {
     'hl': 'en'
 }
 
-print('Making SerpAPI call...')
-try:
-    search = GoogleSearch(params)
-    results = search.get_dict()
+async def run():
+    client = SerpAPIClient()
+    try:
+        results = await client.search(params)
+    finally:
+        await client.close()
     print(f'Results received: {results.keys() if results else "None"}')
     print("Full response:")
     print(json.dumps(results, indent=2)[:1000])  # Print first 1000 chars to avoid overwhelming the output
@@ -24,5 +28,9 @@ try:
         first_result = results["organic_results"][0]
         print(f"First result title: {first_result.get('title')}")
         print(f"First result snippet: {first_result.get('snippet')}")
+
+print('Making SerpAPI call...')
+try:
+    asyncio.run(run())
 except Exception as e:
-    print(f'Error: {e}') 
\ No newline at end of file
+    print(f'Error: {e}') 
@@ -7,7 +7,7 @@ export interface SearchParams {
 export interface AIResponseResult {
   search_id: string;
   ai_response: string | null;
-  status: 'pending' | 'complete';
+  status: 'pending' | 'complete' | 'queue_full' | 'failed';
 }
 
 export const performSearch = async ({ 
@@ -61,6 +61,11 @@ export const pollForAIResponse = async (searchId: string, maxAttempts = 10, inte
       if (data.status === 'complete' && data.ai_response) {
         return data.ai_response;
       }
+
+      // The server gave up on this generation (busy or failed); stop polling
+      if (data.status === 'queue_full' || data.status === 'failed') {
+        return null;
+      }
       
       // If still pending, wait and try again
       await new Promise(resolve => setTimeout(resolve, interval));
@@ -72,4 +77,39 @@ export const pollForAIResponse = async (searchId: string, maxAttempts = 10, inte
     console.error('Error polling for AI response:', error);
     return null;
   }
-}; 
\ No newline at end of file
+}; 
+// Streams the AI response over Server-Sent Events, reporting partial text through
+// onToken. Falls back to polling when EventSource is unavailable or the stream fails.
+export const streamAIResponse = (searchId: string, onToken?: (partial: string) => void): Promise<string | null> => {
+  if (typeof window === 'undefined' || typeof EventSource === 'undefined') {
+    return pollForAIResponse(searchId);
+  }
+
+  return new Promise(resolve => {
+    const source = new EventSource(`/api/search/${searchId}/ai_response/stream`);
+    let text = '';
+    let settled = false;
+
+    const finish = (result: string | null | Promise<string | null>) => {
+      if (settled) return;
+      settled = true;
+      source.close();
+      resolve(result);
+    };
+
+    source.addEventListener('token', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      text += data.content;
+      onToken?.(text);
+    });
+
+    source.addEventListener('done', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      finish(data.ai_response);
+    });
+
+    // The server does not know this generation (or the stream broke): poll instead
+    source.addEventListener('pending', () => finish(pollForAIResponse(searchId)));
+    source.onerror = () => finish(pollForAIResponse(searchId));
+  });
+};
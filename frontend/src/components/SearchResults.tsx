@@ -7,7 +7,7 @@ import RelatedQuestions from "./RelatedQuestions";
 import LocalMap from "./LocalMap";
 import SearchBar from "./SearchBar";
 import { Search, ChevronDown, X, MessageSquare } from "lucide-react";
-import { performSearch, pollForAIResponse } from "@/api/search";
+import { performSearch, streamAIResponse } from "@/api/search";
 import AIGeneratedResponse from './AIGeneratedResponse';
 
 interface SearchResultsProps {
@@ -223,7 +223,14 @@ const SearchResults: React.FC<SearchResultsProps> = ({ query: initialQuery }) =>
     ));
     
     try {
-      const aiResponse = await pollForAIResponse(serverSearchId);
+      const aiResponse = await streamAIResponse(serverSearchId, partial => {
+        // Show tokens as they arrive
+        setSearchHistory(prev => prev.map(item => 
+          item.id === clientSearchId 
+            ? { ...item, aiResponseLoading: false, results: { ...item.results, ai_response: partial } } 
+            : item
+        ));
+      });
       
       // Update search history with AI response
       setSearchHistory(prev => prev.map(item => 
@@ -349,7 +356,7 @@ const SearchResults: React.FC<SearchResultsProps> = ({ query: initialQuery }) =>
       // Case 1: local_results is directly an array of places from our backend transformation
       placesData = results.local_results;
     } else if (results.local_results.places && Array.isArray(results.local_results.places) && results.local_results.places.length > 0) {
-      // Case 2: local_results has a 'places' property that is an array (from mockSerpData.json format)
+      // Case 2: local_results has a 'places' property that is an array (from the backend mock fixture format)
       placesData = results.local_results.places;
     } else {
       // Return null instead of using hardcoded fallback data
@@ -0,0 +1,107 @@
+"""
+Database round trips on the search critical path.
+
+Runs the search pipeline (``execute_search``) against local fake SerpAPI and
+PostgREST servers and counts the PostgREST requests issued before the response
+is ready. Three variants are compared:
+
+* legacy: the previous flow (insert, then a re-read with ``select("*")``; a third
+  update followed whenever organic results were missing)
+* direct: ``DB_WRITE_BEHIND=false``; one insert with ``return=representation``
+* write-behind: the insert is queued, so nothing hits the database on the request path
+
+Usage:
+    python -m tests.benchmarks.bench_db_round_trips --requests 50 --db-latency 0.01
+"""
+import os
+import time
+import asyncio
+import logging
+import argparse
+import contextvars
+
+from .fake_upstreams import FakeServer, create_fake_serpapi_app, create_fake_postgrest_app
+
+critical_path = contextvars.ContextVar("critical_path", default=None)
+
+
+def install_counter():
+    from src.postgrest import AsyncPostgrestClient
+
+    original = AsyncPostgrestClient._request
+
+    async def counting_request(self, method, path, **kwargs):
+        counter = critical_path.get()
+        if counter is not None:
+            counter.append(method)
+        return await original(self, method, path, **kwargs)
+
+    AsyncPostgrestClient._request = counting_request
+
+
+async def run_variant(name: str, total: int) -> dict:
+    from src import main, db
+    from src.models import SearchQuery
+    from src.cache import make_search_cache_key
+
+    main.search_cache.enabled = False
+    # Only the request path is measured; no AI generation is started
+    main.start_ai_generation = lambda *args: None
+    db.write_queue.write_behind = name == "write-behind"
+    client = db.storage_client
+    round_trips, latencies = 0, []
+
+    for i in range(total):
+        query_request = SearchQuery(query=f"{name} query {i}")
+        calls = []
+        token = critical_path.set(calls)
+        start = time.perf_counter()
+        try:
+            response = await main.execute_search(query_request, make_search_cache_key(query_request))
+            if name == "legacy":
+                # The re-read search() used to issue to validate the insert
+                saved = await client.select("search_results", filters={"id": f"eq.{response['search_id']}"})
+                if saved and not saved[0].get("organic_results"):
+                    await client.update("search_results", {"organic_results": []}, {"id": f"eq.{response['search_id']}"})
+        finally:
+            critical_path.reset(token)
+        latencies.append(time.perf_counter() - start)
+        round_trips += len(calls)
+
+    await db.close_db()
+    await main.serpapi_client.close()
+    latencies.sort()
+    return {
+        "round_trips_per_request": round_trips / total,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--db-latency", type=float, default=0.01, help="fake PostgREST latency in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    with FakeServer(create_fake_serpapi_app(latency=0.0)) as serpapi, \
+            FakeServer(create_fake_postgrest_app(latency=args.db_latency)) as postgrest:
+        os.environ.update(
+            SERPAPI_BASE_URL=serpapi.url,
+            SERPAPI_KEY="bench",
+            DEEPSEEK_API_KEY=os.getenv("DEEPSEEK_API_KEY", "bench"),
+            SUPABASE_URL=postgrest.url,
+            SUPABASE_KEY="bench",
+            LOG_LEVEL="ERROR",
+        )
+        install_counter()
+        for name in ("legacy", "direct", "write-behind"):
+            result = asyncio.run(run_variant(name, args.requests))
+            print(
+                f"{name:<14} {result['round_trips_per_request']:>5.2f} DB round trips/request   "
+                f"p50 {result['p50_ms']:>7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Response encoding benchmark for the ``/api/search`` body.
+
+Builds the response body from the coffee fixture in ``backend/fixtures`` with the search
+path's normalizer and compares:
+
+* response_model: FastAPI's default path (validate against ``SearchResponse``,
+  serialize, then render with the stdlib encoder)
+* json / orjson / msgspec: ``FastJSONResponse`` with each installed encoder,
+  rendering the already-built body directly
+
+``--scale`` enlarges the payload by repeating organic results, inline images,
+related questions and knowledge graph attributes.
+
+Usage:
+    python -m tests.benchmarks.bench_json_encoding --iterations 1000 --scale 1 10 50
+"""
+import time
+import asyncio
+import argparse
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from .fake_upstreams import load_mock_payload
+from src.models import SearchResponse
+from src.normalize import normalize_search_payload
+from src import responses
+
+RESPONSE_FIELD = create_response_field(name="Response_search", type_=SearchResponse)
+
+
+def enlarge(results: dict, scale: int) -> dict:
+    if scale <= 1:
+        return results
+    enlarged = dict(results)
+    for key in ("organic_results", "inline_images", "related_questions"):
+        items = results.get(key) or []
+        enlarged[key] = [dict(item) for item in items * scale]
+    graph = dict(results.get("knowledge_graph") or {})
+    for key, value in list(graph.items()):
+        if key not in ("title", "description"):
+            for i in range(1, scale):
+                graph[f"{key}_{i}"] = value
+    enlarged["knowledge_graph"] = graph
+    return enlarged
+
+
+def build_body(results: dict) -> dict:
+    return {
+        "query": "coffee",
+        **normalize_search_payload(results),
+        "ai_response": None,
+        "search_id": "bench",
+        "using_mock_data": False,
+        "mock_data_reason": None,
+        "cache_status": "miss",
+    }
+
+
+async def response_model_path(body: dict) -> bytes:
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=body, is_coroutine=True)
+    return JSONResponse(content=content).body
+
+
+def encoder_path(encode):
+    async def render(body: dict) -> bytes:
+        return encode(body)
+    return render
+
+
+async def measure(render, body: dict, iterations: int) -> dict:
+    size = len(await render(body))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await render(body)
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes": size,
+        "per_second": iterations / elapsed,
+        "mb_per_second": size * iterations / elapsed / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    variants = [("response_model", response_model_path)]
+    for name in ("json", "orjson", "msgspec"):
+        if name != "json" and getattr(responses, name) is None:
+            print(f"{name} not installed, skipping")
+            continue
+        variants.append((name, encoder_path(responses.resolve_encoder(name)[1])))
+
+    payload = load_mock_payload()
+    for scale in args.scale:
+        body = build_body(enlarge(payload, scale))
+        print(f"\nscale x{scale}")
+        for name, render in variants:
+            result = asyncio.run(measure(render, body, args.iterations))
+            print(
+                f"  {name:<15} {result['per_second']:>9.0f} responses/s   "
+                f"{result['mb_per_second']:>7.1f} MB/s   ({result['bytes'] / 1024:.1f} KiB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+DeepSeek client benchmark against a local mock LLM server.
+
+Compares the old pattern (a fresh ``httpx.AsyncClient`` per generation) with the
+shared, pooled ``DeepSeekClient``, streaming each answer to the end as the app
+does, and reports throughput and how many TCP connections each approach
+opened. Use ``--error-rate`` to exercise retries.
+
+Usage:
+    python -m tests.benchmarks.bench_llm_client --requests 200 --concurrency 20
+"""
+import time
+import asyncio
+import logging
+import argparse
+
+import httpx
+
+from .fake_upstreams import FakeServer, create_fake_llm_app
+from src.llm_client import DeepSeekClient
+
+PAYLOAD = {
+    "model": "deepseek-chat",
+    "messages": [{"role": "user", "content": "Summarise these snippets."}],
+    "max_tokens": 50,
+}
+
+
+async def run_per_call_clients(url: str, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    connects = 0
+
+    async def trace(event_name, info):
+        nonlocal connects
+        if event_name == "connection.connect_tcp.complete":
+            connects += 1
+
+    async def call():
+        async with semaphore:
+            async with httpx.AsyncClient() as client:
+                async with client.stream(
+                    "POST", url, json=dict(PAYLOAD, stream=True), timeout=30.0, extensions={"trace": trace}
+                ) as response:
+                    async for _ in response.aiter_lines():
+                        pass
+                    return response.status_code == 200
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call() for _ in range(total)), return_exceptions=True)
+    return {
+        "elapsed": time.perf_counter() - start,
+        "tcp_connects": connects,
+        "retries": 0,
+        "failures": sum(result is not True for result in results),
+    }
+
+
+async def run_shared_client(url: str, total: int, concurrency: int) -> dict:
+    client = DeepSeekClient(api_key="bench", api_url=url, max_connections=concurrency, max_keepalive=concurrency)
+    await client.start()
+
+    async def call():
+        async for _ in client.stream_chat_completion(PAYLOAD):
+            pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(total)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stats = client.stats()
+    await client.close()
+    return {
+        "elapsed": elapsed,
+        "tcp_connects": stats["tcp_connects"],
+        "retries": stats["retries"],
+        "failures": stats["failures"],
+    }
+
+
+def report(name: str, total: int, result: dict) -> None:
+    print(
+        f"{name:<22} {total / result['elapsed']:>8.1f} req/s   "
+        f"tcp connects {result['tcp_connects']:>5}   retries {result['retries']:>4}   failures {result['failures']:>4}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock LLM latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock LLM calls answering 503")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    with FakeServer(create_fake_llm_app(latency=args.latency, error_rate=args.error_rate)) as server:
+        url = f"{server.url}/v1/chat/completions"
+        report("client per call", args.requests, asyncio.run(run_per_call_clients(url, args.requests, args.concurrency)))
+        report("shared pooled client", args.requests, asyncio.run(run_shared_client(url, args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+End-to-end load test of the backend against local upstream stand-ins.
+
+Starts fake SerpAPI, DeepSeek and PostgREST servers (with configurable latency
+and error injection), then the FastAPI app itself under uvicorn, and drives
+concurrent load with an async client for a fixed duration. Virtual users pick
+endpoints by weight: searches (from a pool of queries, so repeats hit the
+caches), AI response polls for earlier searches, recent searches and health.
+
+Reports requests/s and p50/p95/p99 per endpoint plus the app's event-loop lag,
+measured by a ticker running on the server's loop. Results are written to a
+JSON file; pass an earlier file to ``--compare`` to print the difference.
+
+With ``--workers N`` the app is served by gunicorn with N uvicorn workers
+sharing state through the SQLite store, to check how throughput scales with
+workers (event-loop lag is not measured in this mode).
+
+``--follow-related P`` makes a user click one of the top related searches
+of a search with probability P, after ``--think-time`` seconds; those
+follow-ups are reported as ``related``. Together with ``--prefetch`` (which
+turns on the prefetch scheduler) this measures how much prefetching saves.
+
+``--db sqlite`` persists to the embedded SQLite backend in a temporary
+directory instead of the PostgREST stand-in, so the run needs no network
+database at all; ``--db none`` disables persistence.
+
+Usage:
+    python -m tests.benchmarks.bench_load --duration 20 --concurrency 50 --output load.json
+    python -m tests.benchmarks.bench_load --serpapi-error-rate 0.05 --llm-latency 1.0
+    python -m tests.benchmarks.bench_load --output after.json --compare before.json
+    python -m tests.benchmarks.bench_load --workers 4 --output workers4.json --compare workers1.json
+    python -m tests.benchmarks.bench_load --db sqlite --output sqlite.json --compare load.json
+    python -m tests.benchmarks.bench_load --follow-related 0.5 --prefetch --output prefetch.json --compare load.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import threading
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+
+from .fake_upstreams import (
+    BACKEND_DIR, FakeServer, free_port, create_fake_serpapi_app, create_fake_llm_app, create_fake_postgrest_app
+)
+
+ENDPOINTS = ("search", "ai_response", "recent", "health")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+async def loop_lag_ticker(stop: threading.Event, lags: List[float], interval: float = 0.01) -> None:
+    """Runs on the app's event loop; any delay past ``interval`` is time the loop was busy."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def drive_load(base_url: str, args) -> dict:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    queries = [f"load test query {i}" for i in range(args.unique_queries)]
+    search_ids: List[str] = []
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    deadline = time.perf_counter() + args.duration
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+
+        async def call(name: str, query: str = "") -> List[str]:
+            if name == "ai_response" and not search_ids:
+                name = "search"
+            related = []
+            start = time.perf_counter()
+            try:
+                if name in ("search", "related"):
+                    response = await client.post("/api/search", json={"query": query or random.choice(queries)})
+                    if response.status_code == 200:
+                        body = response.json()
+                        search_ids.append(body["search_id"])
+                        del search_ids[:-1000]
+                        related = body.get("related_searches") or []
+                elif name == "ai_response":
+                    response = await client.get(f"/api/search/{random.choice(search_ids)}/ai_response")
+                elif name == "recent":
+                    response = await client.get("/api/recent_searches")
+                else:
+                    response = await client.get("/api/health")
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                failed = True
+            latencies.setdefault(name, []).append(time.perf_counter() - start)
+            if failed:
+                errors[name] = errors.get(name, 0) + 1
+            return related
+
+        async def virtual_user() -> None:
+            while time.perf_counter() < deadline:
+                related = await call(random.choices(names, weights)[0])
+                if related and random.random() < args.follow_related:
+                    # Users mostly click the first suggestions
+                    await asyncio.sleep(args.think_time)
+                    await call("related", random.choice(related[:2]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = (await client.get("/api/stats")).json()
+
+    endpoints = {name: summarize(latencies[name], errors.get(name, 0), elapsed) for name in latencies if latencies[name]}
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "totals": {"requests": total, "errors": sum(errors.values()), "rps": round(total / elapsed, 2)},
+        "endpoints": endpoints,
+        "app_stats": stats,
+    }
+
+
+def run_gunicorn(args) -> dict:
+    """Serve the app with gunicorn and ``args.workers`` workers, and load it."""
+    port = free_port()
+    state_path = os.path.join(tempfile.mkdtemp(), "state.sqlite3")
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), SHARED_STATE_PATH=state_path)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "src.main:app"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                if httpx.get(f"{base_url}/api/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline or process.poll() is not None:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.1)
+        return asyncio.run(drive_load(base_url, args))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result: dict) -> None:
+    totals = result["totals"]
+    print(f"{totals['requests']} requests in {result['elapsed_s']} s, {totals['rps']} req/s, {totals['errors']} errors")
+    for name, row in result["endpoints"].items():
+        print(
+            f"  {name:<12} {row['rps']:>8.1f} req/s   p50 {row['p50_ms']:>8.2f}   p95 {row['p95_ms']:>8.2f}   "
+            f"p99 {row['p99_ms']:>8.2f} ms   errors {row['errors']}"
+        )
+    lag = result["event_loop_lag_ms"]
+    if lag:
+        print(f"  event loop lag   p50 {lag['p50']:.2f}   p99 {lag['p99']:.2f}   max {lag['max']:.2f} ms")
+    upstreams = result["upstreams"]
+    print(f"  upstream calls   serpapi {upstreams['serpapi_requests']}   deepseek {upstreams['deepseek_requests']}")
+    prefetch = result["app_stats"].get("prefetch") or {}
+    if prefetch.get("active"):
+        print(
+            f"  prefetch         fetched {prefetch['fetched']}   used {prefetch['used']}   "
+            f"hit ratio {prefetch['hit_ratio']:.2f}   saved {prefetch['saved_seconds']:.1f} s   skipped {prefetch['skipped']}"
+        )
+
+
+def print_comparison(result: dict, baseline: dict) -> None:
+    print(f"\nCompared with {baseline['meta'].get('git_commit', '?')} ({baseline['meta'].get('timestamp', '?')}):")
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    for name, row in result["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        print(
+            f"  {name:<12} req/s {delta(row['rps'], old['rps']):>8}   p95 {delta(row['p95_ms'], old['p95_ms']):>8}   "
+            f"p99 {delta(row['p99_ms'], old['p99_ms']):>8}"
+        )
+    old_lag = baseline.get("event_loop_lag_ms")
+    if old_lag and result["event_loop_lag_ms"]:
+        print(f"  event loop lag max {delta(result['event_loop_lag_ms']['max'], old_lag['max'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--mix", default="search=60,ai_response=25,recent=10,health=5", help="endpoint weights")
+    parser.add_argument("--unique-queries", type=int, default=200, help="size of the query pool")
+    parser.add_argument("--serpapi-latency", type=float, default=0.1)
+    parser.add_argument("--serpapi-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    parser.add_argument("--db-error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="serve with gunicorn and this many workers")
+    parser.add_argument("--db", choices=["postgrest", "sqlite", "none"], default="postgrest", help="storage backend")
+    parser.add_argument("--no-db", action="store_true", help="same as --db none")
+    parser.add_argument("--related-searches", type=int, default=4, help="related searches per fake SerpAPI answer")
+    parser.add_argument("--follow-related", type=float, default=0.0, help="probability of clicking a related search")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds before clicking a related search")
+    parser.add_argument("--prefetch", action="store_true", help="enable the prefetch scheduler")
+    parser.add_argument("--output", default="bench_load.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    if args.no_db:
+        args.db = "none"
+
+    serpapi_app = create_fake_serpapi_app(args.serpapi_latency, args.serpapi_error_rate, args.related_searches)
+    llm_app = create_fake_llm_app(args.llm_latency, args.llm_error_rate)
+    lags: List[float] = []
+    with FakeServer(serpapi_app) as serpapi, FakeServer(llm_app) as llm, \
+            FakeServer(create_fake_postgrest_app(args.db_latency, args.db_error_rate)) as postgrest:
+        # Keep every piece of on-disk state out of backend/data
+        state_dir = tempfile.mkdtemp(prefix="bench-load-")
+        os.environ.update(
+            SERPAPI_BASE_URL=serpapi.url,
+            SERPAPI_KEY="bench",
+            DEEPSEEK_API_KEY="bench",
+            DEEPSEEK_API_URL=f"{llm.url}/v1/chat/completions",
+            DB_BACKEND="supabase" if args.db == "postgrest" else args.db,
+            DB_SQLITE_PATH=os.path.join(state_dir, "bench.sqlite3"),
+            LOCAL_INDEX_PATH=os.path.join(state_dir, "local-index.sqlite3"),
+            SHARED_STATE_PATH=os.path.join(state_dir, "shared-state.sqlite3"),
+            SEARCH_CACHE_DIR=os.path.join(state_dir, "search-cache"),
+            PAYLOAD_CAPTURE_PATH=os.path.join(state_dir, "payloads.jsonl"),
+            SUPABASE_URL=postgrest.url,
+            SUPABASE_KEY="bench",
+            LOG_LEVEL=os.getenv("LOG_LEVEL", "ERROR"),
+            PREFETCH_ENABLED="true" if args.prefetch else "false",
+        )
+        if args.workers > 1:
+            result = run_gunicorn(args)
+        else:
+            from src.main import app
+
+            with FakeServer(app) as server:
+                stop = threading.Event()
+                ticker = asyncio.run_coroutine_threadsafe(loop_lag_ticker(stop, lags), server.loop)
+                result = asyncio.run(drive_load(server.url, args))
+                stop.set()
+                ticker.result(timeout=5)
+
+    lags.sort()
+    result["event_loop_lag_ms"] = {
+        "p50": round(percentile(lags, 0.50) * 1000, 2),
+        "p99": round(percentile(lags, 0.99) * 1000, 2),
+        "max": round(lags[-1] * 1000, 2),
+    } if lags else None
+    result["upstreams"] = {
+        "serpapi_requests": serpapi_app.state.stats["requests"],
+        "deepseek_requests": llm_app.state.stats["requests"],
+    }
+    result["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "argv": sys.argv[1:],
+        "config": vars(args),
+    }
+
+    print_report(result)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(result, json.load(f))
+
+
+if __name__ == "__main__":
+    logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
+    main()
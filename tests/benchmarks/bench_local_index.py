@@ -0,0 +1,121 @@
+"""
+Local full-text index benchmark (``mode=local`` searches).
+
+Builds a ``LocalIndex`` in a temporary directory from synthetic searches whose
+titles and snippets are drawn from the words of the coffee fixture plus
+generated terms, with Zipf-distributed frequencies like natural text. Then
+times BM25 queries of two or three terms through ``LocalIndex.search`` (the
+same call the search handler makes, thread hop included).
+
+Reports indexing throughput, index size and query latency percentiles.
+
+Usage:
+    python -m tests.benchmarks.bench_local_index --documents 100000 --queries 2000
+"""
+import os
+import re
+import time
+import random
+import asyncio
+import itertools
+import argparse
+import tempfile
+
+from .fake_upstreams import load_mock_payload
+
+RESULTS_PER_SEARCH = 10
+
+
+def vocabulary(size: int) -> list:
+    payload = load_mock_payload()
+    text = " ".join(
+        f"{result.get('title', '')} {result.get('snippet', '')}" for result in payload.get("organic_results", [])
+    )
+    words = sorted(set(word.lower() for word in re.findall(r"[A-Za-z]{3,}", text)))
+    return words + [f"term{i}" for i in range(max(0, size - len(words)))]
+
+
+class Words:
+    """Samples words with Zipf frequencies (the n-th word is 1/n as common as the first)."""
+
+    def __init__(self, words: list, rng: random.Random):
+        self.words = words
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    def sample(self, k: int) -> str:
+        return " ".join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=k))
+
+
+def synthetic_searches(words: Words, documents: int):
+    for start in range(0, documents, RESULTS_PER_SEARCH):
+        query = words.sample(2)
+        results = [
+            {
+                "title": words.sample(6).title(),
+                "link": f"https://example.com/{start + i}",
+                "snippet": words.sample(30),
+                "position": i + 1,
+            }
+            for i in range(min(RESULTS_PER_SEARCH, documents - start))
+        ]
+        yield f"search-{start}", query, results
+
+
+async def run(args) -> None:
+    rng = random.Random(42)
+    words = Words(vocabulary(args.vocabulary), rng)
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-local-index-"), "index.sqlite3")
+    # Point the module's default index there too, so nothing is written to backend/data
+    os.environ["LOCAL_INDEX_PATH"] = path
+    from src.local_index import LocalIndex
+
+    index = LocalIndex(path=path, enabled=True, refresh_interval=0)
+
+    start = time.perf_counter()
+    batch = []
+    for search in synthetic_searches(words, args.documents):
+        batch.append(search)
+        if len(batch) == index.batch_size:
+            index._index_batch(batch)
+            batch = []
+    if batch:
+        index._index_batch(batch)
+    elapsed = time.perf_counter() - start
+    assert index.documents == args.documents, index.documents
+    size = os.path.getsize(path) + (os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") else 0)
+    print(f"{index.documents} documents from a {len(words.words)}-word vocabulary")
+    print(f"indexing       {index.documents / elapsed:>10.0f} documents/s   index {size / 1024 / 1024:.1f} MiB")
+
+    latencies, hits = [], 0
+    for _ in range(args.queries):
+        query = words.sample(rng.choice((2, 3)))
+        start = time.perf_counter()
+        results = await index.search(query, args.limit)
+        latencies.append(time.perf_counter() - start)
+        assert len(results) <= args.limit and len({result["link"] for result in results}) == len(results), query
+        hits += len(results)
+    assert hits, "no query matched any document"
+    latencies.sort()
+
+    def pct(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+    print(
+        f"query          p50 {pct(0.50):>7.2f}   p95 {pct(0.95):>7.2f}   p99 {pct(0.99):>7.2f} ms   "
+        f"{hits / len(latencies):.1f} hits/query"
+    )
+    await index.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--limit", type=int, default=10, help="results per query")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
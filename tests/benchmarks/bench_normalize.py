@@ -0,0 +1,157 @@
+"""
+Normalization micro-benchmark over the coffee fixture in ``backend/fixtures``.
+
+Compares the previous search pipeline with the single-pass normalizer for the
+work done between receiving a SerpAPI payload and producing the response body:
+
+* legacy: Pydantic models per section, ``model_dump()`` into ``SearchResult``,
+  a ``SearchResponse`` built from the same models, then FastAPI's response
+  validation and serialization
+* single-pass: ``normalize_search_payload`` once, ``SearchResult.model_construct``
+  for the row and a ``JSONResponse`` over the shared sections
+
+Reports µs per request and the peak memory allocated while handling one
+request (measured with tracemalloc in a separate pass, so tracing overhead does
+not skew the timings). Use ``--organic`` to pad the payload to a larger result
+count.
+
+Usage:
+    python -m tests.benchmarks.bench_normalize --iterations 2000 --organic 100
+"""
+import time
+import asyncio
+import argparse
+import tracemalloc
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from .fake_upstreams import load_mock_payload
+from src.models import (
+    SearchResult, SearchResponse, OrganicResult, LocalResult, KnowledgeGraph, RelatedQuestion
+)
+from src.normalize import normalize_search_payload, stored_sections, extract_related_searches
+
+RESPONSE_FIELD = create_response_field(name="Response_search", type_=SearchResponse)
+
+
+async def legacy_pipeline(results: dict) -> bytes:
+    organic = [
+        OrganicResult(
+            title=r.get("title", ""), link=r.get("link", ""), snippet=r.get("snippet", ""),
+            position=r.get("position", 0), thumbnail=r.get("thumbnail"),
+        )
+        for r in results.get("organic_results", []) if isinstance(r, dict)
+    ]
+    places = results.get("local_results", {}).get("places", [])
+    local = [
+        LocalResult(
+            title=r.get("title", ""), address=r.get("address", ""), rating=r.get("rating"),
+            reviews=r.get("reviews"), phone=r.get("phone"), website=r.get("website"),
+            thumbnail=r.get("thumbnail"),
+        )
+        for r in places if isinstance(r, dict)
+    ]
+    graph = results.get("knowledge_graph")
+    knowledge_graph = KnowledgeGraph(
+        title=graph.get("title", ""),
+        description=graph.get("description"),
+        attributes={k: v for k, v in graph.items() if k not in ["title", "description"]},
+    ) if graph else None
+    questions = [RelatedQuestion(**q) for q in results.get("related_questions", [])]
+    related_searches = extract_related_searches(results.get("related_searches", []))
+
+    SearchResult(
+        query="coffee",
+        organic_results=[r.model_dump() for r in organic],
+        local_results=[r.model_dump() for r in local] or None,
+        knowledge_graph=knowledge_graph.model_dump() if knowledge_graph else None,
+        related_questions=[q.model_dump() for q in questions] or None,
+        related_searches=related_searches,
+        inline_images=results.get("inline_images", []),
+        answer_box=results.get("answer_box"),
+    ).model_dump()
+
+    response = SearchResponse(
+        query="coffee",
+        organic_results=organic,
+        local_results=local,
+        knowledge_graph=knowledge_graph,
+        related_questions=questions,
+        related_searches=related_searches,
+        inline_images=results.get("inline_images", []),
+        answer_box=results.get("answer_box"),
+        search_id="bench",
+    )
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=response, is_coroutine=True)
+    return JSONResponse(content=content).body
+
+
+async def single_pass_pipeline(results: dict) -> bytes:
+    sections = normalize_search_payload(results)
+    dict(SearchResult.model_construct(query="coffee", **stored_sections(sections)))
+    body = {
+        "query": "coffee",
+        **sections,
+        "ai_response": None,
+        "search_id": "bench",
+        "using_mock_data": False,
+        "mock_data_reason": None,
+        "cache_status": "miss",
+    }
+    return JSONResponse(content=body).body
+
+
+async def measure(pipeline, results: dict, iterations: int) -> dict:
+    for _ in range(min(iterations, 100)):
+        await pipeline(results)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await pipeline(results)
+    elapsed = time.perf_counter() - start
+
+    samples = min(iterations, 200)
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        await pipeline(results)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - baseline
+    tracemalloc.stop()
+
+    return {
+        "us_per_request": elapsed / iterations * 1e6,
+        "peak_kib_per_request": peak_total / samples / 1024,
+    }
+
+
+def pad_organic(results: dict, count: int) -> dict:
+    organic = results.get("organic_results", [])
+    if count <= len(organic) or not organic:
+        return results
+    padded = [dict(organic[i % len(organic)], position=i + 1) for i in range(count)]
+    return {**results, "organic_results": padded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--organic", type=int, default=0, help="pad organic results to this many entries")
+    args = parser.parse_args()
+
+    results = pad_organic(load_mock_payload(), args.organic)
+    print(f"{len(results.get('organic_results', []))} organic results, {args.iterations} iterations")
+    for name, pipeline in (("legacy", legacy_pipeline), ("single-pass", single_pass_pipeline)):
+        result = asyncio.run(measure(pipeline, results, args.iterations))
+        print(
+            f"{name:<12} {result['us_per_request']:>9.1f} µs/request   "
+            f"peak {result['peak_kib_per_request']:>8.1f} KiB allocated/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
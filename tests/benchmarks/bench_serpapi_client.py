@@ -0,0 +1,85 @@
+"""
+Concurrent SerpAPI fetch benchmark against a local fake SerpAPI server.
+
+Compares the old blocking fetch path (a synchronous HTTP call made inside the
+event loop, which is what ``GoogleSearch(params).get_dict()`` did) with the
+pooled ``SerpAPIClient``. A ticker coroutine measures how long the event loop
+is starved, which is what ``/api/health`` experienced under load.
+
+Usage:
+    python -m tests.benchmarks.bench_serpapi_client --requests 100 --latency 0.1
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from .fake_upstreams import FakeServer, create_fake_serpapi_app
+from src.serpapi_client import SerpAPIClient
+
+PARAMS = {"engine": "google", "q": "coffee", "num": 10, "api_key": "bench", "gl": "us", "hl": "en"}
+
+
+async def ticker(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_blocking(base_url: str, total: int) -> dict:
+    client = httpx.Client(base_url=base_url, timeout=30)
+
+    async def fetch():
+        # Synchronous call inside a coroutine blocks the whole loop
+        client.get("/search", params=PARAMS).json()
+
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    client.close()
+    return {"elapsed": elapsed, "max_loop_lag": max(lags, default=0.0)}
+
+
+async def run_async(base_url: str, total: int, concurrency: int) -> dict:
+    client = SerpAPIClient(base_url=base_url, max_concurrency=concurrency)
+
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(client.search(PARAMS) for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    await client.close()
+    return {"elapsed": elapsed, "max_loop_lag": max(lags, default=0.0)}
+
+
+def report(name: str, total: int, result: dict) -> None:
+    print(
+        f"{name:<28} {total / result['elapsed']:>8.1f} req/s   "
+        f"elapsed {result['elapsed']:>6.2f}s   max loop lag {result['max_loop_lag'] * 1000:>8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake SerpAPI latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    with FakeServer(create_fake_serpapi_app(latency=args.latency)) as server:
+        report("blocking (GoogleSearch)", args.requests, asyncio.run(run_blocking(server.url, args.requests)))
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_async(server.url, args.requests, concurrency))
+            report(f"async, concurrency={concurrency}", args.requests, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Query suggestion benchmark (``GET /api/suggest``).
+
+Loads a ``QuerySuggestions`` index from synthetic search history: queries of
+one to four words with Zipf-distributed word frequencies, repeated with
+Zipf-distributed popularity like real query logs, each with a few related
+searches. Then times ``suggest`` for prefixes of random lengths typed out of
+popular queries, and ``add`` for newly saved searches.
+
+Reports load time, index size and per-call latency percentiles.
+
+Usage:
+    python -m tests.benchmarks.bench_suggest --queries 100000 --searches 300000
+"""
+import time
+import random
+import argparse
+import itertools
+from datetime import datetime, timedelta, timezone
+
+from . import fake_upstreams  # noqa: F401  (puts the backend on sys.path)
+from src.cache import normalize_query_text
+from src.suggest import QuerySuggestions
+
+
+def words(size: int, rng: random.Random) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 9))) for _ in range(size)]
+
+
+def zipf_weights(size: int) -> list:
+    return list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+
+
+def percentiles(latencies: list) -> str:
+    latencies.sort()
+
+    def pct(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1e6
+
+    return f"p50 {pct(0.50):>7.1f}   p95 {pct(0.95):>7.1f}   p99 {pct(0.99):>7.1f} us"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100000, help="distinct queries in the history")
+    parser.add_argument("--searches", type=int, default=300000, help="stored searches to load")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    vocabulary = words(args.vocabulary, rng)
+    word_weights = zipf_weights(len(vocabulary))
+    queries = [
+        " ".join(rng.choices(vocabulary, cum_weights=word_weights, k=rng.randint(1, 4)))
+        for _ in range(args.queries)
+    ]
+    query_weights = zipf_weights(len(queries))
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": f"search-{i}",
+            "query": query,
+            "timestamp": (now - timedelta(days=90 * (args.searches - i) / args.searches)).isoformat(),
+            "related_searches": rng.choices(queries, cum_weights=query_weights, k=4),
+        }
+        for i, query in enumerate(rng.choices(queries, cum_weights=query_weights, k=args.searches))
+    ]
+
+    index = QuerySuggestions(enabled=True, refresh_interval=0)
+    start = time.perf_counter()
+    for offset in range(0, len(rows), index.batch_size):
+        index._load(rows[offset:offset + index.batch_size])
+    index._warm()
+    elapsed = time.perf_counter() - start
+    print(f"{len(index._keys)} queries from {len(rows)} searches loaded in {elapsed:.2f}s")
+
+    latencies = []
+    for _ in range(args.lookups):
+        query = rng.choices(queries, cum_weights=query_weights)[0]
+        prefix = query[:rng.randint(0, len(query))]
+        start = time.perf_counter()
+        suggestions = index.suggest(prefix)
+        latencies.append(time.perf_counter() - start)
+        keys = [normalize_query_text(suggestion["query"]) for suggestion in suggestions]
+        assert all(key.startswith(normalize_query_text(prefix)) for key in keys), (prefix, keys)
+        scores = [index._entries[key].score for key in keys]
+        assert scores == sorted(scores, reverse=True), (prefix, keys)
+    print(f"suggest   {percentiles(latencies)}   {len(index._top)} top lists")
+
+    latencies = []
+    for i in range(args.lookups // 10):
+        query = rng.choice(queries) if rng.random() < 0.8 else " ".join(rng.choices(vocabulary, k=3))
+        start = time.perf_counter()
+        index.add(f"new-{i}", query, rng.choices(queries, k=4))
+        latencies.append(time.perf_counter() - start)
+        assert normalize_query_text(query) in index._entries, query
+    print(f"add       {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    main()
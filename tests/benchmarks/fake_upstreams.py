@@ -0,0 +1,245 @@
+"""
+Local stand-ins for the upstream services used by the backend.
+
+The fake servers run uvicorn in a background thread so benchmarks can point the
+backend clients at ``http://127.0.0.1:<port>`` and measure throughput without
+network access, API keys or quota.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import threading
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../backend"))
+
+# Make the backend package importable as ``src``
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def fixture_store():
+    # Imported lazily so benchmarks can set backend env vars before any src module loads
+    from src.fixtures import FixtureStore
+    return FixtureStore()
+
+
+def load_mock_payload() -> dict:
+    """The coffee mock SerpAPI payload (a full captured response) from the backend fixture store."""
+    return fixture_store().get("coffee")
+
+
+RELATED_SUFFIXES = ("near me", "reviews", "price", "best", "how to", "vs", "online", "history")
+
+
+def create_fake_serpapi_app(latency: float = 0.1, error_rate: float = 0.0, related_searches: int = 0) -> Starlette:
+    """
+    Fake SerpAPI ``/search`` endpoint that answers with the fixture for the query after ``latency`` seconds.
+
+    A fraction ``error_rate`` of requests gets a SerpAPI-style ``{"error": ...}`` body with status 503.
+    With ``related_searches`` set, the fixture's related searches are replaced by that
+    many derived from the query itself, so every query has its own follow-ups.
+    """
+    fixtures = fixture_store()
+    stats = {"requests": 0, "errors": 0}
+
+    async def search(request: Request):
+        stats["requests"] += 1
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "Injected upstream failure"}, status_code=503)
+        query = request.query_params.get("q", "")
+        payload = fixtures.get(query)
+        if related_searches:
+            payload = dict(payload, related_searches=[
+                {"query": f"{query} {suffix}"} for suffix in RELATED_SUFFIXES[:related_searches]
+            ])
+        return JSONResponse(payload)
+
+    async def account(request: Request):
+        return JSONResponse({"account_status": "Active", "plan_searches_left": 1000})
+
+    app = Starlette(routes=[Route("/search", search), Route("/account.json", account)])
+    app.state.stats = stats
+    return app
+
+
+def create_fake_llm_app(latency: float = 0.2, error_rate: float = 0.0) -> Starlette:
+    """
+    Fake OpenAI-compatible ``/v1/chat/completions`` endpoint.
+
+    A fraction ``error_rate`` of requests fails with 503 so client retries can be
+    exercised. Requests with ``stream: true`` are answered word by word as SSE chunks.
+    """
+    stats = {"requests": 0, "errors": 0}
+
+    async def stream_words(content: str):
+        for word in content.split(" "):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(0.005)
+        yield "data: [DONE]\n\n"
+
+    async def chat_completions(request: Request):
+        stats["requests"] += 1
+        body = await request.json()
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "overloaded"}}, status_code=503)
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        content = f"Mock answer generated from a {len(prompt)} character prompt."
+        if body.get("stream"):
+            return StreamingResponse(stream_words(content), media_type="text/event-stream")
+        return JSONResponse({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        })
+
+    app = Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
+    app.state.stats = stats
+    return app
+
+
+def create_fake_postgrest_app(latency: float = 0.005, error_rate: float = 0.0) -> Starlette:
+    """
+    In-memory stand-in for the Supabase PostgREST API (``/rest/v1/<table>``).
+
+    Supports what the backend uses: single and multi-row inserts (with
+    ``on_conflict`` upserts and ``Prefer: return=representation``), ``eq.``
+    filtered updates, and selects with ``eq.``/``gte.``/``is.null`` filters, ``order`` and ``limit``.
+    A fraction ``error_rate`` of requests fails with 503. Request counts per
+    method are kept in ``app.state.stats``.
+    """
+    tables = {}
+    stats = {"requests": 0, "GET": 0, "POST": 0, "PATCH": 0, "rows_inserted": 0, "errors": 0}
+
+    def matches(row: dict, params) -> bool:
+        for key, value in params.items():
+            if key in ("select", "order", "limit", "columns", "on_conflict"):
+                continue
+            if value.startswith("eq.") and str(row.get(key)) != value[3:]:
+                return False
+            if value.startswith("gte.") and str(row.get(key) or "") < value[4:]:
+                return False
+            if value == "is.null" and row.get(key) is not None:
+                return False
+        return True
+
+    def project(row: dict, columns: str) -> dict:
+        if columns in ("", "*"):
+            return dict(row)
+        return {column: row.get(column) for column in columns.split(",")}
+
+    def wants_representation(request: Request) -> bool:
+        return "return=representation" in request.headers.get("prefer", "")
+
+    async def table_endpoint(request: Request):
+        await asyncio.sleep(latency)
+        stats["requests"] += 1
+        stats[request.method] += 1
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"message": "Injected database failure"}, status_code=503)
+        rows = tables.setdefault(request.path_params["table"], [])
+        params = request.query_params
+
+        if request.method == "GET":
+            result = [row for row in rows if matches(row, params)]
+            if "order" in params:
+                column, _, direction = params["order"].partition(".")
+                result.sort(key=lambda row: str(row.get(column) or ""), reverse=direction == "desc")
+            if "limit" in params:
+                result = result[:int(params["limit"])]
+            return JSONResponse([project(row, params.get("select", "*")) for row in result])
+
+        body = await request.json()
+        if request.method == "POST":
+            new_rows = body if isinstance(body, list) else [body]
+            conflict = params.get("on_conflict")
+            if conflict and len({str(row.get(conflict)) for row in new_rows}) < len(new_rows):
+                # Same error Postgres raises for a repeated key in one upsert
+                return JSONResponse(
+                    {"code": "21000", "message": "ON CONFLICT DO UPDATE command cannot affect row a second time"},
+                    status_code=500,
+                )
+            for new_row in new_rows:
+                existing = next((row for row in rows if conflict and row.get(conflict) == new_row.get(conflict)), None)
+                if existing is not None:
+                    existing.update(new_row)
+                else:
+                    rows.append(dict(new_row))
+            stats["rows_inserted"] += len(new_rows)
+            return JSONResponse(new_rows if wants_representation(request) else [], status_code=201)
+
+        updated = []
+        for row in rows:
+            if matches(row, params):
+                row.update(body)
+                updated.append(row)
+        return JSONResponse(updated if wants_representation(request) else [])
+
+    app = Starlette(routes=[Route("/rest/v1/{table}", table_endpoint, methods=["GET", "POST", "PATCH"])])
+    app.state.stats = stats
+    app.state.tables = tables
+    return app
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _LoopRecordingServer(uvicorn.Server):
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def serve(self, sockets=None):
+        self.loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+
+class FakeServer:
+    """
+    Run an ASGI app with uvicorn in a daemon thread.
+
+    ``loop`` is the server's event loop, so callers can schedule probes on it
+    with ``asyncio.run_coroutine_threadsafe``.
+    """
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = _LoopRecordingServer(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "FakeServer":
+        self.thread.start()
+        deadline = time.time() + 10
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Fake server did not start")
+            time.sleep(0.01)
+        return self
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self.server.loop
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,29 @@
+"""
+Unit tests for the backend. Run from the repository root:
+
+    python -m pytest -q tests/unit
+
+Nothing here talks to SerpAPI, DeepSeek or Supabase, and every on-disk
+store is pointed at a temporary directory before any backend module loads.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_STATE_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update(
+    DEEPSEEK_API_KEY="test",
+    DB_BACKEND="none",
+    DB_SQLITE_PATH=os.path.join(_STATE_DIR, "db.sqlite3"),
+    LOCAL_INDEX_PATH=os.path.join(_STATE_DIR, "local-index.sqlite3"),
+    SEARCH_CACHE_DIR=os.path.join(_STATE_DIR, "search-cache"),
+    SHARED_STATE_PATH=os.path.join(_STATE_DIR, "state.sqlite3"),
+    PAYLOAD_CAPTURE_PATH=os.path.join(_STATE_DIR, "payloads.jsonl"),
+    LOG_LEVEL="ERROR",
+)
+for name in ("SUPABASE_URL", "SUPABASE_KEY", "SERPAPI_KEY", "SHARED_STATE_BACKEND", "SEARCH_CACHE_BACKEND"):
+    os.environ.pop(name, None)
@@ -0,0 +1,141 @@
+import asyncio
+
+from src.ai_jobs import (
+    AIJobScheduler, JOB_QUEUED, JOB_DUPLICATE, JOB_REJECTED, STATE_QUEUED, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE,
+)
+
+
+def test_duplicate_search_ids_are_queued_once():
+    scheduler = AIJobScheduler(workers=1)
+    runs = []
+
+    async def generate():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        results = [scheduler.submit("s1", generate), scheduler.submit("s1", generate)]
+        assert scheduler.status("s1") == STATE_QUEUED
+        await scheduler._queue.join()
+        # Once finished, the same search_id can be queued again
+        results.append(scheduler.submit("s1", generate))
+        await scheduler._queue.join()
+        await scheduler.close()
+        return results
+
+    assert asyncio.run(scenario()) == [JOB_QUEUED, JOB_DUPLICATE, JOB_QUEUED]
+    assert runs == [1, 1]
+    assert scheduler.deduplicated == 1
+    assert scheduler.completed == 2
+
+
+def test_stale_jobs_are_discarded():
+    scheduler = AIJobScheduler(workers=1, max_wait=5)
+    runs, discarded = [], []
+
+    async def generate():
+        runs.append(1)
+
+    async def scenario():
+        scheduler.submit("s1", generate, on_discard=discarded.append)
+        # Age the job past max_wait before a worker picks it up
+        scheduler._jobs["s1"].enqueued_at -= 6
+        await scheduler._queue.join()
+        await scheduler.close()
+
+    asyncio.run(scenario())
+    assert runs == []
+    assert discarded == ["AI generation expired in queue"]
+    assert scheduler.stale == 1
+    assert scheduler.status("s1") is None
+
+
+def test_full_queue_rejects_and_remembers_the_job():
+    scheduler = AIJobScheduler(workers=1, max_size=1)
+    discarded = []
+
+    async def generate():
+        await asyncio.sleep(0)
+
+    async def scenario():
+        # Workers have not started running yet, so the queue fills up
+        first = scheduler.submit("s1", generate)
+        second = scheduler.submit("s2", generate, on_discard=discarded.append)
+        await scheduler.close()
+        return first, second
+
+    assert asyncio.run(scenario()) == (JOB_QUEUED, JOB_REJECTED)
+    assert discarded == ["AI generation queue is full"]
+    assert scheduler.status("s2") == JOB_REJECTED
+
+
+def test_interactive_jobs_run_before_background_jobs():
+    scheduler = AIJobScheduler(workers=1)
+    order = []
+
+    def job(name):
+        async def generate():
+            order.append(name)
+        return generate
+
+    async def scenario():
+        scheduler.submit("background", job("background"), priority=PRIORITY_BACKGROUND)
+        scheduler.submit("interactive", job("interactive"))
+        await scheduler._queue.join()
+        await scheduler.close()
+
+    asyncio.run(scenario())
+    assert order == ["interactive", "background"]
+
+
+def test_cancel_discards_a_queued_job():
+    scheduler = AIJobScheduler(workers=1)
+    runs, discarded = [], []
+
+    async def generate():
+        runs.append(1)
+
+    async def scenario():
+        scheduler.submit("s1", generate, on_discard=discarded.append)
+        assert scheduler.cancel("s1") is True
+        assert scheduler.cancel("unknown") is False
+        await scheduler._queue.join()
+        await scheduler.close()
+
+    asyncio.run(scenario())
+    assert runs == []
+    assert discarded == ["AI generation cancelled"]
+    assert scheduler.cancelled == 1
+
+
+def test_answers_for_mock_fallbacks_are_queued_as_background_jobs(monkeypatch):
+    from src import main
+    from src.fixtures import FixtureStore
+    from src.models import SearchQuery
+    from src.serpapi_client import SerpAPIError
+
+    priorities = {}
+
+    async def live(params, max_wait=None):
+        return FixtureStore().get(params["q"])
+
+    async def down(params, max_wait=None):
+        raise SerpAPIError("SerpAPI request timed out")
+
+    def submit(search_id, fn, priority=PRIORITY_INTERACTIVE, **kwargs):
+        priorities[search_id] = priority
+
+    monkeypatch.setenv("SERPAPI_KEY", "test")
+    monkeypatch.setattr(main.search_cache, "enabled", False)
+    monkeypatch.setattr(main.ai_jobs, "submit", submit)
+
+    async def scenario():
+        monkeypatch.setattr(main.serpapi_client, "search", live)
+        live_body = await main.execute_search(SearchQuery(query="live priority"), "k1")
+        monkeypatch.setattr(main.serpapi_client, "search", down)
+        mock_body = await main.execute_search(SearchQuery(query="mock priority"), "k2")
+        return live_body, mock_body
+
+    live_body, mock_body = asyncio.run(scenario())
+    assert mock_body["using_mock_data"] is True
+    assert priorities == {live_body["search_id"]: PRIORITY_INTERACTIVE, mock_body["search_id"]: PRIORITY_BACKGROUND}
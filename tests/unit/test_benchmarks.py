@@ -0,0 +1,17 @@
+"""
+Smoke tests that run the in-process benchmarks with tiny inputs, so their
+built-in checks run with the unit tests and they cannot rot unnoticed.
+"""
+from tests.benchmarks import bench_local_index, bench_suggest
+
+
+def test_bench_suggest(capsys):
+    bench_suggest.main(["--queries", "300", "--searches", "1000", "--lookups", "200", "--vocabulary", "200"])
+    assert "queries from 1000 searches loaded" in capsys.readouterr().out
+
+
+def test_bench_local_index(capsys, monkeypatch):
+    # The benchmark points LOCAL_INDEX_PATH at its temporary directory
+    monkeypatch.setenv("LOCAL_INDEX_PATH", "")
+    bench_local_index.main(["--documents", "300", "--queries", "20", "--vocabulary", "200"])
+    assert "300 documents" in capsys.readouterr().out
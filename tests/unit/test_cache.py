@@ -0,0 +1,145 @@
+import asyncio
+
+from src import cache
+from src.cache import LRUCache, SearchCache, DiskCacheBackend, CACHE_HIT, CACHE_MISS, CACHE_BYPASS, make_search_cache_key
+from src.models import SearchQuery
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(max_bytes=100)
+    lru.set("a", {"v": 1}, size=10, ttl=5)
+
+    clock.now += 4.9
+    assert lru.get("a") == {"v": 1}
+    clock.now += 0.2
+    assert lru.get("a") is None
+    assert lru.expirations == 1
+    assert lru.current_bytes == 0
+    assert len(lru) == 0
+
+
+def test_evicts_least_recently_used_when_over_budget():
+    lru = LRUCache(max_bytes=30)
+    lru.set("a", "A", size=10, ttl=60)
+    lru.set("b", "B", size=10, ttl=60)
+    lru.set("c", "C", size=10, ttl=60)
+    # Touch "a" so "b" is the least recently used
+    assert lru.get("a") == "A"
+    lru.set("d", "D", size=10, ttl=60)
+
+    assert lru.get("b") is None
+    assert [lru.get(key) for key in ("a", "c", "d")] == ["A", "C", "D"]
+    assert lru.evictions == 1
+    assert lru.current_bytes == 30
+
+
+def test_replacing_a_key_updates_its_size():
+    lru = LRUCache(max_bytes=100)
+    lru.set("a", "small", size=10, ttl=60)
+    lru.set("a", "large", size=40, ttl=60)
+    assert lru.current_bytes == 40
+    assert lru.get("a") == "large"
+
+
+def test_rejects_entries_larger_than_the_cache():
+    lru = LRUCache(max_bytes=10)
+    assert lru.set("a", "x", size=11, ttl=60) is False
+    assert len(lru) == 0
+
+
+def test_search_cache_reports_hits_and_misses():
+    search_cache = SearchCache(enabled=True, ttl=60, max_bytes=1024 * 1024)
+
+    async def scenario():
+        assert await search_cache.get("k") == (None, CACHE_MISS)
+        await search_cache.set("k", {"organic_results": [1]})
+        return await search_cache.get("k")
+
+    assert asyncio.run(scenario()) == ({"organic_results": [1]}, CACHE_HIT)
+    assert search_cache.stats()["hits"] == 1
+    assert search_cache.stats()["misses"] == 1
+
+
+def test_disabled_search_cache_bypasses():
+    search_cache = SearchCache(enabled=False)
+
+    async def scenario():
+        await search_cache.set("k", {"a": 1})
+        return await search_cache.get("k"), await search_cache.contains("k")
+
+    assert asyncio.run(scenario()) == ((None, CACHE_BYPASS), False)
+
+
+def test_second_tier_hits_are_promoted_to_memory(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path))
+    writer = SearchCache(enabled=True, ttl=60, backend=backend)
+    reader = SearchCache(enabled=True, ttl=60, backend=backend)
+
+    async def scenario():
+        await writer.set("search:k", {"q": "coffee"})
+        first = await reader.get("search:k")
+        second = await reader.get("search:k")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == ({"q": "coffee"}, CACHE_HIT)
+    assert reader.backend_hits == 1
+    assert reader.memory_hits == 1
+
+
+def test_second_tier_hits_keep_their_remaining_lifetime(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    backend = DiskCacheBackend(str(tmp_path), sweep_interval=0)
+    writer = SearchCache(enabled=True, ttl=60, backend=backend)
+    reader = SearchCache(enabled=True, ttl=60, backend=backend)
+    asyncio.run(writer.set("search:k", {"q": "coffee"}))
+
+    # Another worker first reads the entry 50 of its 60 seconds in
+    clock.now += 50
+    assert asyncio.run(reader.get("search:k")) == ({"q": "coffee"}, CACHE_HIT)
+    clock.now += 11
+    assert asyncio.run(reader.get("search:k")) == (None, CACHE_MISS)
+    assert asyncio.run(reader.contains("search:k")) is False
+
+
+def test_disk_sweep_removes_expired_entries(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path), sweep_interval=3600)
+
+    async def scenario():
+        await backend.set("search:old", b"{}", 0.01)
+        await backend.set("search:new", b"{}", 60)
+        await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+    (tmp_path / "abandoned.tmp").write_bytes(b"")
+    assert backend.sweep() == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["abandoned.tmp", "search_new.json"]
+    assert backend.swept == 1
+
+
+def test_contains_is_not_counted_as_a_lookup():
+    search_cache = SearchCache(enabled=True, ttl=60)
+
+    async def scenario():
+        await search_cache.set("k", {"a": 1})
+        return await search_cache.contains("k"), await search_cache.contains("missing")
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert search_cache.hits == search_cache.misses == 0
+
+
+def test_cache_key_ignores_case_and_whitespace():
+    assert make_search_cache_key(SearchQuery(query="Best  Coffee ")) == make_search_cache_key(SearchQuery(query="best coffee"))
+    assert make_search_cache_key(SearchQuery(query="coffee")) != make_search_cache_key(SearchQuery(query="coffee", num_results=5))
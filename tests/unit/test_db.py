@@ -0,0 +1,58 @@
+import asyncio
+
+from src import db
+from src.models import SearchResult
+from src.payload_store import PayloadStore
+from src.postgrest import PostgrestError
+from src.storage import StorageClient
+from src.write_queue import WriteBehindQueue
+
+
+class OldSchemaClient(StorageClient):
+    """Stands in for a Supabase database created before ``supabase/mock_data.sql``."""
+
+    def __init__(self):
+        super().__init__()
+        self.inserted = []
+        self.selects = []
+
+    async def insert(self, table, rows, returning=False, on_conflict=None):
+        self.inserted.extend(rows)
+        return rows if returning else []
+
+    async def select(self, table, columns="*", filters=None, order=None, limit=None):
+        if "using_mock_data" in columns or "using_mock_data" in (filters or {}):
+            raise PostgrestError(400, "column search_results.using_mock_data does not exist")
+        self.selects.append((columns, filters))
+        return []
+
+
+def test_searches_are_stored_and_read_without_missing_columns(monkeypatch):
+    client = OldSchemaClient()
+    monkeypatch.setattr(db, "storage_client", client)
+    monkeypatch.setattr(db, "write_queue", WriteBehindQueue(client, write_behind=False))
+    monkeypatch.setattr(db, "payload_store", PayloadStore(client, mode="inline"))
+    monkeypatch.setattr(db, "mock_flag_stored", True)
+
+    async def scenario():
+        await db.init_db()
+        await db.save_search_result(SearchResult(query="coffee", using_mock_data=True))
+        await db.get_search_results_after(None, 10)
+        await db.get_query_history_after(None, 10)
+
+    asyncio.run(scenario())
+    assert db.mock_flag_stored is False
+    assert "using_mock_data" not in client.inserted[0]
+    assert client.selects == [
+        ("id,query,timestamp,organic_results", {}),
+        ("id,query,timestamp,related_searches", {}),
+    ]
+
+
+def test_unreachable_database_is_assumed_current(monkeypatch):
+    class DownClient(OldSchemaClient):
+        async def select(self, table, columns="*", filters=None, order=None, limit=None):
+            raise PostgrestError(503, "unavailable")
+
+    monkeypatch.setattr(db, "storage_client", DownClient())
+    assert asyncio.run(db.has_column("search_results", "using_mock_data")) is True
@@ -0,0 +1,53 @@
+import json
+
+from src.fixtures import FixtureStore, import_payloads
+from src.normalize import normalize_search_payload
+
+
+def test_different_queries_get_different_bodies():
+    store = FixtureStore()
+    weather = normalize_search_payload(store.get("weather in Paris"))
+    pizza = normalize_search_payload(store.get("pizza dough"))
+
+    assert weather != pizza
+    assert weather["organic_results"][0]["title"].startswith("weather in Paris")
+    assert "best pizza dough" in pizza["related_searches"]
+    assert pizza["answer_box"]["title"] == "pizza dough"
+    assert "search=pizza+dough" in pizza["answer_box"]["link"]
+
+
+def test_patterns_pick_their_own_fixture():
+    store = FixtureStore()
+    coffee = store.get("Espresso machines")
+    assert coffee["search_parameters"]["q"] == "Espresso machines"
+    assert coffee["organic_results"][0]["title"] == "Coffee - Wikipedia"
+    assert store.get("tea")["organic_results"][0]["title"] == "tea - Wikipedia"
+    assert store.describe()["templates"] == ["generic.json"]
+
+
+def test_template_rendering_does_not_mutate_the_fixture():
+    store = FixtureStore()
+    store.get('say "hi"')
+    assert store.get("second")["search_parameters"]["q"] == "second"
+    assert store.load("generic.json")["search_parameters"]["q"] == "{query}"
+
+
+def test_payloads_are_parsed_once_until_closed():
+    store = FixtureStore()
+    assert store.load("coffee.json") is store.load("coffee.json")
+    assert store.describe()["parsed"] == 1
+
+    store.close()
+    assert store.describe()["parsed"] == 0
+    assert store.get("coffee")["organic_results"][0]["title"] == "Coffee - Wikipedia"
+
+
+def test_imported_payloads_match_their_exact_query(tmp_path):
+    (tmp_path / "index.json").write_text(json.dumps({"default": "generic.json", "fixtures": []}))
+    capture = tmp_path / "pizza.json"
+    capture.write_text(json.dumps({"search_parameters": {"q": "Pizza"}, "organic_results": [{"title": "Pizza"}]}))
+
+    assert import_payloads([str(capture)], directory=str(tmp_path)) == 1
+    store = FixtureStore(str(tmp_path))
+    assert store.get("pizza")["organic_results"] == [{"title": "Pizza"}]
+    assert store.get("pizza oven") is None
@@ -0,0 +1,129 @@
+import json
+import asyncio
+
+from src import db, local_index as local_index_module
+from src.local_index import LocalIndex, query_terms, match_expression
+from src.payload_store import PayloadStore
+from src.shared_state import LocalSharedStore
+from src.sqlite_storage import SqliteStorageClient
+
+
+def result(link, title, snippet):
+    return {"link": f"https://example.com/{link}", "title": title, "snippet": snippet}
+
+
+def make_index(tmp_path, **kwargs):
+    kwargs.setdefault("refresh_interval", 0)
+    return LocalIndex(path=str(tmp_path / "index.sqlite3"), enabled=True, **kwargs)
+
+
+def links(hits):
+    return [hit["link"].rsplit("/", 1)[1] for hit in hits]
+
+
+def test_query_terms_are_quoted_in_match_expressions():
+    assert query_terms('Coffee "beans" coffee OR') == ["coffee", "beans", "or"]
+    assert match_expression(["coffee", "or"]) == '"coffee" "or"'
+    assert match_expression(["coffee", "or"], " OR ") == '"coffee" OR "or"'
+
+
+def test_title_matches_rank_above_snippet_matches(tmp_path):
+    index = make_index(tmp_path)
+    index._index_batch([("s1", "espresso", [
+        result("snippet", "Morning drinks", "How to pull an espresso shot at home"),
+        result("title", "Espresso at home", "How to pull a shot in the morning"),
+    ])])
+
+    hits = asyncio.run(index.search("espresso"))
+    assert links(hits) == ["title", "snippet"]
+    assert hits[0]["query"] == "espresso"
+
+
+def test_documents_with_every_term_rank_first(tmp_path):
+    index = make_index(tmp_path)
+    index._index_batch([("s1", "coffee", [
+        result("grinder", "Grinder", "grinder grinder grinder reviews"),
+        result("both", "Buyers guide", "a burr grinder for espresso"),
+        result("espresso", "Espresso", "espresso espresso espresso recipes"),
+    ] + [result(f"tea{i}", "Tea", "green tea leaves") for i in range(20)])])
+
+    hits = asyncio.run(index.search("espresso grinder"))
+    assert links(hits)[0] == "both"
+    assert sorted(links(hits)[1:]) == ["espresso", "grinder"]
+
+
+def test_common_terms_are_matched_by_their_stem(tmp_path):
+    index = make_index(tmp_path)
+    # "brewing" is stored as "brew", which is in every document
+    index._index_batch([("s1", "brewing", [
+        result(f"d{i}", f"Brewing guide {i}", "brewed slowly") for i in range(20)
+    ] + [result("kettle", "Kettle", "a gooseneck kettle")])])
+
+    assert index._common_terms(["brewing", "brews", "kettle"]) == {"brewing", "brews"}
+    # The any-term fill ignores the common term instead of returning every document
+    hits = asyncio.run(index.search("brewing kettle", limit=5))
+    assert links(hits) == ["kettle"]
+
+
+def test_refresh_pages_by_timestamp_and_id_and_skips_mock_rows(tmp_path, monkeypatch):
+    client = SqliteStorageClient(str(tmp_path / "db.sqlite3"))
+    monkeypatch.setattr(db, "storage_client", client)
+    monkeypatch.setattr(db, "payload_store", PayloadStore(client))
+    monkeypatch.setattr(local_index_module, "get_search_results_after", db.get_search_results_after)
+    # More rows with one timestamp than fit in a page
+    rows = [
+        {
+            "id": f"s{i}",
+            "query": "coffee",
+            "timestamp": "2026-01-01T00:00:00+00:00",
+            "organic_results": [result(f"d{i}", "Coffee", f"coffee shop {i}")],
+            "using_mock_data": i == 3,
+        }
+        for i in range(7)
+    ]
+    index = make_index(tmp_path, batch_size=2)
+
+    async def scenario():
+        await client.insert("search_results", rows)
+        await index.start()
+        read = await index.refresh()
+        again = await index.refresh()
+        hits = await index.search("coffee", limit=10)
+        await index.close()
+        await client.close()
+        return read, again, hits
+
+    read, again, hits = asyncio.run(scenario())
+    assert (read, again) == (6, 0)
+    assert sorted(links(hits)) == ["d0", "d1", "d2", "d4", "d5", "d6"]
+    assert index._cursor() == ("2026-01-01T00:00:00+00:00", "s6")
+
+
+def test_legacy_cursor_is_read_as_a_timestamp(tmp_path):
+    index = make_index(tmp_path)
+    conn = index._writer_conn()
+    conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", ("refreshed_through", "2026-01-01T00:00:00"))
+    assert index._cursor() == ("2026-01-01T00:00:00", "")
+    conn.execute("UPDATE meta SET value = ?", (json.dumps(["2026-01-02T00:00:00", "s9"]),))
+    assert index._cursor() == ("2026-01-02T00:00:00", "s9")
+
+
+def test_one_worker_refreshes_at_a_time(tmp_path):
+    class HostStore(LocalSharedStore):
+        shared = True
+
+    store = HostStore()
+    first = make_index(tmp_path, refresh_interval=30, store=store)
+    second = make_index(tmp_path, refresh_interval=30, store=store)
+
+    async def scenario():
+        taken = [await first._take_refresh_lease(), await second._take_refresh_lease(), await first._take_refresh_lease()]
+        # The holder shuts down and releases the lease
+        first.refreshing = True
+        await first.close()
+        taken.append(await second._take_refresh_lease())
+        # A single worker has nobody to coordinate with
+        taken.append(await make_index(tmp_path, store=LocalSharedStore())._take_refresh_lease())
+        return taken
+
+    assert asyncio.run(scenario()) == [True, False, True, True, True]
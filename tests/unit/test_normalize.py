@@ -0,0 +1,18 @@
+from src.normalize import normalize_search_payload, stored_sections
+
+
+def test_missing_sections_default_to_empty_lists():
+    sections = normalize_search_payload({"organic_results": [{"title": "Coffee", "link": "https://example.com"}]})
+    assert sections["local_results"] == []
+    assert sections["related_questions"] == []
+    assert sections["related_searches"] == []
+    assert sections["knowledge_graph"] is None
+    assert sections["organic_results"][0]["title"] == "Coffee"
+
+
+def test_stored_sections_keep_null_for_empty_optional_lists():
+    sections = normalize_search_payload({"related_questions": [{"question": "Is coffee healthy?"}]})
+    stored = stored_sections(sections)
+    assert stored["local_results"] is None
+    assert stored["related_questions"] == [{"question": "Is coffee healthy?", "snippet": None}]
+    assert sections["local_results"] == []
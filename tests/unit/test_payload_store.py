@@ -0,0 +1,101 @@
+import asyncio
+
+from src.payload_store import PayloadStore, PAYLOAD_TABLE, compress, decompress, canonical_payload
+from src.sqlite_storage import SqliteStorageClient
+from src.write_queue import WriteBehindQueue
+
+ROW = {
+    "id": "s1",
+    "query": "coffee",
+    "organic_results": [{"title": "Coffee", "link": "https://example.com", "snippet": "Brewed drink"}],
+    "knowledge_graph": {"title": "Coffee", "attributes": {}},
+    "local_results": None,
+    "related_questions": [{"question": "Is coffee healthy?", "snippet": None}],
+    "related_searches": ["coffee beans"],
+    "inline_images": [],
+    "answer_box": None,
+}
+
+
+class FlakyClient(SqliteStorageClient):
+    """SQLite client whose first ``failures`` payload inserts fail."""
+
+    def __init__(self, path: str, failures: int = 0):
+        super().__init__(path)
+        self.failures = failures
+
+    async def insert(self, table, rows, returning=False, on_conflict=None):
+        if table == PAYLOAD_TABLE and self.failures:
+            self.failures -= 1
+            raise RuntimeError("insert failed")
+        return await super().insert(table, rows, returning=returning, on_conflict=on_conflict)
+
+
+def make_store(client):
+    queue = WriteBehindQueue(client, flush_interval=0.01, max_retries=0)
+    return PayloadStore(client, queue, mode="content_addressed"), queue
+
+
+def test_compression_round_trip():
+    payload_hash, data = canonical_payload({"b": 1, "a": [1, 2]})
+    codec, compressed = compress(data)
+    assert decompress(codec, compressed) == data
+    assert canonical_payload({"a": [1, 2], "b": 1})[0] == payload_hash
+
+
+def test_packed_row_expands_to_the_original_sections(tmp_path):
+    client = SqliteStorageClient(str(tmp_path / "db.sqlite3"))
+    store, queue = make_store(client)
+
+    async def scenario():
+        compact = await store.pack(dict(ROW))
+        await queue.insert("search_results", compact)
+        await queue.close()
+        # A fresh store has nothing cached and reads the payload back from the table
+        reader = PayloadStore(client, mode="content_addressed")
+        rows = await client.select("search_results", filters={"id": "eq.s1"})
+        expanded = await reader.expand(rows[0])
+        await client.close()
+        return compact, expanded, reader
+
+    compact, expanded, reader = asyncio.run(scenario())
+    assert "organic_results" not in compact
+    assert {key: expanded[key] for key in ROW} == ROW
+    assert reader.fetched == 1
+
+
+def test_repeated_payload_is_written_once_after_confirmation(tmp_path):
+    client = SqliteStorageClient(str(tmp_path / "db.sqlite3"))
+    store, queue = make_store(client)
+
+    async def scenario():
+        await store.pack(dict(ROW))
+        await queue._queue.join()
+        await store.pack(dict(ROW, id="s2"))
+        await queue.close()
+        rows = await client.select(PAYLOAD_TABLE, columns="hash")
+        await client.close()
+        return rows
+
+    assert len(asyncio.run(scenario())) == 1
+    assert store.payloads_written == 1
+    assert store.deduplicated == 1
+
+
+def test_dropped_payload_insert_is_sent_again(tmp_path):
+    client = FlakyClient(str(tmp_path / "db.sqlite3"), failures=1)
+    store, queue = make_store(client)
+
+    async def scenario():
+        await store.pack(dict(ROW))
+        await queue._queue.join()
+        await store.pack(dict(ROW, id="s2"))
+        await queue.close()
+        rows = await client.select(PAYLOAD_TABLE, columns="hash")
+        await client.close()
+        return rows
+
+    assert len(asyncio.run(scenario())) == 1
+    assert queue.failed_ops == 1
+    assert store.payloads_written == 2
+    assert store.deduplicated == 0
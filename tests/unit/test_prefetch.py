@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import prefetch
+from src.cache import SearchCache
+from src.prefetch import PrefetchScheduler, OUTCOME_BUDGET, OUTCOME_CACHED
+from src.resilience import UpstreamGuard, CIRCUIT_CLOSED
+from src.serpapi_client import SerpAPIClient
+from src.shared_state import LocalSharedStore
+from src.suggest import QuerySuggestions
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(prefetch, "search_cache", SearchCache(enabled=True, ttl=60))
+    monkeypatch.setattr(prefetch, "shared_store", LocalSharedStore())
+    # Keep every prefetch in one budget minute
+    monkeypatch.setattr(prefetch.time, "time", lambda: 60_000.0)
+    return PrefetchScheduler(enabled=True, max_per_minute=2, trending_interval=0, concurrency=1)
+
+
+def run_prefetches(scheduler, queries, cached=()):
+    fetched = []
+
+    async def fetch(query_request, cache_key):
+        fetched.append(query_request.query)
+        await prefetch.search_cache.set(cache_key, {"organic_results": []})
+        return True
+
+    async def scenario():
+        for key in cached:
+            await prefetch.search_cache.set(key, {"organic_results": []})
+        await scheduler.start(fetch)
+        scheduler.schedule(queries, prefetch.SOURCE_RELATED)
+        while scheduler._pending:
+            await asyncio.sleep(0.001)
+        await scheduler.close()
+
+    asyncio.run(scenario())
+    return fetched
+
+
+def test_upstream_calls_stop_at_the_per_minute_budget(scheduler):
+    fetched = run_prefetches(scheduler, ["a", "b", "c", "d"])
+
+    # The newest queued searches go first
+    assert fetched == ["d", "c"]
+    assert scheduler.fetched == 2
+    assert scheduler.skipped[OUTCOME_BUDGET] == 2
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_cached_searches_do_not_spend_budget(scheduler):
+    cached = [prefetch.make_search_cache_key(prefetch.SearchQuery(query="b"))]
+    fetched = run_prefetches(scheduler, ["a", "b", "c"], cached)
+
+    assert fetched == ["c", "a"]
+    assert scheduler.skipped[OUTCOME_CACHED] == 1
+    assert scheduler.skipped[OUTCOME_BUDGET] == 0
+
+
+def test_hits_on_prefetched_keys_are_counted_once(scheduler):
+    run_prefetches(scheduler, ["a", "b"])
+    key_a, key_b = (prefetch.make_search_cache_key(prefetch.SearchQuery(query=query)) for query in "ab")
+
+    scheduler.record_lookup(key_a, hit=True)
+    scheduler.record_lookup(key_a, hit=True)
+    scheduler.record_lookup(key_b, hit=False)
+    stats = scheduler.stats()
+    assert (stats["used"], stats["expired"], stats["outstanding"]) == (1, 1, 0)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_trending_queries_leave_out_related_only_queries(monkeypatch, scheduler):
+    suggestions = QuerySuggestions(enabled=True, refresh_interval=0)
+    suggestions._load([
+        {"id": "s1", "query": "coffee", "timestamp": None, "related_searches": ["espresso"] * 50},
+        {"id": "s2", "query": "tea", "timestamp": None, "related_searches": []},
+    ])
+    suggestions.loaded = True
+    monkeypatch.setattr(prefetch, "query_suggestions", suggestions)
+    scheduler.trending_count = 2
+
+    assert sorted(scheduler.trending_queries()) == ["coffee", "tea"]
+    assert suggestions.lookups == 0
+
+
+def test_speculative_failures_do_not_open_the_circuit():
+    guard = UpstreamGuard("serpapi", rate=0, burst=1, max_wait=0, failure_threshold=1, reset_timeout=30)
+    client = SerpAPIClient(base_url="http://serpapi.test", guard=guard)
+
+    async def scenario():
+        client._client = httpx.AsyncClient(
+            base_url=client.base_url,
+            transport=httpx.MockTransport(lambda request: httpx.Response(503, json={"error": "unavailable"})),
+        )
+        await client.search({"q": "coffee"}, max_wait=0, track_health=False)
+        state = guard.breaker.state
+        await client.search({"q": "coffee"})
+        await client.close()
+        return state
+
+    assert asyncio.run(scenario()) == CIRCUIT_CLOSED
+    assert guard.breaker.state != CIRCUIT_CLOSED
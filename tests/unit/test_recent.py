@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime
+
+from src import recent
+from src.recent import RecentQueries
+
+
+def test_record_keeps_unique_queries_newest_first(monkeypatch):
+    saved = []
+
+    async def save(normalized_query, query, timestamp):
+        saved.append((normalized_query, timestamp))
+
+    monkeypatch.setattr(recent, "save_recent_query", save)
+    buffer = RecentQueries(capacity=2)
+
+    async def scenario():
+        for query in ("coffee", "tea", "Coffee ", "juice"):
+            await buffer.record(query)
+
+    asyncio.run(scenario())
+    assert [entry["query"] for entry in buffer.get(10)] == ["juice", "Coffee"]
+    assert datetime.fromisoformat(saved[0][1]).utcoffset().total_seconds() == 0
+
+
+def test_limits_beyond_capacity_fall_back_to_the_table(monkeypatch):
+    rows = [
+        {"normalized_query": "tea", "query": "tea", "timestamp": "2026-01-03T00:00:00+00:00"},
+        {"normalized_query": "coffee", "query": "coffee", "timestamp": "2026-01-02T00:00:00+00:00"},
+        {"normalized_query": "juice", "query": "Juice", "timestamp": "2026-01-01T00:00:00+00:00"},
+    ]
+    requested = []
+
+    async def save(normalized_query, query, timestamp):
+        pass
+
+    async def get_rows(limit):
+        requested.append(limit)
+        return rows[:limit]
+
+    monkeypatch.setattr(recent, "save_recent_query", save)
+    monkeypatch.setattr(recent, "get_recent_query_rows", get_rows)
+    buffer = RecentQueries(capacity=1)
+
+    async def scenario():
+        await buffer.record("coffee")
+        return await buffer.fetch(1), await buffer.fetch(3)
+
+    within, beyond = asyncio.run(scenario())
+    assert [entry["query"] for entry in within] == ["coffee"]
+    assert [entry["query"] for entry in beyond] == ["coffee", "tea", "Juice"]
+    assert requested == [3]
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from src import resilience
+from src.resilience import (
+    RateLimiter, CircuitBreaker, UpstreamGuard, UpstreamUnavailable,
+    CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN, REJECT_CIRCUIT_OPEN, REJECT_RATE_LIMITED,
+)
+from src.shared_state import LocalSharedStore, SqliteSharedStore
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class HostStore(LocalSharedStore):
+    """In-process store that claims to be shared, so the limiter keeps its bucket there."""
+
+    shared = True
+
+
+def test_breaker_opens_probes_and_closes(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.allow() is False
+
+    clock.now += 10
+    assert breaker.allow() is True
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    # Only one probe at a time
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.failures == 0
+
+
+def test_failed_probe_reopens_the_circuit(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.opened == 2
+    clock.now += 5
+    assert breaker.allow() is False
+
+
+def test_local_bucket_allows_a_burst_then_refills(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    limiter = RateLimiter("test", rate=2, burst=3, store=LocalSharedStore())
+
+    assert [limiter._take_local() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter._take_local() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter._take_local() == 0.0
+
+
+@pytest.mark.parametrize("backend", ["local", "sqlite"])
+def test_shared_bucket_supports_fractional_rates(monkeypatch, tmp_path, backend):
+    clock = Clock(1_700_000_000.0)
+    monkeypatch.setattr(resilience.time, "time", clock)
+    store = HostStore() if backend == "local" else SqliteSharedStore(str(tmp_path / "state.sqlite3"))
+    limiter = RateLimiter("fractional", rate=0.5, burst=2, store=store)
+
+    async def take():
+        return await limiter._take_shared()
+
+    async def scenario():
+        waits = [await take() for _ in range(3)]
+        clock.now += 1
+        waits.append(await take())
+        clock.now += 1
+        waits.append(await take())
+        await store.close()
+        return waits
+
+    # Two tokens of burst, then one every two seconds; refused attempts take nothing
+    assert asyncio.run(scenario()) == [0.0, 0.0, pytest.approx(2.0), pytest.approx(1.0), 0.0]
+
+
+def test_shared_limiter_is_enforced_across_limiters():
+    store = HostStore()
+    first = RateLimiter("upstream", rate=1, burst=1, store=store)
+    second = RateLimiter("upstream", rate=1, burst=1, store=store)
+
+    async def scenario():
+        return await first.acquire(0), await second.acquire(0)
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert second.limited == 1
+
+
+def test_guard_rejects_when_open_or_rate_limited():
+    guard = UpstreamGuard("test", rate=1, burst=1, max_wait=0, failure_threshold=1, reset_timeout=60)
+    guard.limiter.store = LocalSharedStore()
+
+    async def scenario():
+        await guard.admit()
+        with pytest.raises(UpstreamUnavailable) as limited:
+            await guard.admit()
+        guard.record_failure()
+        with pytest.raises(UpstreamUnavailable) as opened:
+            await guard.admit()
+        return limited.value.reason, opened.value.reason
+
+    assert asyncio.run(scenario()) == (REJECT_RATE_LIMITED, REJECT_CIRCUIT_OPEN)
+    assert guard.rejected == 2
@@ -0,0 +1,145 @@
+import json
+import asyncio
+
+import pytest
+
+from src.cache import SearchCache, SharedCacheBackend
+from src.singleflight import SingleFlight, SharedLease
+from src.shared_state import LocalSharedStore
+from src.models import SearchQuery
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert calls == [1]
+    assert [value for value, _ in results] == ["result"] * 5
+    assert [leader for _, leader in results].count(True) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+def test_key_is_released_after_completion_and_failure():
+    flight = SingleFlight()
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await flight.do("k", fail)
+        # A failed call is not remembered; the next caller runs the work again
+        return await flight.do("k", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == ("ok", True)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelling_the_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def scenario():
+        begun = asyncio.Event()
+
+        async def work():
+            begun.set()
+            await asyncio.sleep(0.05)
+            return "shared"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await begun.wait()
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == ("shared", False)
+
+
+def test_ai_generation_starts_once_even_if_the_leader_request_is_cancelled(monkeypatch):
+    from src import main
+    from src.fixtures import FixtureStore
+
+    payload = FixtureStore().get("coffee")
+    submitted = []
+
+    async def slow_search(params, max_wait=None):
+        await asyncio.sleep(0.05)
+        return payload
+
+    monkeypatch.setenv("SERPAPI_KEY", "test")
+    monkeypatch.setattr(main.serpapi_client, "search", slow_search)
+    monkeypatch.setattr(main.search_cache, "enabled", False)
+    monkeypatch.setattr(main.ai_jobs, "submit", lambda search_id, fn, **kwargs: submitted.append(search_id))
+
+    async def scenario():
+        query = SearchQuery(query="single flight cancellation")
+        leader = asyncio.create_task(main.search(query))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(main.search(SearchQuery(query="Single Flight Cancellation")))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    body = json.loads(asyncio.run(scenario()).body)
+    assert submitted == [body["search_id"]]
+    assert main.ai_streams.get(body["search_id"]) is not None
+    assert body["query"] == "Single Flight Cancellation"
+
+
+class HostStore(LocalSharedStore):
+    """In-process store that claims to be shared, standing in for the SQLite/Redis stores."""
+
+    shared = True
+
+
+def test_leases_are_disabled_without_a_shared_cache_tier():
+    assert SharedLease(store=HostStore(), enabled=False).enabled is False
+    assert SharedLease(store=LocalSharedStore()).enabled is False
+    assert SearchCache(enabled=True).shared is False
+    assert SearchCache(enabled=True, backend=SharedCacheBackend(HostStore())).shared is True
+
+
+def test_waiter_takes_over_the_fetch_when_the_holder_caches_nothing(monkeypatch):
+    from src import main
+    from src.fixtures import FixtureStore
+
+    payload = FixtureStore().get("coffee")
+    leases = SharedLease(store=HostStore(), poll_interval=0.005)
+    fetches = []
+
+    async def search(params, max_wait=None):
+        fetches.append(params["q"])
+        return payload
+
+    monkeypatch.setenv("SERPAPI_KEY", "test")
+    monkeypatch.setattr(main.serpapi_client, "search", search)
+    monkeypatch.setattr(main, "search_cache", SearchCache(enabled=True))
+    monkeypatch.setattr(main, "search_leases", leases)
+    monkeypatch.setattr(main.ai_jobs, "submit", lambda search_id, fn, **kwargs: None)
+
+    async def scenario():
+        query = SearchQuery(query="lease takeover")
+        cache_key = main.make_search_cache_key(query)
+        # Another worker holds the lease and gives up without caching a payload
+        assert await leases.acquire(cache_key)
+        asyncio.get_running_loop().call_later(0.02, lambda: asyncio.ensure_future(leases.release(cache_key)))
+        response = await main.execute_search(query, cache_key)
+        return response, await leases.store.get("lease:" + cache_key)
+
+    response, lease = asyncio.run(scenario())
+    assert fetches == ["lease takeover"]
+    assert response["using_mock_data"] is False
+    assert leases.acquired == 2
+    assert lease is None
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from src.sqlite_storage import SqliteStorageClient, StorageError
+
+
+def run(path, scenario):
+    client = SqliteStorageClient(str(path / "db.sqlite3"))
+
+    async def wrapper():
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(wrapper())
+
+
+def test_insert_returns_the_persisted_row_with_defaults(tmp_path):
+    async def scenario(client):
+        return await client.insert(
+            "search_results",
+            [{"id": "s1", "query": "coffee", "organic_results": [{"title": "Coffee"}], "related_searches": ["beans"]}],
+            returning=True,
+        )
+
+    row, = run(tmp_path, scenario)
+    assert row["organic_results"] == [{"title": "Coffee"}]
+    assert row["related_searches"] == ["beans"]
+    assert row["knowledge_graph"] is None
+    assert row["timestamp"]
+
+
+def test_select_filters_orders_and_limits(tmp_path):
+    async def scenario(client):
+        await client.insert("recent_queries", [
+            {"normalized_query": "a", "query": "A", "timestamp": "2026-01-01T00:00:00"},
+            {"normalized_query": "b", "query": "B", "timestamp": "2026-01-03T00:00:00"},
+            {"normalized_query": "c", "query": "C", "timestamp": "2026-01-02T00:00:00"},
+        ])
+        newest = await client.select("recent_queries", columns="query", order="timestamp.desc", limit=2)
+        since = await client.select("recent_queries", columns="query", filters={"timestamp": "gte.2026-01-02"}, order="timestamp.asc")
+        return newest, since
+
+    newest, since = run(tmp_path, scenario)
+    assert newest == [{"query": "B"}, {"query": "C"}]
+    assert since == [{"query": "C"}, {"query": "B"}]
+
+
+def test_update_and_upsert(tmp_path):
+    async def scenario(client):
+        await client.insert("search_results", [{"id": "s1", "query": "coffee"}])
+        updated = await client.update("search_results", {"ai_response": "answer"}, {"id": "eq.s1"}, returning=True)
+        await client.insert("recent_queries", [{"normalized_query": "tea", "query": "tea", "timestamp": "1"}])
+        await client.insert(
+            "recent_queries", [{"normalized_query": "tea", "query": "Tea", "timestamp": "2"}], on_conflict="normalized_query"
+        )
+        return updated, await client.select("recent_queries")
+
+    updated, recent = run(tmp_path, scenario)
+    assert updated[0]["ai_response"] == "answer"
+    assert recent == [{"normalized_query": "tea", "query": "Tea", "timestamp": "2"}]
+
+
+def test_failed_write_does_not_undo_others_in_the_same_commit(tmp_path):
+    async def scenario(client):
+        results = await asyncio.gather(
+            client.insert("search_results", [{"id": "s1", "query": "coffee"}]),
+            client.insert("search_results", [{"id": "s1", "query": "duplicate"}]),
+            client.insert("search_results", [{"id": "s2", "query": "tea"}]),
+            return_exceptions=True,
+        )
+        rows = await client.select("search_results", columns="id,query", order="id.asc")
+        return results, rows
+
+    results, rows = run(tmp_path, scenario)
+    assert [isinstance(result, Exception) for result in results] == [False, True, False]
+    assert rows == [{"id": "s1", "query": "coffee"}, {"id": "s2", "query": "tea"}]
+
+
+def test_unknown_names_are_rejected(tmp_path):
+    async def scenario(client):
+        with pytest.raises(StorageError):
+            await client.select("search_results", columns="id; DROP TABLE search_results")
+        with pytest.raises(StorageError):
+            await client.select("missing")
+        with pytest.raises(StorageError):
+            await client.select("search_results", filters={"id": "like.%"})
+
+    run(tmp_path, scenario)
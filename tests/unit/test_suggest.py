@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src import db, suggest
+from src.payload_store import PayloadStore
+from src.sqlite_storage import SqliteStorageClient
+from src.suggest import QuerySuggestions
+
+NOW = datetime.now(timezone.utc)
+
+
+def row(search_id, query, days_ago=0.0, related=None, timestamp=None):
+    return {
+        "id": search_id,
+        "query": query,
+        "timestamp": timestamp or (NOW - timedelta(days=days_ago)).isoformat(),
+        "related_searches": related or [],
+    }
+
+
+def queries(suggestions):
+    return [suggestion["query"] for suggestion in suggestions]
+
+
+def make_index(**kwargs):
+    kwargs.setdefault("refresh_interval", 0)
+    return QuerySuggestions(enabled=True, **kwargs)
+
+
+def test_more_frequent_queries_rank_first():
+    index = make_index()
+    index._load([row("s1", "coffee beans"), row("s2", "coffee shops"), row("s3", "coffee shops")])
+
+    assert queries(index.suggest("cof")) == ["coffee shops", "coffee beans"]
+    assert index.suggest("coffee s")[0]["count"] == 2
+    # A trailing space only matches whole words
+    assert queries(index.suggest("coffee ")) == ["coffee shops", "coffee beans"]
+    assert index.suggest("tea") == []
+
+
+def test_recent_searches_outweigh_older_ones():
+    index = make_index(half_life_hours=24)
+    index._load([
+        row("s1", "coffee beans", days_ago=3),
+        row("s2", "coffee beans", days_ago=3),
+        row("s3", "coffee shops", days_ago=0),
+    ])
+    # Two searches three half-lives ago count as a quarter of one today
+    assert queries(index.suggest("coffee")) == ["coffee shops", "coffee beans"]
+
+
+def test_related_searches_count_less_than_searches():
+    index = make_index(related_weight=0.1)
+    index._load([row("s1", "coffee beans"), row("s2", "espresso", related=["coffee grinder"] * 5)])
+
+    suggestions = index.suggest("coffee")
+    assert queries(suggestions) == ["coffee beans", "coffee grinder"]
+    # Related searches are suggested but not counted as searches
+    assert suggestions[1]["count"] == 0
+
+
+def test_latest_search_sets_the_spelling_across_timezones():
+    index = make_index()
+    index._load([
+        row("s1", "Coffee Beans", timestamp="2026-01-01T10:00:00+02:00"),
+        # Later than s1 in absolute time, though it sorts first as a string
+        row("s2", "COFFEE BEANS", timestamp="2026-01-01T09:00:00+00:00"),
+    ])
+    assert index.suggest("coffee")[0]["query"] == "COFFEE BEANS"
+    index._load([row("s3", "coffee beans", timestamp="2026-01-01T08:30:00+00:00")])
+    assert index.suggest("coffee")[0]["query"] == "COFFEE BEANS"
+
+
+def test_top_lists_follow_new_searches():
+    index = make_index(max_results=2)
+    index._load([row(f"s{i}", f"q{i:03d}") for i in range(suggest.SCAN_LIMIT + 10)])
+    index._warm()
+    assert "q" in index._top
+
+    index.add("new-1", "q500")
+    index.add("new-2", "q500")
+    assert queries(index.suggest("q"))[0] == "q500"
+    # Counting a search this process saved again from the database is a no-op
+    index._load([row("new-1", "q500")])
+    assert index.suggest("q")[0]["count"] == 2
+
+
+def test_refresh_pages_by_timestamp_and_id_and_skips_mock_rows(tmp_path, monkeypatch):
+    client = SqliteStorageClient(str(tmp_path / "db.sqlite3"))
+    monkeypatch.setattr(db, "storage_client", client)
+    monkeypatch.setattr(db, "payload_store", PayloadStore(client))
+    monkeypatch.setattr(suggest, "get_query_history_after", db.get_query_history_after)
+    timestamp = NOW.isoformat()
+    # More rows with one timestamp than fit in a page
+    rows = [{**row(f"s{i}", "coffee", timestamp=timestamp), "using_mock_data": i == 3} for i in range(7)]
+    rows.append({**row("old", "coffee", days_ago=200), "using_mock_data": False})
+    index = make_index(batch_size=2, history_days=90)
+
+    async def scenario():
+        await client.insert("search_results", rows)
+        read = await index.refresh()
+        again = await index.refresh()
+        await client.close()
+        return read, again
+
+    assert asyncio.run(scenario()) == (6, 0)
+    assert index.suggest("coffee")[0]["count"] == 6
+    assert index._cursor == (timestamp, "s6")
@@ -0,0 +1,166 @@
+import asyncio
+
+from src.write_queue import WriteBehindQueue
+
+
+class FakeClient:
+    """Records the statements a WriteBehindQueue sends instead of talking to PostgREST."""
+
+    def __init__(self, failures: int = 0, bad_ids=()):
+        self.statements = []
+        self.failures = failures
+        self.bad_ids = set(bad_ids)
+
+    async def insert(self, table, rows, returning=False, on_conflict=None):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("insert failed")
+        if any(row.get("id") in self.bad_ids for row in rows):
+            raise RuntimeError("constraint violated")
+        self.statements.append(("insert", table, [dict(row) for row in rows], on_conflict))
+        return rows if returning else []
+
+    async def update(self, table, values, filters):
+        self.statements.append(("update", table, dict(values), filters))
+        return []
+
+
+def make_queue(client, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    return WriteBehindQueue(client, **kwargs)
+
+
+def test_update_of_a_queued_insert_is_merged():
+    client = FakeClient()
+    queue = make_queue(client)
+
+    async def scenario():
+        await queue.insert("search_results", {"id": "s1", "query": "coffee"})
+        await queue.update("search_results", "s1", {"ai_response_id": "a1"})
+        assert queue.get_unflushed("search_results", "s1") == {"id": "s1", "query": "coffee", "ai_response_id": "a1"}
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert client.statements == [
+        ("insert", "search_results", [{"id": "s1", "query": "coffee", "ai_response_id": "a1"}], None),
+    ]
+    assert queue.merged_updates == 1
+    assert queue.get_unflushed("search_results", "s1") is None
+
+
+def test_batch_is_flushed_parent_tables_first():
+    client = FakeClient()
+    queue = make_queue(client)
+
+    async def scenario():
+        await queue.upsert("recent_queries", {"query": "coffee", "search_id": "s1"}, on_conflict="query")
+        await queue.insert("ai_responses", {"id": "a1", "search_id": "s1"})
+        await queue.insert("search_results", {"id": "s1"})
+        await queue.insert("search_results", {"id": "s2"})
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert [(kind, table, len(rows)) for kind, table, rows, _ in client.statements] == [
+        ("insert", "search_results", 2),
+        ("insert", "ai_responses", 1),
+        ("insert", "recent_queries", 1),
+    ]
+    assert queue.stats()["batches"] == 1
+
+
+def test_upserts_of_the_same_key_keep_the_latest_row():
+    client = FakeClient()
+    queue = make_queue(client)
+
+    async def scenario():
+        await queue.upsert("recent_queries", {"query": "coffee", "search_id": "s1"}, on_conflict="query")
+        await queue.upsert("recent_queries", {"query": "tea", "search_id": "s2"}, on_conflict="query")
+        await queue.upsert("recent_queries", {"query": "coffee", "search_id": "s3"}, on_conflict="query")
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert client.statements == [
+        ("insert", "recent_queries", [{"query": "tea", "search_id": "s2"}, {"query": "coffee", "search_id": "s3"}], "query"),
+    ]
+    assert queue.deduped_upserts == 1
+
+
+def test_update_after_flush_is_sent_separately():
+    client = FakeClient()
+    queue = make_queue(client)
+
+    async def scenario():
+        await queue.insert("search_results", {"id": "s1"})
+        await queue._queue.join()
+        await queue.update("search_results", "s1", {"ai_response_id": "a1"})
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert client.statements == [
+        ("insert", "search_results", [{"id": "s1"}], None),
+        ("update", "search_results", {"ai_response_id": "a1"}, {"id": "eq.s1"}),
+    ]
+    assert queue.merged_updates == 0
+
+
+def test_failed_batch_is_retried_then_dropped():
+    client = FakeClient(failures=10)
+    queue = make_queue(client, max_retries=2)
+
+    async def scenario():
+        await queue.insert("search_results", {"id": "s1"})
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert client.statements == []
+    assert client.failures == 7
+    assert queue.failed_ops == 1
+    # A dropped row is no longer served as a pending write
+    assert queue.get_unflushed("search_results", "s1") is None
+
+
+def test_only_the_failing_row_of_a_batch_is_dropped():
+    client = FakeClient(bad_ids={"a2"})
+    queue = make_queue(client, max_retries=1)
+
+    async def scenario():
+        await queue.insert("search_results", {"id": "s1"})
+        for ai_id in ("a1", "a2", "a3"):
+            await queue.insert("ai_responses", {"id": ai_id, "search_id": "s1"})
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert client.statements == [
+        ("insert", "search_results", [{"id": "s1"}], None),
+        ("insert", "ai_responses", [{"id": "a1", "search_id": "s1"}], None),
+        ("insert", "ai_responses", [{"id": "a3", "search_id": "s1"}], None),
+    ]
+    assert queue.failed_ops == 1
+    assert queue.rows_written == 3
+
+
+def test_transient_failure_is_retried():
+    client = FakeClient(failures=1)
+    queue = make_queue(client)
+
+    async def scenario():
+        await queue.insert("search_results", {"id": "s1"})
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert client.statements == [("insert", "search_results", [{"id": "s1"}], None)]
+    assert queue.failed_ops == 0
+
+
+def test_without_write_behind_writes_are_immediate():
+    client = FakeClient()
+    queue = make_queue(client, write_behind=False)
+
+    async def scenario():
+        row = await queue.insert("search_results", {"id": "s1"})
+        await queue.update("search_results", "s1", {"ai_response_id": "a1"})
+        return row
+
+    assert asyncio.run(scenario()) == {"id": "s1"}
+    assert [statement[0] for statement in client.statements] == ["insert", "update"]
+    assert queue.enqueued == 0